@@ -0,0 +1,136 @@
+"""Benchmark the line diff engines on large tmsh-style configurations.
+
+Generates a ``list ltm`` style configuration of roughly the requested size,
+applies scattered edits (changed properties, added and removed objects),
+then times every engine and checks that each produced diff turns the old
+configuration into the new one.
+
+Usage:
+    poetry run python benchmarks/diff_engines.py [--lines 100000] [--edits 200]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from f5_prepost_api.utils.diff_engines import ENGINES, get_diff_engine  # noqa: E402
+
+HUNK_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def generate_config(lines: int, seed: int) -> List[str]:
+    """Build a list of tmsh virtual server / pool objects."""
+    rng = random.Random(seed)
+    config = []
+    index = 0
+    while len(config) < lines:
+        name = f"/Common/app_{index:06d}"
+        config.extend([
+            f"ltm virtual {name}_vs {{",
+            f"    destination /Common/10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}:443",
+            "    ip-protocol tcp",
+            "    mask 255.255.255.255",
+            f"    pool {name}_pool",
+            "    profiles {",
+            "        /Common/http { }",
+            "        /Common/tcp { }",
+            "    }",
+            "    source 0.0.0.0/0",
+            "    translate-address enabled",
+            "    translate-port enabled",
+            "}",
+            f"ltm pool {name}_pool {{",
+            "    members {",
+            f"        /Common/10.200.{index % 256}.{rng.randint(1, 254)}:8443 {{",
+            f"            address 10.200.{index % 256}.{rng.randint(1, 254)}",
+            "        }",
+            "    }",
+            "    monitor /Common/https",
+            "}",
+        ])
+        index += 1
+    return config[:lines]
+
+
+def mutate(config: List[str], edits: int, seed: int) -> List[str]:
+    """Apply scattered property changes, insertions and deletions."""
+    rng = random.Random(seed)
+    changed = list(config)
+    for _ in range(edits):
+        position = rng.randrange(len(changed))
+        action = rng.random()
+        if action < 0.6:
+            changed[position] = changed[position].replace("enabled", "disabled") + " # edited"
+        elif action < 0.8:
+            changed[position:position] = [
+                "    description \"added during change\"",
+                f"    connection-limit {rng.randint(100, 10000)}",
+            ]
+        else:
+            del changed[position:position + rng.randint(1, 6)]
+    return changed
+
+
+def apply_unified(old: List[str], diff: List[str]) -> List[str]:
+    """Apply unified diff lines to old, used to verify every engine."""
+    result = []
+    old_index = 0
+    for line in diff[2:]:
+        match = HUNK_RE.match(line)
+        if match:
+            start, length = int(match.group(1)), int(match.group(2) or 1)
+            hunk_start = start - 1 if length else start
+            result.extend(old[old_index:hunk_start])
+            old_index = hunk_start
+        elif line[0] == " ":
+            result.append(old[old_index])
+            old_index += 1
+        elif line[0] == "-":
+            old_index += 1
+        else:
+            result.append(line[1:])
+    result.extend(old[old_index:])
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100000, help="Lines per configuration")
+    parser.add_argument("--edits", type=int, default=200, help="Scattered edits to apply")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES),
+        help="Engines to benchmark"
+    )
+    args = parser.parse_args()
+
+    old = generate_config(args.lines, args.seed)
+    new = mutate(old, args.edits, args.seed + 1)
+    print(f"Old: {len(old)} lines, new: {len(new)} lines, {args.edits} edits")
+
+    baseline = None
+    failed = False
+    for name in args.engines:
+        engine = get_diff_engine(name)
+        start = time.perf_counter()
+        diff = engine.unified_diff(old, new, "pre", "post", lineterm="")
+        elapsed = time.perf_counter() - start
+        valid = apply_unified(old, diff) == new
+        failed = failed or not valid
+        if baseline is None:
+            baseline = elapsed
+        print(
+            f"{name:>10}: {elapsed:8.3f}s  {len(diff):7d} diff lines  "
+            f"x{baseline / elapsed:6.1f} vs {args.engines[0]}  "
+            f"{'valid' if valid else 'INVALID'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
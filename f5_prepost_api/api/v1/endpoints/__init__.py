@@ -7,6 +7,8 @@ from .status import router as status_router
 from .checks import router as checks_router
 from .search import router as search_router
 from .outputs import router as outputs_router
+from .devices import router as devices_router
+from .jobs import router as jobs_router
 
 __all__ = [
     "precheck_router",
@@ -15,5 +17,7 @@ __all__ = [
     "status_router",
     "checks_router",
     "search_router",
-    "outputs_router"
+    "outputs_router",
+    "devices_router",
+    "jobs_router"
 ] 
\ No newline at end of file
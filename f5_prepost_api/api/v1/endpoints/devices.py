@@ -0,0 +1,87 @@
+from fastapi import APIRouter, HTTPException
+import logging
+import time
+
+from ....models.schemas import DeviceStatsResponse, WarmupRequest, WarmupResponse
+from ....core.device_manager import DeviceManager
+from ....core.device_handler import F5DeviceHandler
+from ....core.keepalive import ConnectionMaintainer
+
+router = APIRouter()
+
+# Get logger
+logger = logging.getLogger(__name__)
+
+# Get device manager instance
+device_manager = DeviceManager()
+
+@router.get("/devices/stats", response_model=DeviceStatsResponse)
+async def get_device_stats():
+    """Get runtime statistics for device execution.
+
+    Reports queue depth and worker counts of the shared SSH executor,
+    connection counts of every device pool, how many sessions the
+    background maintenance has reaped and refreshed, and the circuit state
+    of every device, so backed-up device work is visible under load.
+
+    Returns:
+        200: Device execution statistics
+        500: Internal server error
+    """
+    try:
+        return {
+            "executor": device_manager.executor_stats(),
+            "pools": F5DeviceHandler.pool_stats(),
+            "maintenance": ConnectionMaintainer().stats(),
+            "circuits": F5DeviceHandler.breaker_stats()
+        }
+    except Exception as e:
+        logger.exception(f"Error getting device stats: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get device stats: {str(e)}"
+        )
+
+
+@router.post("/devices/warmup", response_model=WarmupResponse)
+async def warmup_devices(request: WarmupRequest):
+    """Open SSH sessions to devices ahead of a change window.
+    
+    Sessions are opened into the shared connection pools in parallel, rate
+    limited by the warm-up settings, so the precheck that follows reuses
+    them instead of logging in to every device.
+    
+    Only this API process's pools are warmed. Jobs claimed by standalone
+    workers (python -m f5_prepost_api.worker) run in their own processes
+    and open their own sessions, so warm-up only saves logins for jobs run
+    by the in-process worker (JOB_WORKER_ENABLED).
+    
+    Returns:
+        200: Per-device warm-up results with connect latency
+        422: connections_per_device outside 1..SSH_POOL_MAX_SIZE
+        500: Internal server error
+    """
+    try:
+        logger.info(f"Warming up connections for {len(request.devices)} devices")
+        start = time.monotonic()
+        results = await device_manager.warm_up(
+            request.devices,
+            connections_per_device=request.connections_per_device
+        )
+        failed = sum(
+            1 for result in results if result["status"] in ("failed", "unavailable")
+        )
+        
+        return {
+            "total_devices": len(results),
+            "warmed_devices": len(results) - failed,
+            "failed_devices": failed,
+            "elapsed_ms": (time.monotonic() - start) * 1000,
+            "devices": results
+        }
+    except Exception as e:
+        logger.exception(f"Error warming up devices: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to warm up devices: {str(e)}"
+        )
\ No newline at end of file
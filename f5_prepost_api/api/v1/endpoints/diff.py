@@ -1,29 +1,311 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Dict, Any, List
+from sqlalchemy import and_, exists, or_, select
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import base64
+import binascii
+import json
 import logging
 
-from ....database import get_db, CheckBatch, PreCheck, PostCheck, PreCheckOutput, PostCheckOutput
-from ....utils.diff_utils import generate_diff
+from ....database import get_db, AsyncSessionLocal, CheckBatch, Job, PreCheck, PostCheck, PreCheckOutput, PostCheckOutput
+from ....core.job_queue import enqueue_job, notify_workers
+from ....utils.diff_utils import (
+    get_stored_command_diff,
+    get_stored_diff,
+    get_stored_diff_counts,
+    get_structured_command_diff,
+    get_structured_diff,
+    has_stored_diff,
+    store_diff
+)
+from ....utils.ndjson import NDJSON_MEDIA_TYPE, ndjson_line
+from .status import current_postcheck_id
 
 router = APIRouter()
 
 # Get logger
 logger = logging.getLogger(__name__)
 
+# Views of the batch diff, from the full payload down to counts only
+VIEWS = ("full", "diffs", "summary")
+
+MODE_QUERY = Query(
+    "unified",
+    pattern="^(unified|structured)$",
+    description="unified line diffs, or structured per-object diffs of tmsh output"
+)
+VIEW_QUERY = Query(
+    "full",
+    pattern=f"^({'|'.join(VIEWS)})$",
+    description="full (diffs and outputs), diffs (no outputs) or summary (counts only)"
+)
+
+def _device_diff(
+    precheck: PreCheck,
+    postcheck: PostCheck,
+    diff_data: Dict[str, Any],
+    all_commands: Optional[List[Dict[str, Any]]],
+    view: str = "full"
+) -> Dict[str, Any]:
+    """Build one device's entry of the batch diff response.
+    
+    Only the full view repeats the diffs under summary.diff; the summary
+    view leaves out all_commands.
+    """
+    summary = {
+        "total_commands": diff_data.get("total_commands", 0),
+        "commands_with_changes": diff_data.get("changes", 0),
+        "timestamp": postcheck.timestamp
+    }
+    if view == "full":
+        summary["diff"] = diff_data.get("diffs", {})
+    device = {
+        "device_ip": precheck.device_ip,
+        "precheck_id": str(precheck.id),
+        "postcheck_id": str(postcheck.id),
+        "status": diff_data.get("status", "unknown"),
+        "summary": summary
+    }
+    if all_commands is not None:
+        device["all_commands"] = all_commands
+    return device
+
+def _pending_device(precheck: PreCheck) -> Dict[str, Any]:
+    """Device entry for a precheck without a postcheck yet."""
+    return {
+        "device_ip": precheck.device_ip,
+        "precheck_id": str(precheck.id),
+        "postcheck_id": None,
+        "status": "pending",
+        "summary": None,
+        "all_commands": []
+    }
+
+def _selected_commands(
+    precheck: PreCheck,
+    diff_data: Dict[str, Any],
+    changed_only: bool
+) -> List[Tuple[str, bool]]:
+    """(command, has_changes) of the commands to return, in execution order."""
+    diffs = diff_data.get("diffs", {})
+    commands = [
+        (command, command in diffs) for command in precheck.meta_data.get("commands", [])
+    ]
+    if changed_only:
+        return [(command, has_changes) for command, has_changes in commands if has_changes]
+    return commands
+
+async def _outputs_by_command(
+    db: AsyncSession,
+    model,
+    check_column,
+    check_id: str,
+    commands: List[str]
+) -> Dict[str, str]:
+    """Load the output text of the given commands only."""
+    if not commands:
+        return {}
+    stmt = select(model.command, model.output).filter(
+        check_column == check_id, model.command.in_(commands)
+    )
+    return {row.command: row.output for row in (await db.execute(stmt)).all()}
+
+async def _get_batch(batch_id: str, db: AsyncSession) -> CheckBatch:
+    """Get a batch or raise 404."""
+    stmt = select(CheckBatch).filter(CheckBatch.batch_id == batch_id)
+    batch = (await db.execute(stmt)).scalars().first()
+    if not batch:
+        logger.error(f"Batch not found: {batch_id}")
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    return batch
+
+async def _get_postcheck(precheck: PreCheck, db: AsyncSession) -> Optional[PostCheck]:
+    """Get the postcheck batch status reports for the precheck."""
+    postcheck_id = await current_postcheck_id(db, precheck.id)
+    return await db.get(PostCheck, postcheck_id) if postcheck_id else None
+
+async def _get_device_precheck(batch_id: str, device_ip: str, db: AsyncSession) -> PreCheck:
+    """Get a device's precheck in a batch, or raise 404."""
+    await _get_batch(batch_id, db)
+    stmt = select(PreCheck).filter(
+        PreCheck.batch_id == batch_id, PreCheck.device_ip == device_ip
+    ).limit(1)
+    precheck = (await db.execute(stmt)).scalars().first()
+    if not precheck:
+        raise HTTPException(
+            status_code=404, detail=f"Device {device_ip} not found in batch: {batch_id}"
+        )
+    return precheck
+
+async def _build_device_diff(
+    precheck: PreCheck,
+    db: AsyncSession,
+    mode: str,
+    view: str,
+    changed_only: bool
+) -> Dict[str, Any]:
+    """Build one device's diff entry in the requested mode and view."""
+    postcheck = await _get_postcheck(precheck, db)
+    if not postcheck:
+        logger.warning(f"No postcheck found for precheck: {precheck.id}")
+        return _pending_device(precheck)
+    
+    if mode == "structured":
+        diff_data = await get_structured_diff(
+            precheck.id, postcheck.id, precheck.device_ip, db
+        )
+    elif view == "summary":
+        # Counts only, without reading any diff or output text
+        diff_data = await get_stored_diff_counts(
+            precheck.id, postcheck.id, precheck.device_ip, db
+        )
+    else:
+        # Read the stored diff
+        diff_data = await get_stored_diff(
+            precheck.id, postcheck.id, precheck.device_ip, db
+        )
+    
+    if view == "summary":
+        return _device_diff(precheck, postcheck, diff_data, None, view)
+    
+    diffs = diff_data.get("diffs", {})
+    selected = _selected_commands(precheck, diff_data, changed_only)
+    all_commands = [
+        {
+            "command": command,
+            "has_changes": has_changes,
+            "diff": diffs.get(command) if mode == "structured" else diffs.get(command, [])
+        }
+        for command, has_changes in selected
+    ]
+    
+    # Raw outputs, only in the unified full view and only for the returned commands
+    if mode == "unified" and view == "full":
+        commands = [command for command, _ in selected]
+        pre_map = await _outputs_by_command(
+            db, PreCheckOutput, PreCheckOutput.precheck_id, precheck.id, commands
+        )
+        post_map = await _outputs_by_command(
+            db, PostCheckOutput, PostCheckOutput.postcheck_id, postcheck.id, commands
+        )
+        for entry in all_commands:
+            entry["pre_output"] = pre_map.get(entry["command"], "")
+            entry["post_output"] = post_map.get(entry["command"], "")
+    
+    return _device_diff(precheck, postcheck, diff_data, all_commands, view)
+
+def _encode_cursor(precheck: PreCheck) -> str:
+    raw = json.dumps([precheck.device_ip, precheck.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        device_ip, precheck_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(device_ip), str(precheck_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _overall_from_devices(statuses: List[str]) -> str:
+    """Overall diff status from the statuses of all devices."""
+    if any(status == "pending" for status in statuses):
+        return "in_progress"
+    if all(status == "completed" for status in statuses):
+        return "completed"
+    return "partial"
+
+async def _overall_status(batch_id: str, db: AsyncSession) -> str:
+    """Overall diff status of the whole batch, for paginated responses."""
+    pending = select(PreCheck.id).filter(
+        PreCheck.batch_id == batch_id,
+        ~exists().where(PostCheck.precheck_id == PreCheck.id)
+    ).limit(1)
+    return "in_progress" if (await db.execute(pending)).first() else "completed"
+
+async def _stream_diff(
+    batch_id: str,
+    prechecks: List[PreCheck],
+    mode: str,
+    view: str,
+    changed_only: bool,
+    limit: Optional[int],
+    next_cursor: Optional[str]
+) -> AsyncIterator[bytes]:
+    """Yield the batch diff as NDJSON, one device record at a time.
+    
+    Runs after the request's session is closed, so it reads through a
+    session of its own. Each device's rows are released and its read
+    transaction ended before the next device is read, keeping memory flat.
+    """
+    yield ndjson_line("batch", {"batch_id": batch_id})
+    statuses = []
+    try:
+        async with AsyncSessionLocal() as db:
+            for precheck in prechecks:
+                device = await _build_device_diff(precheck, db, mode, view, changed_only)
+                await db.rollback()
+                db.expunge_all()
+                statuses.append(device["status"])
+                yield ndjson_line("device", device)
+            
+            if limit is not None:
+                overall_status = await _overall_status(batch_id, db)
+            else:
+                overall_status = _overall_from_devices(statuses)
+    except Exception as e:
+        logger.exception(f"Error streaming diff for batch {batch_id}: {str(e)}")
+        yield ndjson_line("error", {"detail": f"Failed to generate diff: {str(e)}"})
+        return
+    
+    trailer = {"overall_status": overall_status}
+    if limit is not None:
+        trailer["next_cursor"] = next_cursor
+    yield ndjson_line("end", trailer)
+
 @router.get("/batch/{batch_id}/diff")
 async def get_diff(
     batch_id: str,
+    mode: str = MODE_QUERY,
+    view: str = VIEW_QUERY,
+    changed_only: bool = Query(False, description="Only return commands with changes"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Devices per page, all if omitted"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    stream: bool = Query(False, description="Stream one device per line as NDJSON"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get diff between pre and post check.
     
+    Diffs are computed once when a postcheck completes and read back here.
+    Nothing is written: postchecks without stored diffs are diffed on the
+    fly, and ``POST /batch/{batch_id}/diff/recompute`` stores them.
+    
+    ``mode=structured`` instead compares tmsh output object by object,
+    reporting added, removed and modified objects and properties. Command
+    outputs are left out of that response.
+    
+    ``view`` trims the payload: ``diffs`` drops the raw outputs and the
+    repeated ``summary.diff``, ``summary`` returns per-device counts only.
+    Text that a view leaves out is not read from the database.
+    
+    With ``limit``, devices are returned in pages ordered by device IP and
+    ``next_cursor`` fetches the following page; it is null on the last one.
+    
+    ``stream`` sends the response as NDJSON instead: a ``batch`` line, one
+    ``device`` line per device as soon as it is built, and an ``end`` line
+    with ``overall_status`` (and ``next_cursor`` when paginating).
+    
     Args:
         batch_id: Batch ID
-        
+        mode: "unified" or "structured"
+        view: "full", "diffs" or "summary"
+        changed_only: Leave unchanged commands out of all_commands
+        limit: Devices per page
+        cursor: Cursor returned with the previous page
+        stream: Stream the response as NDJSON
+    
     Returns:
         200: Diff data
+        400: Invalid cursor
         404: Batch not found
         500: Error generating diff
     """
@@ -31,107 +313,60 @@ async def get_diff(
         logger.info(f"Generating diff for batch_id: {batch_id}")
         
         # Get batch
-        stmt = select(CheckBatch).filter(CheckBatch.batch_id == batch_id)
-        result = await db.execute(stmt)
-        batch = result.scalars().first()
+        await _get_batch(batch_id, db)
         
-        if not batch:
-            logger.error(f"Batch not found: {batch_id}")
-            raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
-        
-        # Get all prechecks for this batch
+        # Get the prechecks of this batch, one page of them if paginating
         stmt = select(PreCheck).filter(PreCheck.batch_id == batch_id)
+        if limit is not None:
+            stmt = stmt.order_by(PreCheck.device_ip, PreCheck.id)
+            if cursor:
+                device_ip, precheck_id = _decode_cursor(cursor)
+                stmt = stmt.filter(or_(
+                    PreCheck.device_ip > device_ip,
+                    and_(PreCheck.device_ip == device_ip, PreCheck.id > precheck_id)
+                ))
+            # One extra row tells whether another page follows
+            stmt = stmt.limit(limit + 1)
         result = await db.execute(stmt)
         prechecks = result.scalars().all()
         
-        if not prechecks:
+        if not prechecks and not cursor:
             logger.warning(f"No prechecks found for batch: {batch_id}")
             raise HTTPException(status_code=404, detail=f"No prechecks found for batch: {batch_id}")
         
-        # Process each precheck to get diff
-        devices_result = []
+        next_cursor = None
+        if limit is not None and len(prechecks) > limit:
+            prechecks = prechecks[:limit]
+            next_cursor = _encode_cursor(prechecks[-1])
         
-        for precheck in prechecks:
-            # Get postcheck for this precheck
-            stmt = select(PostCheck).filter(PostCheck.precheck_id == precheck.id)
-            result = await db.execute(stmt)
-            postcheck = result.scalars().first()
-            
-            if not postcheck:
-                logger.warning(f"No postcheck found for precheck: {precheck.id}")
-                devices_result.append({
-                    "device_ip": precheck.device_ip,
-                    "precheck_id": str(precheck.id),
-                    "postcheck_id": None,
-                    "status": "pending",
-                    "summary": None,
-                    "all_commands": []
-                })
-                continue
-            
-            # Generate diff
-            diff_data = await generate_diff(precheck.id, postcheck.id, precheck.device_ip, db)
-            
-            # Get all commands and their outputs
-            all_commands = []
-            
-            # Get all precheck outputs
-            stmt = select(PreCheckOutput).filter(PreCheckOutput.precheck_id == precheck.id)
-            result = await db.execute(stmt)
-            pre_outputs = result.scalars().all()
-            
-            # Get all postcheck outputs
-            stmt = select(PostCheckOutput).filter(PostCheckOutput.postcheck_id == postcheck.id)
-            result = await db.execute(stmt)
-            post_outputs = result.scalars().all()
-            
-            # Create mapping of command to outputs
-            pre_map = {po.command: po.output for po in pre_outputs}
-            post_map = {po.command: po.output for po in post_outputs}
-            
-            # Process all commands
-            for command in precheck.meta_data.get("commands", []):
-                has_changes = command in diff_data.get("diffs", {})
-                cmd_diff = diff_data.get("diffs", {}).get(command, []) if has_changes else []
-                
-                all_commands.append({
-                    "command": command,
-                    "has_changes": has_changes,
-                    "diff": cmd_diff,
-                    "pre_output": pre_map.get(command, ""),
-                    "post_output": post_map.get(command, "")
-                })
-            
-            devices_result.append({
-                "device_ip": precheck.device_ip,
-                "precheck_id": str(precheck.id),
-                "postcheck_id": str(postcheck.id),
-                "status": diff_data.get("status", "unknown"),
-                "summary": {
-                    "total_commands": diff_data.get("total_commands", 0),
-                    "commands_with_changes": diff_data.get("changes", 0),
-                    "timestamp": postcheck.timestamp,
-                    "diff": diff_data.get("diffs", {})
-                },
-                "all_commands": all_commands
-            })
+        if stream:
+            return StreamingResponse(
+                _stream_diff(
+                    batch_id, prechecks, mode, view, changed_only, limit, next_cursor
+                ),
+                media_type=NDJSON_MEDIA_TYPE
+            )
         
-        # Calculate overall status
-        all_completed = all(device["status"] == "completed" for device in devices_result)
-        any_pending = any(device["status"] == "pending" for device in devices_result)
+        # Process each precheck to get diff
+        devices_result = [
+            await _build_device_diff(precheck, db, mode, view, changed_only)
+            for precheck in prechecks
+        ]
         
-        if any_pending:
-            overall_status = "in_progress"
-        elif all_completed:
-            overall_status = "completed"
+        # Calculate overall status
+        if limit is not None:
+            overall_status = await _overall_status(batch_id, db)
         else:
-            overall_status = "partial"
+            overall_status = _overall_from_devices([device["status"] for device in devices_result])
         
-        return {
+        response = {
             "batch_id": batch_id,
             "devices": devices_result,
             "overall_status": overall_status
         }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -139,4 +374,199 @@ async def get_diff(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate diff: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/batch/{batch_id}/devices/{device_ip}/diff")
+async def get_device_diff(
+    batch_id: str,
+    device_ip: str,
+    mode: str = MODE_QUERY,
+    view: str = VIEW_QUERY,
+    changed_only: bool = Query(False, description="Only return commands with changes"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the diff of one device in a batch.
+    
+    Same entry as in the batch diff's ``devices`` list, with the same
+    ``mode``, ``view`` and ``changed_only`` options.
+    
+    Args:
+        batch_id: Batch ID
+        device_ip: Device IP
+    
+    Returns:
+        200: Device diff
+        404: Batch or device not found
+        500: Error generating diff
+    """
+    try:
+        precheck = await _get_device_precheck(batch_id, device_ip, db)
+        device = await _build_device_diff(precheck, db, mode, view, changed_only)
+        return {"batch_id": batch_id, **device}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error generating diff for device {device_ip}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate diff: {str(e)}"
+        )
+
+@router.get("/batch/{batch_id}/devices/{device_ip}/commands/{index}/diff")
+async def get_command_diff(
+    batch_id: str,
+    device_ip: str,
+    index: int,
+    mode: str = MODE_QUERY,
+    include_outputs: bool = Query(True, description="Include the pre and post output"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the diff of one command of a device.
+    
+    Args:
+        batch_id: Batch ID
+        device_ip: Device IP
+        index: Position of the command in the precheck, starting at 0
+        mode: "unified" or "structured"
+        include_outputs: Include the raw pre and post outputs
+    
+    Returns:
+        200: Command diff
+        404: Batch, device, postcheck or command not found
+        500: Error generating diff
+    """
+    try:
+        precheck = await _get_device_precheck(batch_id, device_ip, db)
+        commands = precheck.meta_data.get("commands", []) if precheck.meta_data else []
+        if not 0 <= index < len(commands):
+            raise HTTPException(
+                status_code=404, detail=f"Command {index} not found for device: {device_ip}"
+            )
+        postcheck = await _get_postcheck(precheck, db)
+        if not postcheck:
+            raise HTTPException(
+                status_code=404, detail=f"No postcheck found for device: {device_ip}"
+            )
+        command = commands[index]
+        
+        if mode == "structured":
+            diff = await get_structured_command_diff(
+                precheck.id, postcheck.id, index, device_ip, db
+            )
+            has_changes = diff is not None
+        else:
+            diff = await get_stored_command_diff(
+                precheck.id, postcheck.id, command, device_ip, db
+            )
+            has_changes = bool(diff)
+            diff = diff or []
+        
+        result = {
+            "batch_id": batch_id,
+            "device_ip": device_ip,
+            "precheck_id": str(precheck.id),
+            "postcheck_id": str(postcheck.id),
+            "index": index,
+            "command": command,
+            "has_changes": has_changes,
+            "diff": diff
+        }
+        if include_outputs:
+            pre_map = await _outputs_by_command(
+                db, PreCheckOutput, PreCheckOutput.precheck_id, precheck.id, [command]
+            )
+            post_map = await _outputs_by_command(
+                db, PostCheckOutput, PostCheckOutput.postcheck_id, postcheck.id, [command]
+            )
+            result["pre_output"] = pre_map.get(command, "")
+            result["post_output"] = post_map.get(command, "")
+        
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error generating diff for device {device_ip}, command {index}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate diff: {str(e)}"
+        )
+
+async def run_diff_job(job: Job):
+    """Job queue handler diffing a batch's stored outputs into the Diff table.
+    
+    Each device is committed on its own, so a retried job only redoes the
+    devices it had not reached.
+    """
+    request = job.payload["request"]
+    device_ip = request.get("device_ip")
+    missing_only = request.get("missing_only", False)
+    
+    async with AsyncSessionLocal() as db:
+        stmt = select(PreCheck).filter(PreCheck.batch_id == job.batch_id)
+        if device_ip:
+            stmt = stmt.filter(PreCheck.device_ip == device_ip)
+        prechecks = (await db.execute(stmt)).scalars().all()
+        
+        stored = 0
+        for precheck in prechecks:
+            postcheck = await _get_postcheck(precheck, db)
+            if not postcheck:
+                continue
+            if missing_only and await has_stored_diff(postcheck.id, db):
+                continue
+            await store_diff(precheck.id, postcheck.id, precheck.device_ip, db)
+            await db.commit()
+            stored += 1
+    logger.info(f"Stored diffs of {stored} device(s) for batch_id: {job.batch_id}")
+
+@router.post("/batch/{batch_id}/diff/recompute", status_code=202)
+async def recompute_diff(
+    batch_id: str,
+    device_ip: Optional[str] = Query(None, description="Only recompute this device"),
+    missing_only: bool = Query(False, description="Only diff postchecks without stored diffs"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue a job that diffs a batch's stored outputs again and stores the result.
+    
+    Replaces the stored diffs, for example after changing the diff engine
+    or the normalization rules. ``missing_only`` fills in diffs of
+    postchecks recorded before diffs were stored, leaving others alone.
+    
+    Args:
+        batch_id: Batch ID
+        device_ip: Only recompute this device
+        missing_only: Skip postchecks that already have stored diffs
+    
+    Returns:
+        202: Recompute job queued
+        404: Batch or device not found
+        500: Internal server error
+    """
+    try:
+        if device_ip:
+            await _get_device_precheck(batch_id, device_ip, db)
+        else:
+            await _get_batch(batch_id, db)
+        
+        job = await enqueue_job(
+            db,
+            kind="diff",
+            batch_id=batch_id,
+            payload={"request": {"device_ip": device_ip, "missing_only": missing_only}}
+        )
+        await db.commit()
+        notify_workers()
+        
+        return {
+            "batch_id": batch_id,
+            "job_id": job.id,
+            "message": "Diff recompute queued"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error queueing diff recompute: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to queue diff recompute: {str(e)}"
+        )
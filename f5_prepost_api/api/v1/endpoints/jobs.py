@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+import logging
+
+from ....models.schemas import JobQueueStats
+from ....core.job_queue import get_queue_stats
+
+router = APIRouter()
+
+# Get logger
+logger = logging.getLogger(__name__)
+
+@router.get("/jobs/stats", response_model=JobQueueStats)
+async def get_job_stats():
+    """Get depth and age metrics of the background job queue.
+    
+    Returns:
+        200: Job counts by status and age of the oldest queued and running job
+        500: Internal server error
+    """
+    try:
+        return await get_queue_stats()
+    except Exception as e:
+        logger.exception(f"Error getting job stats: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get job stats: {str(e)}"
+        )
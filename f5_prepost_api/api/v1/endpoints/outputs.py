@@ -1,22 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Set, Tuple
+import asyncio
+import gzip
+import hashlib
 import logging
+import re
 
-from ....database import get_db, CheckBatch, PreCheck, PostCheck, PreCheckOutput, PostCheckOutput
+from ....database import get_db, AsyncSessionLocal, CheckBatch, PreCheck, PostCheck, PreCheckOutput, PostCheckOutput
 from ....models.schemas import BatchOutputResponse
+from ....utils.ndjson import NDJSON_MEDIA_TYPE, ndjson_line
+from .status import current_postcheck_id
 
 router = APIRouter()
 
 # Get logger
 logger = logging.getLogger(__name__)
 
+async def _device_outputs(
+    precheck: PreCheck,
+    command: Optional[str],
+    db: AsyncSession
+) -> Dict:
+    """Build one device's entry of the batch outputs response."""
+    # Get precheck outputs
+    precheck_output_query = select(PreCheckOutput).filter(PreCheckOutput.precheck_id == precheck.id)
+    if command:
+        precheck_output_query = precheck_output_query.filter(PreCheckOutput.command == command)
+    precheck_output_result = await db.execute(precheck_output_query)
+    precheck_outputs = precheck_output_result.scalars().all()
+    
+    # Get the postcheck batch status reports for this precheck
+    postcheck_id = await current_postcheck_id(db, precheck.id)
+    postcheck = await db.get(PostCheck, postcheck_id) if postcheck_id else None
+    
+    postcheck_outputs = []
+    if postcheck:
+        # Get postcheck outputs
+        postcheck_output_query = select(PostCheckOutput).filter(PostCheckOutput.postcheck_id == postcheck.id)
+        if command:
+            postcheck_output_query = postcheck_output_query.filter(PostCheckOutput.command == command)
+        postcheck_output_result = await db.execute(postcheck_output_query)
+        postcheck_outputs = postcheck_output_result.scalars().all()
+    
+    # Organize command outputs
+    commands_output = []
+    
+    # Create a map of all commands
+    command_map = {}
+    
+    # Add precheck commands
+    for po in precheck_outputs:
+        if po.command not in command_map:
+            command_map[po.command] = {
+                "command": po.command,
+                "pre_output": po.output,
+                "post_output": None,
+                "has_postcheck": False
+            }
+        else:
+            command_map[po.command]["pre_output"] = po.output
+    
+    # Add postcheck commands
+    for po in postcheck_outputs:
+        if po.command not in command_map:
+            command_map[po.command] = {
+                "command": po.command,
+                "pre_output": None,
+                "post_output": po.output,
+                "has_postcheck": True
+            }
+        else:
+            command_map[po.command]["post_output"] = po.output
+            command_map[po.command]["has_postcheck"] = True
+    
+    # Convert map to list sorted by command
+    commands_output = list(command_map.values())
+    commands_output.sort(key=lambda x: x["command"])
+    
+    return {
+        "device_ip": precheck.device_ip,
+        "precheck_id": str(precheck.id),
+        "postcheck_id": str(postcheck.id) if postcheck else None,
+        "precheck_status": precheck.status,
+        "postcheck_status": postcheck.status if postcheck else None,
+        "commands": commands_output
+    }
+
+async def _stream_outputs(
+    batch: CheckBatch,
+    prechecks: List[PreCheck],
+    command: Optional[str]
+) -> AsyncIterator[bytes]:
+    """Yield batch outputs as NDJSON, one device record at a time.
+    
+    Reads through a session of its own, since the request's session is
+    closed once streaming starts.
+    """
+    yield ndjson_line("batch", {
+        "batch_id": batch.batch_id,
+        "status": batch.status,
+        "total_devices": batch.total_devices,
+        "completed_devices": batch.completed_devices
+    })
+    try:
+        async with AsyncSessionLocal() as db:
+            for precheck in prechecks:
+                device = await _device_outputs(precheck, command, db)
+                db.expunge_all()
+                yield ndjson_line("device", device)
+    except Exception as e:
+        logger.exception(f"Error streaming outputs for batch {batch.batch_id}: {str(e)}")
+        yield ndjson_line("error", {"detail": f"Failed to get batch outputs: {str(e)}"})
+        return
+    yield ndjson_line("end", {"devices": len(prechecks)})
+
 @router.get("/batch/{batch_id}/outputs", response_model=BatchOutputResponse)
 async def get_batch_outputs(
     batch_id: str,
     device_ip: Optional[str] = Query(None, description="Filter outputs by device IP"),
     command: Optional[str] = Query(None, description="Filter outputs by command"),
+    stream: bool = Query(False, description="Stream one device per line as NDJSON"),
     db: AsyncSession = Depends(get_db)
 ):
     """Get precheck and postcheck outputs for a batch.
@@ -25,6 +131,8 @@ async def get_batch_outputs(
         batch_id: Batch ID to get outputs for
         device_ip: Optional filter by device IP
         command: Optional filter by command
+        stream: Stream the response as NDJSON: a batch line, one device
+            line per device and an end line
         db: Database session
         
     Returns:
@@ -51,74 +159,16 @@ async def get_batch_outputs(
         precheck_result = await db.execute(precheck_query)
         prechecks = precheck_result.scalars().all()
         
-        devices_output = []
+        if stream:
+            return StreamingResponse(
+                _stream_outputs(batch, prechecks, command),
+                media_type=NDJSON_MEDIA_TYPE
+            )
         
         # Process each precheck
-        for precheck in prechecks:
-            # Get precheck outputs
-            precheck_output_query = select(PreCheckOutput).filter(PreCheckOutput.precheck_id == precheck.id)
-            if command:
-                precheck_output_query = precheck_output_query.filter(PreCheckOutput.command == command)
-            precheck_output_result = await db.execute(precheck_output_query)
-            precheck_outputs = precheck_output_result.scalars().all()
-            
-            # Get postcheck for this precheck
-            postcheck_query = select(PostCheck).filter(PostCheck.precheck_id == precheck.id)
-            postcheck_result = await db.execute(postcheck_query)
-            postcheck = postcheck_result.scalars().first()
-            
-            postcheck_outputs = []
-            if postcheck:
-                # Get postcheck outputs
-                postcheck_output_query = select(PostCheckOutput).filter(PostCheckOutput.postcheck_id == postcheck.id)
-                if command:
-                    postcheck_output_query = postcheck_output_query.filter(PostCheckOutput.command == command)
-                postcheck_output_result = await db.execute(postcheck_output_query)
-                postcheck_outputs = postcheck_output_result.scalars().all()
-            
-            # Organize command outputs
-            commands_output = []
-            
-            # Create a map of all commands
-            command_map = {}
-            
-            # Add precheck commands
-            for po in precheck_outputs:
-                if po.command not in command_map:
-                    command_map[po.command] = {
-                        "command": po.command,
-                        "pre_output": po.output,
-                        "post_output": None,
-                        "has_postcheck": False
-                    }
-                else:
-                    command_map[po.command]["pre_output"] = po.output
-            
-            # Add postcheck commands
-            for po in postcheck_outputs:
-                if po.command not in command_map:
-                    command_map[po.command] = {
-                        "command": po.command,
-                        "pre_output": None,
-                        "post_output": po.output,
-                        "has_postcheck": True
-                    }
-                else:
-                    command_map[po.command]["post_output"] = po.output
-                    command_map[po.command]["has_postcheck"] = True
-            
-            # Convert map to list sorted by command
-            commands_output = list(command_map.values())
-            commands_output.sort(key=lambda x: x["command"])
-            
-            devices_output.append({
-                "device_ip": precheck.device_ip,
-                "precheck_id": str(precheck.id),
-                "postcheck_id": str(postcheck.id) if postcheck else None,
-                "precheck_status": precheck.status,
-                "postcheck_status": postcheck.status if postcheck else None,
-                "commands": commands_output
-            })
+        devices_output = [
+            await _device_outputs(precheck, command, db) for precheck in prechecks
+        ]
         
         return {
             "batch_id": batch_id,
@@ -134,4 +184,184 @@ async def get_batch_outputs(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get batch outputs: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+# Output tables by check phase
+OUTPUT_MODELS = {
+    "pre": (PreCheckOutput, PreCheckOutput.precheck_id),
+    "post": (PostCheckOutput, PostCheckOutput.postcheck_id),
+}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single byte range into inclusive (start, end) offsets.
+    
+    Returns:
+        None for headers this endpoint ignores (multiple ranges, other
+        units), in which case the whole output is sent
+    
+    Raises:
+        HTTPException: 416 if the range cannot be satisfied
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.group(1), match.group(2)
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+# Caching headers of raw outputs, repeated on 304 responses as RFC 9110 requires
+CACHE_HEADERS = {
+    "Cache-Control": "private, max-age=31536000, immutable",
+    "Vary": "Accept-Encoding"
+}
+
+def _etag_candidates(header: Optional[str]) -> Set[str]:
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+def _etag_matches(header: Optional[str], etags: Tuple[str, ...]) -> bool:
+    candidates = _etag_candidates(header)
+    return "*" in candidates or any(etag in candidates for etag in etags)
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+def _not_modified(request: Request, etag: str, gzip_etag: str) -> Optional[Response]:
+    """304 response if the client's copy is current, None otherwise.
+    
+    The response repeats the tag the client holds, so a cached gzip
+    representation is revalidated with its ``-gzip`` tag.
+    """
+    header = request.headers.get("if-none-match")
+    if not _etag_matches(header, (etag, gzip_etag)):
+        return None
+    candidates = _etag_candidates(header)
+    if gzip_etag in candidates or (etag not in candidates and _accepts_gzip(request)):
+        etag = gzip_etag
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+@router.get("/batch/{batch_id}/devices/{device_ip}/commands/{index}/output/{phase}")
+async def get_raw_output(
+    batch_id: str,
+    device_ip: str,
+    index: int,
+    phase: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get one command output as plain text.
+    
+    Outputs never change once written, so the response carries a strong
+    ``ETag`` (the output's SHA-256 digest) and ``If-None-Match`` is answered
+    with 304. A single ``Range: bytes=...`` is served as 206 Partial
+    Content, letting viewers page through large outputs; ``If-Range`` is
+    honoured. Whole responses are gzip-compressed when the client accepts
+    it.
+    
+    Args:
+        batch_id: Batch ID
+        device_ip: Device IP
+        index: Position of the command in the check, starting at 0
+        phase: "pre" or "post"
+        
+    Returns:
+        200: Output text
+        206: Requested byte range of the output
+        304: Output unchanged since the client's copy
+        404: Batch, device, check or output not found
+        416: Range not satisfiable
+        500: Internal server error
+    """
+    try:
+        if phase not in OUTPUT_MODELS:
+            raise HTTPException(status_code=404, detail=f"Unknown phase: {phase}")
+        model, check_column = OUTPUT_MODELS[phase]
+        
+        precheck_query = select(PreCheck.id).filter(
+            PreCheck.batch_id == batch_id, PreCheck.device_ip == device_ip
+        ).limit(1)
+        precheck_id = (await db.execute(precheck_query)).scalar_one_or_none()
+        if precheck_id is None:
+            raise HTTPException(
+                status_code=404, detail=f"Device {device_ip} not found in batch: {batch_id}"
+            )
+        check_id = precheck_id
+        if phase == "post":
+            check_id = await current_postcheck_id(db, precheck_id)
+            if check_id is None:
+                raise HTTPException(
+                    status_code=404, detail=f"No postcheck found for device: {device_ip}"
+                )
+        
+        # Answer conditional requests from the digest alone, without reading the text
+        digest_query = select(model.id, model.output_digest).filter(
+            check_column == check_id, model.execution_order == index
+        ).limit(1)
+        row = (await db.execute(digest_query)).first()
+        if row is None:
+            raise HTTPException(
+                status_code=404, detail=f"Output {index} not found for device: {device_ip}"
+            )
+        
+        etag = f'"{row.output_digest}"' if row.output_digest else None
+        gzip_etag = f'"{row.output_digest}-gzip"' if row.output_digest else None
+        if etag:
+            not_modified = _not_modified(request, etag, gzip_etag)
+            if not_modified is not None:
+                return not_modified
+        
+        output = (await db.execute(select(model.output).filter(model.id == row.id))).scalar_one()
+        body = (output or "").encode("utf-8")
+        if etag is None:
+            # Rows stored before digests existed
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            gzip_etag = etag[:-1] + '-gzip"'
+            not_modified = _not_modified(request, etag, gzip_etag)
+            if not_modified is not None:
+                return not_modified
+        
+        headers = {"ETag": etag, "Accept-Ranges": "bytes", **CACHE_HEADERS}
+        media_type = "text/plain; charset=utf-8"
+        
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            byte_range = _parse_range(range_header, len(body))
+            if byte_range is not None:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                return Response(
+                    content=body[start:end + 1],
+                    status_code=206,
+                    media_type=media_type,
+                    headers=headers
+                )
+        
+        if _accepts_gzip(request):
+            body = await asyncio.to_thread(gzip.compress, body, 6)
+            headers["Content-Encoding"] = "gzip"
+            headers["ETag"] = gzip_etag
+        return Response(content=body, media_type=media_type, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error getting raw output: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get output: {str(e)}"
+        )
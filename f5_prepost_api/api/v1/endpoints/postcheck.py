@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uuid
 from datetime import datetime
 import logging
 
-from ....database import get_db, CheckBatch, PreCheck, PostCheck, PostCheckOutput, ensure_str_uuid
+from ....database import get_db, CheckBatch, PreCheck, PostCheck, Job, ensure_str_uuid
 from ....models.schemas import (
     PostCheckRequest,
     PostCheckResponse,
     DeviceCredentials
 )
 from ....core.device_manager import DeviceManager
+from ....core.job_queue import enqueue_job, notify_workers, unseal_payload
+from ....core.result_writer import get_result_writer
+from ....utils.diff_utils import compare_outputs_async, diff_rows, load_precheck_outputs, output_digest
+from ....utils.normalization import normalized_digest
+from .precheck import CHECK_STATUS_BY_RESULT, event_bus, execution_meta_data
 
 router = APIRouter()
 
@@ -22,12 +27,127 @@ logger = logging.getLogger(__name__)
 # Get device manager instance
 device_manager = DeviceManager()
 
+async def _build_diffs(
+    precheck: PreCheck,
+    postcheck_id: str,
+    outputs: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Diff postcheck outputs against the precheck outputs as Diff rows."""
+    from ....database import AsyncSessionLocal
+    
+    post_outputs = [
+        (o["command"], o["output"], o["normalized_digest"] or o["output_digest"]) for o in outputs
+    ]
+    async with AsyncSessionLocal() as db_outputs:
+        # Only outputs whose digests differ are loaded
+        pre_outputs = await load_precheck_outputs(precheck.id, db_outputs, post_outputs)
+    
+    compared = await compare_outputs_async(pre_outputs, post_outputs, precheck.device_ip)
+    return diff_rows(precheck.id, postcheck_id, compared)
+
+async def _process_postcheck_device(
+    request: PostCheckRequest,
+    device: DeviceCredentials,
+    device_to_precheck: Dict[str, PreCheck],
+    job_id: Optional[str] = None
+):
+    """Run postcheck commands on a single device and store the results."""
+    try:
+        logger.info(f"Processing postcheck for device: {device.device_ip}")
+        
+        # Check if there's a precheck for this device
+        precheck = device_to_precheck.get(device.device_ip)
+        if not precheck:
+            logger.warning(f"No precheck found for device: {device.device_ip}")
+            return
+        
+        # Get the commands from precheck metadata
+        if not precheck.meta_data or "commands" not in precheck.meta_data:
+            logger.warning(f"No commands found in precheck for device: {device.device_ip}")
+            return
+        
+        commands = precheck.meta_data["commands"]
+        
+        # Get handler
+        handler = device_manager.get_handler(
+            device_ip=device.device_ip,
+            username=device.username,
+            password=device.password
+        )
+        
+        # Execute commands
+        event_bus.device_event(precheck.batch_id, "postcheck", device.device_ip, "connecting")
+        device_result = await handler.execute_commands_async(
+            commands,
+            on_command=event_bus.command_progress(precheck.batch_id, "postcheck", device.device_ip)
+        )
+        postcheck_id = str(uuid.uuid4())
+        check_status = CHECK_STATUS_BY_RESULT.get(device_result["status"], "failed")
+        
+        # Hand the records to the shared writer, which commits them in a
+        # grouped transaction with other devices' results
+        outputs = []
+        diffs = None
+        if device_result["status"] == "success":
+            for idx, (command, output) in enumerate(device_result["results"].items()):
+                outputs.append({
+                    "postcheck_id": postcheck_id,
+                    "command": command,
+                    "output": output,
+                    "output_digest": output_digest(output),
+                    "normalized_digest": normalized_digest(command, output),
+                    "execution_order": idx
+                })
+            # Diff once now so the diff endpoint only reads stored results.
+            # A failed diff must not cost the captured outputs: they are
+            # stored without Diff rows, which the recompute job can rebuild.
+            try:
+                diffs = await _build_diffs(precheck, postcheck_id, outputs)
+            except Exception as diff_error:
+                logger.exception(
+                    f"Error diffing postcheck for device {device.device_ip}, "
+                    f"storing outputs without diffs: {str(diff_error)}"
+                )
+        await get_result_writer().write_postcheck(
+            {
+                "id": postcheck_id,
+                "precheck_id": precheck.id,  # Already a string from the database
+                "status": check_status,
+                "created_by": request.created_by,
+                "meta_data": {**execution_meta_data(device_result), "job_id": job_id}
+            },
+            outputs,
+            diffs
+        )
+        event_bus.device_event(
+            precheck.batch_id, "postcheck", device.device_ip, check_status,
+            precheck_id=precheck.id, postcheck_id=postcheck_id,
+            error=device_result.get("error")
+        )
+    except Exception as device_error:
+        logger.exception(
+            f"Error processing device {device.device_ip}: {str(device_error)}"
+        )
+        precheck = device_to_precheck.get(device.device_ip)
+        if precheck:
+            event_bus.device_event(
+                precheck.batch_id, "postcheck", device.device_ip, "failed",
+                error=str(device_error)
+            )
+
 async def process_postcheck(
     request: PostCheckRequest,
     batch_id: str,
-    db_url: str
+    job_id: Optional[str] = None
 ):
-    """Process postcheck operations in the background."""
+    """Process postcheck operations in the background.
+    
+    Args:
+        request: Postcheck request with device credentials
+        batch_id: Batch to run the postcheck for
+        job_id: Queue job running this postcheck; devices already recorded
+            by an earlier attempt of the same job are skipped
+    """
     from ....database import AsyncSessionLocal
     
     try:
@@ -54,70 +174,64 @@ async def process_postcheck(
             
             # Create a mapping of device_ip to precheck
             device_to_precheck = {pc.device_ip: pc for pc in prechecks}
-        
-        # Process each device with a new session
-        for device in request.devices:
-            try:
-                logger.info(f"Processing postcheck for device: {device.device_ip}")
-                
-                # Check if there's a precheck for this device
-                precheck = device_to_precheck.get(device.device_ip)
-                if not precheck:
-                    logger.warning(f"No precheck found for device: {device.device_ip}")
-                    continue
-                
-                # Get the commands from precheck metadata
-                if not precheck.meta_data or "commands" not in precheck.meta_data:
-                    logger.warning(f"No commands found in precheck for device: {device.device_ip}")
-                    continue
-                
-                commands = precheck.meta_data["commands"]
-                
-                # Get handler
-                handler = device_manager.get_handler(
-                    device_ip=device.device_ip,
-                    username=device.username,
-                    password=device.password
-                )
-                
-                # Execute commands
-                device_result = await handler.execute_commands_async(commands)
-                postcheck_id = str(uuid.uuid4())
-                
-                # Use a new session for this device's transaction
-                async with AsyncSessionLocal() as db_device:
-                    async with db_device.begin():
-                        # Create postcheck record
-                        postcheck = PostCheck(
-                            id=postcheck_id,
-                            precheck_id=precheck.id,  # Already a string from the database
-                            status="completed" if device_result["status"] == "success" else "failed",
-                            created_by=request.created_by
-                        )
-                        db_device.add(postcheck)
-                        
-                        if device_result["status"] == "success":
-                            # Save command outputs
-                            for idx, (command, output) in enumerate(device_result["results"].items()):
-                                postcheck_output = PostCheckOutput(
-                                    postcheck_id=postcheck_id,
-                                    command=command,
-                                    output=output,
-                                    execution_order=idx
-                                )
-                                db_device.add(postcheck_output)
-            except Exception as device_error:
-                logger.exception(
-                    f"Error processing device {device.device_ip}: {str(device_error)}"
+            
+            # Find devices already recorded by an earlier, interrupted run of this job
+            done_prechecks = set()
+            if job_id:
+                stmt = select(PostCheck).filter(
+                    PostCheck.precheck_id.in_([pc.id for pc in prechecks])
                 )
+                postcheck_result = await db_prechecks.execute(stmt)
+                done_prechecks = {
+                    pc.precheck_id for pc in postcheck_result.scalars().all()
+                    if (pc.meta_data or {}).get("job_id") == job_id
+                }
+        
+        pending_devices = [
+            d for d in request.devices
+            if d.device_ip not in device_to_precheck
+            or device_to_precheck[d.device_ip].id not in done_prechecks
+        ]
+        if done_prechecks:
+            logger.info(
+                f"Resuming postcheck for batch_id: {batch_id}, "
+                f"{len(done_prechecks)} devices already processed"
+            )
+        
+        # Process devices concurrently within the configured limits
+        await device_manager.run_for_devices(
+            pending_devices,
+            lambda device: _process_postcheck_device(request, device, device_to_precheck, job_id)
+        )
+        event_bus.publish(batch_id, {"type": "batch", "phase": "postcheck", "status": "finished"})
     except Exception as e:
         logger.exception(f"Error processing postcheck: {str(e)}")
+        # The job queue requeues the job or marks it failed
+        raise
+
+async def run_postcheck_job(job: Job):
+    """Job queue handler running a queued postcheck.
+    
+    Errors propagate so the worker requeues the job; when the last attempt
+    fails, open event streams are told the postcheck failed.
+    """
+    request = PostCheckRequest(**unseal_payload(job.payload)["request"])
+    try:
+        await process_postcheck(request=request, batch_id=job.batch_id, job_id=job.id)
+    except Exception as e:
+        if job.attempts >= job.max_attempts:
+            event_bus.publish(job.batch_id, {
+                "type": "batch",
+                "phase": "postcheck",
+                "status": "failed",
+                "error": str(e)
+            })
+        raise
 
 @router.post("/postcheck/{batch_id}", response_model=PostCheckResponse, status_code=202)
 async def create_postcheck(
     batch_id: str,
     request: PostCheckRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Create post-change verification check for F5 devices.
@@ -158,15 +272,15 @@ async def create_postcheck(
                 "status": "initiated" if precheck else "skipped"
             })
         
-        # Schedule background task
-        from ....config import settings
-        from ....database import DATABASE_URL
-        background_tasks.add_task(
-            process_postcheck,
-            request=request,
+        # Queue the work; the API returns without holding any execution state
+        await enqueue_job(
+            db,
+            kind="postcheck",
             batch_id=batch_id,
-            db_url=getattr(settings, 'DATABASE_URL', DATABASE_URL)
+            payload={"request": request.model_dump()}
         )
+        await db.commit()
+        notify_workers()
         
         return {
             "batch_id": batch_id,
@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update
+from typing import List, Dict, Any
 import uuid
 from datetime import datetime
 import logging
 
-from ....database import get_db, CheckBatch, PreCheck, PreCheckOutput
+from ....database import get_db, CheckBatch, PreCheck, Job
 from ....models.schemas import (
     PreCheckRequest,
     PreCheckResponse,
     DeviceCredentials
 )
 from ....core.device_manager import DeviceManager
+from ....core.job_queue import enqueue_job, notify_workers, unseal_payload
+from ....core.result_writer import get_result_writer
+from ....core.events import BatchEventBus
+from ....utils.diff_utils import output_digest
+from ....utils.normalization import normalized_digest
 
 router = APIRouter()
 
@@ -22,10 +27,87 @@ logger = logging.getLogger(__name__)
 # Get device manager instance
 device_manager = DeviceManager()
 
-async def process_precheck(
+# Progress events for /batch/{batch_id}/events streams
+event_bus = BatchEventBus()
+
+# Check status recorded for each device execution result status
+CHECK_STATUS_BY_RESULT = {
+    "success": "completed",
+    "unavailable": "unreachable",  # Circuit open, device was not contacted
+}
+
+def execution_meta_data(device_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build check metadata describing how a device execution went."""
+    meta_data = {"attempts": device_result.get("attempts", 1)}
+    if device_result["status"] != "success":
+        meta_data["error"] = device_result.get("error")
+    return meta_data
+
+async def _process_precheck_device(
     request: PreCheckRequest,
     batch_id: str,
-    db_url: str
+    device: DeviceCredentials
+):
+    """Run precheck commands on a single device and store the results."""
+    try:
+        logger.info(f"Processing device: {device.device_ip}")
+        
+        # Get handler from device manager - reuse if possible
+        handler = device_manager.get_handler(
+            device_ip=device.device_ip,
+            username=device.username,
+            password=device.password
+        )
+        
+        event_bus.device_event(batch_id, "precheck", device.device_ip, "connecting")
+        device_result = await handler.execute_commands_async(
+            request.commands,
+            on_command=event_bus.command_progress(batch_id, "precheck", device.device_ip)
+        )
+        precheck_id = str(uuid.uuid4())
+        succeeded = device_result["status"] == "success"
+        check_status = CHECK_STATUS_BY_RESULT.get(device_result["status"], "failed")
+        
+        # Hand the records to the shared writer, which commits them in a
+        # grouped transaction and bumps the batch completion count in SQL
+        outputs = []
+        if succeeded:
+            for idx, (command, output) in enumerate(device_result["results"].items()):
+                outputs.append({
+                    "precheck_id": precheck_id,
+                    "command": command,
+                    "output": output,
+                    "output_digest": output_digest(output),
+                    "normalized_digest": normalized_digest(command, output),
+                    "execution_order": idx
+                })
+        await get_result_writer().write_precheck(
+            {
+                "id": precheck_id,
+                "batch_id": batch_id,
+                "device_ip": device.device_ip,
+                "status": check_status,
+                "created_by": request.created_by if hasattr(request, 'created_by') else None,
+                "meta_data": {"commands": request.commands, **execution_meta_data(device_result)}
+            },
+            outputs,
+            completed=succeeded
+        )
+        event_bus.device_event(
+            batch_id, "precheck", device.device_ip, check_status,
+            precheck_id=precheck_id, error=device_result.get("error")
+        )
+    except Exception as device_error:
+        logger.exception(
+            f"Error processing device {device.device_ip}: {str(device_error)}"
+        )
+        event_bus.device_event(
+            batch_id, "precheck", device.device_ip, "failed", error=str(device_error)
+        )
+
+async def process_precheck(
+    request: PreCheckRequest,
+    batch_id: str
 ):
     """Process precheck operations in the background."""
     from ....database import AsyncSessionLocal
@@ -41,61 +123,23 @@ async def process_precheck(
             if not batch:
                 logger.error(f"Batch {batch_id} not found")
                 return
+            
+            # Skip devices already recorded by an earlier, interrupted run
+            stmt = select(PreCheck.device_ip).filter(PreCheck.batch_id == batch_id)
+            done_devices = set((await db_batch.execute(stmt)).scalars().all())
         
-        # Process each device with better error handling
-        for device in request.devices:
-            try:
-                logger.info(f"Processing device: {device.device_ip}")
-                
-                # Get handler from device manager - reuse if possible
-                handler = device_manager.get_handler(
-                    device_ip=device.device_ip,
-                    username=device.username,
-                    password=device.password
-                )
-                
-                device_result = await handler.execute_commands_async(request.commands)
-                precheck_id = str(uuid.uuid4())
-                
-                # Use a new session for each device transaction
-                async with AsyncSessionLocal() as db_device:
-                    async with db_device.begin():
-                        # Create precheck record
-                        precheck = PreCheck(
-                            id=precheck_id,
-                            batch_id=batch_id,
-                            device_ip=device.device_ip,
-                            status="completed" if device_result["status"] == "success" else "failed",
-                            created_by=request.created_by if hasattr(request, 'created_by') else None,
-                            meta_data={"commands": request.commands}
-                        )
-                        db_device.add(precheck)
-                        
-                        if device_result["status"] == "success":
-                            # Save command outputs
-                            for idx, (command, output) in enumerate(device_result["results"].items()):
-                                precheck_output = PreCheckOutput(
-                                    precheck_id=precheck_id,
-                                    command=command,
-                                    output=output,
-                                    execution_order=idx
-                                )
-                                db_device.add(precheck_output)
-                
-                # Update batch completion count in a separate session
-                async with AsyncSessionLocal() as db_update:
-                    async with db_update.begin():
-                        # Get the latest batch data
-                        stmt = select(CheckBatch).filter(CheckBatch.batch_id == batch_id)
-                        update_query_result = await db_update.execute(stmt)
-                        current_batch = update_query_result.scalars().first()
-                        
-                        if current_batch and device_result["status"] == "success":
-                            current_batch.completed_devices += 1
-            except Exception as device_error:
-                logger.exception(
-                    f"Error processing device {device.device_ip}: {str(device_error)}"
-                )
+        pending_devices = [d for d in request.devices if d.device_ip not in done_devices]
+        if done_devices:
+            logger.info(
+                f"Resuming precheck for batch_id: {batch_id}, "
+                f"{len(done_devices)} devices already processed"
+            )
+        
+        # Process devices concurrently within the configured limits
+        await device_manager.run_for_devices(
+            pending_devices,
+            lambda device: _process_precheck_device(request, batch_id, device)
+        )
         
         # Update batch status in a final separate session
         async with AsyncSessionLocal() as db_final:
@@ -115,13 +159,54 @@ async def process_precheck(
                         f"Batch status: {final_batch.status}, "
                         f"completed devices: {final_batch.completed_devices}/{final_batch.total_devices}"
                     )
+            if final_batch:
+                event_bus.publish(batch_id, {
+                    "type": "batch",
+                    "phase": "precheck",
+                    "status": final_batch.status,
+                    "completed_devices": final_batch.completed_devices,
+                    "total_devices": final_batch.total_devices
+                })
     except Exception as e:
         logger.exception(f"Error processing precheck: {str(e)}")
+        # The job queue requeues the job or marks it failed
+        raise
+
+async def _mark_batch_failed(batch_id: str, error: str):
+    """Mark a batch failed once its precheck job has no attempts left."""
+    from ....database import AsyncSessionLocal
+    
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await db.execute(
+                update(CheckBatch)
+                .where(CheckBatch.batch_id == batch_id)
+                .values(status="failed")
+            )
+    event_bus.publish(batch_id, {
+        "type": "batch",
+        "phase": "precheck",
+        "status": "failed",
+        "error": error
+    })
+
+async def run_precheck_job(job: Job):
+    """Job queue handler running a queued precheck.
+    
+    Errors propagate so the worker requeues the job; when the last attempt
+    fails the batch is marked failed instead of staying "initiated".
+    """
+    request = PreCheckRequest(**unseal_payload(job.payload)["request"])
+    try:
+        await process_precheck(request=request, batch_id=job.batch_id)
+    except Exception as e:
+        if job.attempts >= job.max_attempts:
+            await _mark_batch_failed(job.batch_id, str(e))
+        raise
 
 @router.post("/precheck", response_model=PreCheckResponse, status_code=202)
 async def create_precheck(
     request: PreCheckRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Create pre-change verification check for F5 devices.
@@ -167,6 +252,15 @@ async def create_precheck(
             )
             db.add(batch)
             
+            # Queue the work in the same transaction so it is never lost
+            await enqueue_job(
+                db,
+                kind="precheck",
+                batch_id=batch_id,
+                payload={"request": request.model_dump()}
+            )
+        notify_workers()
+            
         # Prepare response
         checks = []
         for device in request.devices:
@@ -176,16 +270,6 @@ async def create_precheck(
                 "status": "initiated"
             })
         
-        # Schedule background task
-        from ....config import settings
-        from ....database import DATABASE_URL
-        background_tasks.add_task(
-            process_precheck,
-            request=request,
-            batch_id=batch_id,
-            db_url=getattr(settings, 'DATABASE_URL', DATABASE_URL)
-        )
-        
         return {
             "batch_id": batch_id,
             "checks": checks,
@@ -1,19 +1,138 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 from sqlalchemy import select, func
+import asyncio
+import json
 import logging
 
-from ....database import get_db, CheckBatch, PreCheck, PostCheck
+from ....config import settings
+from ....database import get_db, AsyncSessionLocal, CheckBatch, DeviceProgress, PostCheck
 from ....models.schemas import BatchStatusResponse
+from ....core.events import BatchEventBus
 
 router = APIRouter()
 
 # Get logger instead of configuring it
 logger = logging.getLogger(__name__)
 
+# Progress events published by the device workers
+event_bus = BatchEventBus()
+
+def device_status(progress: DeviceProgress) -> Dict[str, Any]:
+    """Derive a device's overall status and progress from its progress row."""
+    status = "in_progress"
+    progress_pct = 50  # Default to 50% if only precheck is done
+    status_detail = "precheck_completed"
+    
+    if progress.precheck_status in ("failed", "unreachable"):
+        status = "failed"
+        progress_pct = 0
+        status_detail = f"precheck_{progress.precheck_status}"
+    elif progress.postcheck_id:
+        if progress.postcheck_status == "completed":
+            status = "completed"
+            progress_pct = 100
+            status_detail = "postcheck_completed"
+        elif progress.postcheck_status in ("failed", "unreachable"):
+            status = "failed"
+            progress_pct = 75  # Changed from 50 to 75 to indicate postcheck was attempted
+            status_detail = f"postcheck_{progress.postcheck_status}"
+        else:
+            status = "in_progress"
+            progress_pct = 75
+            status_detail = "postcheck_in_progress"
+    
+    return {
+        "device_ip": progress.device_ip,
+        "precheck_id": progress.precheck_id,
+        "postcheck_id": progress.postcheck_id,
+        "status": status,
+        "status_detail": status_detail,
+        "progress": progress_pct
+    }
+
+async def load_batch_status(db: AsyncSession, batch_id: str) -> Optional[Dict[str, Any]]:
+    """Build the status of a batch from its batch and device_progress rows.
+    
+    Two indexed queries regardless of the number of devices.
+    
+    Returns:
+        BatchStatusResponse fields, or None if the batch does not exist
+    """
+    # Get the batch
+    batch_stmt = select(CheckBatch).filter(CheckBatch.batch_id == batch_id)
+    batch_result = await db.execute(batch_stmt)
+    batch = batch_result.scalar_one_or_none()
+    
+    if not batch:
+        return None
+    
+    # One progress row per device, kept current by the result writer
+    progress_stmt = (
+        select(DeviceProgress)
+        .filter(DeviceProgress.batch_id == batch_id)
+        .order_by(DeviceProgress.device_ip)
+    )
+    progress_result = await db.execute(progress_stmt)
+    progress_rows = progress_result.scalars().all()
+    
+    if not progress_rows:
+        return {
+            "batch_id": batch_id,
+            "total_devices": batch.total_devices,
+            "completed_devices": 0,
+            "status": "initiated",
+            "devices": []
+        }
+    
+    devices = [device_status(progress) for progress in progress_rows]
+    completed_count = sum(1 for device in devices if device["status"] == "completed")
+    
+    # Determine overall batch status
+    overall_status = batch.status
+    if overall_status not in ["completed", "failed", "partial"]:
+        # Recalculate status if it's not finalized
+        if any(device["status"] == "failed" for device in devices):
+            overall_status = "failed"
+        elif all(device["status"] == "completed" for device in devices):
+            overall_status = "completed"
+        elif any(device["status"] == "in_progress" for device in devices):
+            overall_status = "in_progress"
+        else:
+            overall_status = "partial"
+    
+    return {
+        "batch_id": batch_id,
+        "total_devices": batch.total_devices,
+        "completed_devices": completed_count,
+        "status": overall_status,
+        "devices": devices
+    }
+
+async def current_postcheck_id(db: AsyncSession, precheck_id: str) -> Optional[str]:
+    """Id of the postcheck that batch status reports for a precheck.
+    
+    After a re-run the device's progress row points at the latest recorded
+    postcheck; prechecks without one fall back to the newest postcheck.
+    
+    Returns:
+        The postcheck id, or None if the device has no postcheck yet
+    """
+    progress_stmt = select(DeviceProgress.postcheck_id).filter(
+        DeviceProgress.precheck_id == precheck_id
+    )
+    postcheck_id = (await db.execute(progress_stmt)).scalar_one_or_none()
+    if postcheck_id is None:
+        postcheck_stmt = select(PostCheck.id).filter(
+            PostCheck.precheck_id == precheck_id
+        ).order_by(PostCheck.timestamp.desc()).limit(1)
+        postcheck_id = (await db.execute(postcheck_stmt)).scalar_one_or_none()
+    return postcheck_id
+
 @router.get("/batch/{batch_id}/status", response_model=BatchStatusResponse, status_code=200)
 async def get_batch_status(
     batch_id: UUID,
@@ -21,95 +140,104 @@ async def get_batch_status(
 ):
     """Get status of a batch check operation."""
     try:
-        # Get the batch
-        batch_stmt = select(CheckBatch).filter(CheckBatch.batch_id == str(batch_id))
-        batch_result = await db.execute(batch_stmt)
-        batch = batch_result.scalar_one_or_none()
-        
-        if not batch:
+        batch_status = await load_batch_status(db, str(batch_id))
+        if batch_status is None:
             raise HTTPException(status_code=404, detail="Batch not found")
         
-        # Get the prechecks associated with this batch
-        precheck_stmt = select(PreCheck).filter(PreCheck.batch_id == str(batch_id))
-        precheck_result = await db.execute(precheck_stmt)
-        prechecks = precheck_result.scalars().all()
-        
-        if not prechecks:
-            return {
-                "batch_id": batch_id,
-                "total_devices": batch.total_devices,
-                "completed_devices": 0,
-                "status": "initiated",
-                "devices": []
-            }
-        
-        devices = []
-        completed_count = 0
+        batch_status["batch_id"] = batch_id
+        return batch_status
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error in get_batch_status: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get batch status: {str(e)}"
+        )
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _read_batch_status(batch_id: str) -> Optional[Dict[str, Any]]:
+    """Read batch status in a short-lived session of its own."""
+    async with AsyncSessionLocal() as db:
+        batch_status = await load_batch_status(db, batch_id)
+    if batch_status is None:
+        return None
+    return BatchStatusResponse(**batch_status).model_dump(mode="json")
+
+async def _batch_event_stream(
+    request: Request,
+    batch_id: str,
+    snapshot: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """Yield a status snapshot, then live device events and status changes."""
+    loop = asyncio.get_running_loop()
+    interval = settings.EVENTS_DB_POLL_INTERVAL
+    queue = event_bus.subscribe(batch_id)
+    try:
+        last_status = snapshot
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n" + _sse("snapshot", last_status)
         
-        for precheck in prechecks:
-            # Get the corresponding postcheck, if it exists
-            postcheck_stmt = select(PostCheck).filter(PostCheck.precheck_id == precheck.id)
-            postcheck_result = await db.execute(postcheck_stmt)
-            postcheck = postcheck_result.scalar_one_or_none()
+        # Re-read once right after subscribing, so a transition between the
+        # snapshot and the subscription is still sent
+        next_read = loop.time()
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), max(0.0, next_read - loop.time()))
+                yield _sse(event["type"], event)
+                continue
+            except asyncio.TimeoutError:
+                pass
             
-            # Calculate overall status and progress
-            status = "in_progress"
-            progress = 50  # Default to 50% if only precheck is done
-            status_detail = "precheck_completed"
-            
-            if precheck.status == "failed":
-                status = "failed"
-                progress = 0
-                status_detail = "precheck_failed"
-            elif postcheck:
-                if postcheck.status == "completed":
-                    status = "completed"
-                    progress = 100
-                    status_detail = "postcheck_completed"
-                    completed_count += 1
-                elif postcheck.status == "failed":
-                    status = "failed"
-                    progress = 75  # Changed from 50 to 75 to indicate postcheck was attempted
-                    status_detail = "postcheck_failed"
-                else:
-                    status = "in_progress"
-                    progress = 75
-                    status_detail = "postcheck_in_progress"
-            
-            devices.append({
-                "device_ip": precheck.device_ip,
-                "precheck_id": precheck.id,
-                "postcheck_id": postcheck.id if postcheck else None,
-                "status": status,
-                "status_detail": status_detail,
-                "progress": progress
-            })
-        
-        # Determine overall batch status
-        overall_status = batch.status
-        if overall_status not in ["completed", "failed", "partial"]:
-            # Recalculate status if it's not finalized
-            if any(device["status"] == "failed" for device in devices):
-                overall_status = "failed"
-            elif all(device["status"] == "completed" for device in devices):
-                overall_status = "completed"
-            elif any(device["status"] == "in_progress" for device in devices):
-                overall_status = "in_progress"
+            # Periodic re-read covers dropped events and workers in other processes
+            next_read = loop.time() + interval
+            batch_status = await _read_batch_status(batch_id)
+            if batch_status is not None and batch_status != last_status:
+                last_status = batch_status
+                yield _sse("status", batch_status)
             else:
-                overall_status = "partial"
+                yield ": keepalive\n\n"
+    finally:
+        event_bus.unsubscribe(batch_id, queue)
+
+@router.get("/batch/{batch_id}/events")
+async def stream_batch_events(batch_id: UUID, request: Request):
+    """Stream batch progress as Server-Sent Events.
+    
+    The stream starts with a ``snapshot`` event holding the current batch
+    status, then pushes ``device`` events as workers record transitions
+    (connecting, running command N of M, completed, failed, unreachable)
+    and ``batch`` events when a phase finishes. Every
+    settings.EVENTS_DB_POLL_INTERVAL seconds the status is re-read from the
+    database and sent as a ``status`` event if it changed, which covers
+    workers running in other processes; after a reconnect the new snapshot
+    brings the client up to date.
+    
+    The stream holds no database session while it is open; the snapshot
+    and each re-read use a short-lived session of their own.
+    
+    Returns:
+        200: text/event-stream of progress events
+        404: Batch not found
+        500: Internal server error
+    """
+    try:
+        snapshot = await _read_batch_status(str(batch_id))
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Batch not found")
         
-        return {
-            "batch_id": batch_id,
-            "total_devices": batch.total_devices,
-            "completed_devices": completed_count,
-            "status": overall_status,
-            "devices": devices
-        }
+        return StreamingResponse(
+            _batch_event_stream(request, str(batch_id), snapshot),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"Error in get_batch_status: {str(e)}")
+        logger.exception(f"Error in stream_batch_events: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to get batch status: {str(e)}"
-        ) 
\ No newline at end of file
+            detail=f"Failed to stream batch events: {str(e)}"
+        )
\ No newline at end of file
@@ -22,7 +22,82 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
     # Database settings
-    DB_ECHO: bool = True
+    DATABASE_URL: str = "sqlite+aiosqlite:///f5_prepost.db"
+    DB_ECHO: bool = False  # Log every SQL statement
+    DB_POOL_CLASS: str = "queue"  # "queue", "null" (connection per checkout) or "static"
+    DB_POOL_SIZE: int = 10  # Connections kept open by the queue pool
+    DB_MAX_OVERFLOW: int = 20  # Extra connections the queue pool may open under load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a pooled connection
+    
+    # SQLite tuning, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL lets status readers run alongside writers
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL, fewer fsyncs than FULL
+    SQLITE_CACHE_SIZE: int = -64000  # Page cache, negative values are KiB (64 MiB)
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the database file memory-mapped (256 MiB)
+    SQLITE_BUSY_TIMEOUT: int = 5000  # Milliseconds to wait on a locked database
+    
+    # Device concurrency settings
+    MAX_CONCURRENT_DEVICES: int = 50  # Devices processed at once across all batches
+    MAX_DEVICES_PER_BATCH: int = 20  # Devices processed at once within one batch
+    SSH_EXECUTOR_WORKERS: int = 50  # Threads for blocking Netmiko calls
+    
+    # SSH connection pool settings (per device and user)
+    SSH_POOL_MIN_SIZE: int = 1  # Connections kept through idle eviction
+    SSH_POOL_MAX_SIZE: int = 3  # Concurrent sessions allowed to one device
+    SSH_POOL_IDLE_TIMEOUT: float = 300.0  # Seconds before an idle connection is closed
+    SSH_POOL_ACQUIRE_TIMEOUT: float = 120.0  # Seconds to wait for a free connection
+    
+    # Background connection maintenance settings
+    SSH_MAINTENANCE_ENABLED: bool = True
+    SSH_KEEPALIVE_INTERVAL: float = 60.0  # Seconds between keepalives on idle sessions
+    SSH_SESSION_TTL: float = 1800.0  # Idle seconds before any session is closed
+    
+    # Retry settings for transient SSH failures
+    SSH_RETRY_ATTEMPTS: int = 3  # Total attempts per device, 1 disables retries
+    SSH_RETRY_BASE_DELAY: float = 2.0  # Seconds before the first retry, doubled each time
+    SSH_RETRY_MAX_DELAY: float = 30.0  # Upper bound for a single backoff delay
+    
+    # Circuit breaker settings (per device and user)
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 3  # Consecutive connect failures that open the circuit
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 60.0  # Seconds before a half-open probe
+    
+    # Connection warm-up settings
+    WARMUP_CONCURRENCY: int = 20  # Logins in flight at once during warm-up
+    WARMUP_RATE_PER_SECOND: float = 10.0  # New logins started per second, 0 for unlimited
+
+    # Job queue settings
+    JOB_WORKER_ENABLED: bool = True  # Run a job worker inside the API process
+    JOB_WORKER_CONCURRENCY: int = 4  # Jobs (batches) run at once per worker
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between queue polls when idle
+    JOB_LEASE_SECONDS: float = 60.0  # Lease on a claimed job, renewed while it runs
+    JOB_MAX_ATTEMPTS: int = 3  # Attempts before a failing job is marked failed
+    JOB_SHUTDOWN_TIMEOUT: float = 30.0  # Seconds to let running jobs finish on shutdown
+    WORKER_PROCESSES: int = 2  # Processes started by python -m f5_prepost_api.worker
+    JOB_PAYLOAD_KEY: str = ""  # Fernet key encrypting device passwords in queued jobs, derived from SECRET_KEY if empty
+    
+    # Result writer settings
+    RESULT_WRITER_FLUSH_INTERVAL: float = 0.05  # Seconds to group device results per transaction
+    RESULT_WRITER_MAX_BATCH: int = 200  # Device results that trigger an immediate flush
+    
+    # Batch progress event stream settings
+    EVENTS_QUEUE_SIZE: int = 1000  # Events buffered per stream before the oldest are dropped
+    EVENTS_DB_POLL_INTERVAL: float = 5.0  # Seconds between status re-reads on an open stream
+    EVENTS_RETRY_MS: int = 3000  # Reconnect delay suggested to clients
+    
+    # Diff settings
+    DIFF_ENGINE: str = "patience"  # "patience", "myers" or "difflib" (reference)
+    DIFF_PROCESS_ENABLED: bool = True  # Diff large outputs in a process pool
+    DIFF_PROCESS_WORKERS: int = 2  # Diff processes per API or job worker process, 0 to split the CPUs between them
+    DIFF_PROCESS_THRESHOLD: int = 262144  # Combined pre and post characters that trigger offload
+    
+    # Output normalization settings
+    NORMALIZATION_ENABLED: bool = True  # Mask volatile fields before comparing outputs
+    NORMALIZATION_DEFAULT_RULES: bool = True  # Use the built-in rules for show commands
+    NORMALIZATION_RULES_FILE: str = ""  # JSON file with additional rules
+    
+    # Stored output compression settings
+    OUTPUT_COMPRESSION_THRESHOLD: int = 1024  # Outputs of this many UTF-8 bytes or more are zlib-compressed
+    OUTPUT_COMPRESSION_LEVEL: int = 6  # zlib level, 1 (fastest) to 9 (smallest)
     
     # Logging settings
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
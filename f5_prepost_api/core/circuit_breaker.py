@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a device's circuit is open and requests fail fast."""
+
+    def __init__(self, key: str, retry_after: float):
+        self.key = key
+        self.retry_after = retry_after
+        super().__init__(
+            f"Device {key} is unreachable (circuit open), "
+            f"retry in {retry_after:.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker tracking connection failures to one device.
+
+    After ``failure_threshold`` consecutive connect failures the circuit
+    opens and requests fail immediately for ``reset_timeout`` seconds. The
+    circuit then goes half-open and lets a single probe through: a success
+    closes it, a failure opens it again. A probe that never reports back is
+    given up on after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, key: str, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        """Initialize the breaker.
+
+        Args:
+            key: Identifier of the device, used for logging
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.key = key
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state of the circuit."""
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """Check without side effects whether requests would be rejected now."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                return now - self._opened_at < self.reset_timeout
+            if self._state == self.HALF_OPEN:
+                return (
+                    self._probe_started_at is not None
+                    and now - self._probe_started_at < self.reset_timeout
+                )
+            return False
+
+    def allow_request(self) -> bool:
+        """Check whether a request may go to the device.
+
+        Returns:
+            True if the circuit is closed or this caller is the half-open probe
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                logger.info(f"Circuit for {self.key} is half-open, probing device")
+                self._state = self.HALF_OPEN
+                self._probe_started_at = now
+                return True
+            # Half-open: only one probe at a time
+            if self._probe_started_at is None or now - self._probe_started_at >= self.reset_timeout:
+                self._probe_started_at = now
+                return True
+            return False
+
+    def record_success(self):
+        """Record a successful connection, closing the circuit."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.key} closed, device is reachable again")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self):
+        """Record a failed connection, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"Circuit for {self.key} opened after {self._failures} "
+                        f"consecutive connection failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit allows a probe, 0 if it is not open."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state and consecutive failure count."""
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_after": retry_after,
+            }
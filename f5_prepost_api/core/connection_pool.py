@@ -0,0 +1,305 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PooledConnection:
+    """A connection owned by a DeviceConnectionPool with usage timestamps."""
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+
+
+class DeviceConnectionPool:
+    """Thread-safe pool of Netmiko connections to a single device.
+
+    Connections are leased exclusively, so concurrent jobs against the same
+    appliance each get their own SSH channel up to ``max_size``. Idle
+    connections are checked for liveness on checkout and evicted once they
+    have been idle longer than ``idle_timeout``, never shrinking the pool
+    below ``min_size``.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        connect: Callable[[], Any],
+        min_size: int = 0,
+        max_size: int = 1,
+        idle_timeout: float = 300.0,
+        acquire_timeout: Optional[float] = None
+    ):
+        """Initialize the pool.
+
+        Args:
+            key: Identifier of the device, used for logging
+            connect: Callable that opens a new connection
+            min_size: Connections kept open through idle eviction
+            max_size: Maximum connections open at once
+            idle_timeout: Seconds an idle connection is kept before eviction
+            acquire_timeout: Default seconds to wait for a free connection
+        """
+        self.key = key
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle: Deque[PooledConnection] = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def _disconnect(entry: PooledConnection):
+        try:
+            entry.connection.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting pooled connection: {str(e)}")
+
+    @staticmethod
+    def _is_alive(entry: PooledConnection) -> bool:
+        try:
+            return bool(entry.connection.is_alive())
+        except Exception:
+            return False
+
+    def _open(self) -> PooledConnection:
+        """Open a new connection for a slot already reserved in ``_size``."""
+        try:
+            logger.info(f"Opening new pooled connection to device: {self.key}")
+            return PooledConnection(self._connect())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Lease a live connection, opening one if the pool has room.
+
+        Args:
+            timeout: Seconds to wait for a free connection, defaults to
+                the pool's acquire_timeout
+
+        Returns:
+            PooledConnection leased exclusively to the caller
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time
+            RuntimeError: If the pool has been closed
+        """
+        self.evict_idle()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"Connection pool for {self.key} is closed")
+                    if self._idle:
+                        # Most recently used first, so surplus connections age out
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out waiting for a connection to {self.key} "
+                            f"({self.max_size} in use)"
+                        )
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                entry = self._open()
+            elif not self._is_alive(entry):
+                logger.warning(
+                    f"Pooled connection to {self.key} is not alive, reconnecting..."
+                )
+                self._disconnect(entry)
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                continue
+            else:
+                logger.info(f"Reusing pooled connection to device: {self.key}")
+
+            entry.last_used = time.monotonic()
+            return entry
+
+    def release(self, entry: PooledConnection, discard: bool = False):
+        """Return a leased connection to the pool.
+
+        Args:
+            entry: Connection previously returned by acquire()
+            discard: Close the connection instead of keeping it for reuse
+        """
+        entry.last_used = entry.last_checked = time.monotonic()
+        with self._cond:
+            if not discard and not self._closed:
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+            self._size -= 1
+            self._cond.notify()
+        self._disconnect(entry)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager leasing a connection for the duration of the block.
+
+        The connection is discarded if the block raises, since the channel
+        may be left in an unknown state.
+
+        Yields:
+            The underlying Netmiko connection
+        """
+        entry = self.acquire(timeout)
+        try:
+            yield entry.connection
+        except BaseException:
+            self.release(entry, discard=True)
+            raise
+        self.release(entry)
+
+    def evict_idle(
+        self,
+        now: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        keep_min: bool = True
+    ) -> int:
+        """Close idle connections unused for longer than idle_timeout.
+
+        Args:
+            now: Monotonic timestamp to evaluate against, defaults to now
+            idle_timeout: Idle seconds before eviction, defaults to the pool's
+            keep_min: Never shrink the pool below min_size
+
+        Returns:
+            Number of connections closed
+        """
+        now = time.monotonic() if now is None else now
+        idle_timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+        floor = self.min_size if keep_min else 0
+        expired: List[PooledConnection] = []
+        with self._cond:
+            # Oldest idle connections sit at the left of the deque
+            while (
+                self._idle
+                and self._size > floor
+                and now - self._idle[0].last_used > idle_timeout
+            ):
+                expired.append(self._idle.popleft())
+                self._size -= 1
+        for entry in expired:
+            logger.info(f"Evicting idle connection to device: {self.key}")
+            self._disconnect(entry)
+        return len(expired)
+
+    def maintain(
+        self,
+        keepalive_interval: float,
+        session_ttl: Optional[float] = None
+    ) -> Tuple[int, int]:
+        """Reap expired idle connections and send keepalives on the rest.
+
+        Connections idle past idle_timeout are trimmed down to min_size and
+        those idle past ``session_ttl`` are closed regardless of min_size.
+        Remaining idle connections not checked within ``keepalive_interval``
+        are probed with ``is_alive()``, which writes to the channel and keeps
+        the session warm; dead ones are closed. Probing does not count as
+        use, so keepalives never postpone reaping.
+
+        Args:
+            keepalive_interval: Seconds between keepalives on an idle connection
+            session_ttl: Idle seconds after which any connection is closed
+
+        Returns:
+            Tuple of (connections reaped, connections refreshed)
+        """
+        now = time.monotonic()
+        reaped = self.evict_idle(now)
+        if session_ttl is not None:
+            reaped += self.evict_idle(now, idle_timeout=session_ttl, keep_min=False)
+
+        # Take due connections out of the pool so nobody leases them mid-probe
+        with self._cond:
+            due = [e for e in self._idle if now - e.last_checked >= keepalive_interval]
+            for entry in due:
+                self._idle.remove(entry)
+
+        alive: List[PooledConnection] = []
+        dead: List[PooledConnection] = []
+        for entry in due:
+            entry.last_checked = time.monotonic()
+            (alive if self._is_alive(entry) else dead).append(entry)
+
+        with self._cond:
+            if self._closed:
+                dead.extend(alive)
+                alive = []
+            self._idle.extend(alive)
+            # Keep the deque ordered oldest-first for evict_idle
+            self._idle = deque(sorted(self._idle, key=lambda e: e.last_used))
+            self._size -= len(dead)
+            self._cond.notify_all()
+
+        for entry in dead:
+            logger.warning(f"Closing dead idle connection to device: {self.key}")
+            self._disconnect(entry)
+        return reaped + len(dead), len(alive)
+
+    def prefill(self, count: Optional[int] = None) -> int:
+        """Open connections until ``count`` (default min_size) are pooled.
+
+        Returns:
+            Number of connections opened
+        """
+        target = min(self.max_size, self.min_size if count is None else count)
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= target:
+                    return opened
+                self._size += 1
+            entry = self._open()
+            self.release(entry)
+            opened += 1
+
+    def close(self):
+        """Close idle connections and disconnect leased ones when returned."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._disconnect(entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return open, idle and leased connection counts."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "leased": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
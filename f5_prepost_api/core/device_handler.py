@@ -1,31 +1,94 @@
 from netmiko import ConnectHandler
-from typing import List, Dict, Any, Optional
+from netmiko.exceptions import (
+    NetmikoAuthenticationException,
+    NetmikoTimeoutException,
+    ReadTimeout
+)
+from paramiko.ssh_exception import SSHException
+from typing import List, Dict, Any, Callable, Optional
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import random
+import socket
+from concurrent.futures import Executor
 import logging
+import threading
+import time
 from contextlib import contextmanager
 from pathlib import Path
+from ..config import settings
 from ..utils.command_validator import validate_read_only_commands
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .connection_pool import DeviceConnectionPool, PoolTimeoutError
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying: the device or network may behave on the next attempt
+TRANSIENT_ERRORS = (
+    NetmikoTimeoutException,
+    ReadTimeout,
+    SSHException,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+    EOFError,
+    socket.timeout,
+)
+
+# Progress callback receiving (index, total, command) before each command
+CommandCallback = Callable[[int, int, str], None]
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Check whether an SSH error is transient and the operation may be retried.
+    
+    Connection resets, connect/read timeouts and prompt-detection failures
+    are transient. Authentication failures are only retried when they are
+    timeouts, so wrong credentials never trigger repeated logins.
+    
+    Args:
+        error: Exception raised while connecting or executing commands
+        
+    Returns:
+        True if the operation should be retried
+    """
+    message = str(error).lower()
+    if isinstance(error, NetmikoAuthenticationException):
+        return "timeout" in message or "timed out" in message
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # Netmiko raises ValueError when it cannot detect the device prompt
+    return isinstance(error, ValueError) and "prompt" in message
+
 
 class F5DeviceHandler:
-    """Handler for F5 device connections with connection reuse."""
+    """Handler for F5 device connections with pooled connection reuse."""
     
-    # Class-level connection cache to persist connections between instances
-    _connection_cache = {}
+    # Class-level connection pools, one per device and user, shared between instances
+    _pools: Dict[str, DeviceConnectionPool] = {}
+    _pools_lock = threading.Lock()
     
-    def __init__(self, device_ip: str, username: str, password: str):
+    # Class-level circuit breakers, one per device and user
+    _breakers: Dict[str, CircuitBreaker] = {}
+    
+    def __init__(
+        self,
+        device_ip: str,
+        username: str,
+        password: str,
+        executor: Optional[Executor] = None
+    ):
         """Initialize device handler with connection parameters.
         
         Args:
             device_ip: IP address of the device
             username: Authentication username
             password: Authentication password
+            executor: Executor for blocking Netmiko calls, defaults to the
+                event loop's default executor
         """
         self.device_ip = device_ip
+        self.executor = executor
         self.device_info = {
             'device_type': 'f5_ltm',
             'ip': device_ip,
@@ -43,52 +106,121 @@ class F5DeviceHandler:
         # Cache key for this connection
         self.cache_key = f"{device_ip}:{username}"
     
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker shared by all handlers for this device and user."""
+        with self._pools_lock:
+            breaker = self._breakers.get(self.cache_key)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    key=self.cache_key,
+                    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                    reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+                )
+                self._breakers[self.cache_key] = breaker
+            return breaker
+    
+    def _connect(self):
+        """Open a new Netmiko connection.
+        
+        Callers of the pool record the outcome on the breaker, so a failed
+        login is counted once whether it came from a lease or a warm-up.
+        """
+        return ConnectHandler(**self.device_info)
+    
+    def _get_pool(self) -> DeviceConnectionPool:
+        """Get or create the connection pool for this device and user."""
+        with self._pools_lock:
+            pool = self._pools.get(self.cache_key)
+            if pool is None:
+                pool = DeviceConnectionPool(
+                    key=self.cache_key,
+                    connect=self._connect,
+                    min_size=settings.SSH_POOL_MIN_SIZE,
+                    max_size=settings.SSH_POOL_MAX_SIZE,
+                    idle_timeout=settings.SSH_POOL_IDLE_TIMEOUT,
+                    acquire_timeout=settings.SSH_POOL_ACQUIRE_TIMEOUT
+                )
+                self._pools[self.cache_key] = pool
+            return pool
+    
     @contextmanager
     def get_connection(self):
-        """Context manager for getting and releasing a Netmiko connection.
+        """Context manager for leasing and returning a Netmiko connection.
         
-        Uses a class-level connection cache to reuse connections across
-        multiple instances of F5DeviceHandler for the same device.
+        Uses a class-level pool per device so connections are reused across
+        multiple instances of F5DeviceHandler, while concurrent callers each
+        get their own channel up to the pool's maximum size.
         
         Yields:
             netmiko.ConnectHandler: Active connection to the device
+            
+        Raises:
+            CircuitOpenError: If the device's circuit is open
         """
+        breaker = self.breaker
+        if not breaker.allow_request():
+            raise CircuitOpenError(self.cache_key, breaker.retry_after())
+        leased = False
         try:
-            # Check if connection exists in cache
-            if (self.cache_key in self._connection_cache and 
-                    self._connection_cache[self.cache_key] is not None):
-                logger.info(f"Reusing existing connection to device: {self.device_ip}")
-                connection = self._connection_cache[self.cache_key]
-                # Verify connection is still active
-                if not connection.is_alive():
-                    logger.warning(
-                        f"Cached connection to {self.device_ip} is not alive, reconnecting..."
-                    )
-                    connection.disconnect()
-                    self._connection_cache[self.cache_key] = None
-                    connection = None
-            else:
-                connection = None
-            
-            # Establish new connection if needed
-            if connection is None:
-                logger.info(f"Opening new connection to device: {self.device_ip}")
-                connection = ConnectHandler(**self.device_info)
-                self._connection_cache[self.cache_key] = connection
-            
-            yield connection
+            with self._get_pool().lease() as connection:
+                # A leased connection proves the device is reachable
+                leased = True
+                breaker.record_success()
+                yield connection
         except Exception as e:
-            # Close and remove the connection on error
+            # Only failures to get a connection count against the device;
+            # waiting on a busy pool says nothing about its reachability
+            if not leased and not isinstance(e, PoolTimeoutError):
+                breaker.record_failure()
+            # The pool discards the connection when the block fails
             logger.exception(f"Error with connection to {self.device_ip}: {str(e)}")
-            if (self.cache_key in self._connection_cache and 
-                    self._connection_cache[self.cache_key] is not None):
-                try:
-                    self._connection_cache[self.cache_key].disconnect()
-                except Exception:
-                    pass  # Ignore errors while disconnecting
-                self._connection_cache[self.cache_key] = None
             raise
     
+    def warm(self, connections: int = 1) -> Dict[str, Any]:
+        """Open pooled connections ahead of use so later commands skip the login.
+        
+        Blocking; run it on an executor thread.
+        
+        Args:
+            connections: Number of connections the pool should hold
+            
+        Returns:
+            Dict with status, connections opened and connect latency in ms
+        """
+        start = time.monotonic()
+        breaker = self.breaker
+        if not breaker.allow_request():
+            return {
+                "status": "unavailable",
+                "opened": 0,
+                "latency_ms": 0.0,
+                "error": str(CircuitOpenError(self.cache_key, breaker.retry_after()))
+            }
+        try:
+            opened = self._get_pool().prefill(connections)
+        except Exception as e:
+            breaker.record_failure()
+            logger.exception(f"Error warming connections to {self.device_ip}: {str(e)}")
+            return {
+                "status": "failed",
+                "opened": 0,
+                "latency_ms": (time.monotonic() - start) * 1000,
+                "error": str(e)
+            }
+        # Pooled connections, new or already warm, prove the device is
+        # reachable; this also releases a half-open probe taken above
+        breaker.record_success()
+        latency_ms = (time.monotonic() - start) * 1000
+        logger.info(
+            f"Warmed {opened} connection(s) to {self.device_ip} in {latency_ms:.0f}ms"
+        )
+        return {
+            "status": "connected" if opened else "already_warm",
+            "opened": opened,
+            "latency_ms": latency_ms
+        }
+    
     def _validate_show_commands(self, commands: List[str]) -> List[str]:
         """Validate that all commands are read-only commands for safety."""
         is_valid, validated_commands, invalid_commands = validate_read_only_commands(commands)
@@ -100,27 +232,40 @@ class F5DeviceHandler:
         
         return validated_commands
     
-    def _execute_commands(self, commands: List[str]) -> Dict[str, Any]:
+    def _execute_commands(
+        self,
+        commands: List[str],
+        on_command: Optional[CommandCallback] = None
+    ) -> Dict[str, Any]:
         """Execute multiple commands on the device using a single session.
         
         Args:
             commands: List of commands to execute
+            on_command: Called with (index, total, command) before each command
             
         Returns:
-            Dict containing status and results or error information
+            Dict containing status and results or error information; errors
+            carry a ``transient`` flag telling whether a retry may succeed
         """
         results = {}
         try:
             # Validate commands before execution
             validated_commands = self._validate_show_commands(commands)
-            
+        except ValueError as ve:
+            # Specific handling for validation errors
+            logger.error(f"Command validation error: {str(ve)}")
+            return {"status": "error", "error": str(ve), "transient": False}
+        
+        try:
             with self.get_connection() as net_connect:
                 logger.info(
                     f"Using connection to execute {len(validated_commands)} commands on device: "
                     f"{self.device_ip}"
                 )
                 
-                for command in validated_commands:
+                for index, command in enumerate(validated_commands, start=1):
+                    if on_command is not None:
+                        self._notify_command(on_command, index, len(validated_commands), command)
                     logger.info(f"Executing command on {self.device_ip}: {command}")
                     output = net_connect.send_command(command)
                     results[command] = output
@@ -128,62 +273,159 @@ class F5DeviceHandler:
             
             logger.info(f"Successfully executed all commands on device: {self.device_ip}")
             return {"status": "success", "results": results}
-        except ValueError as ve:
-            # Specific handling for validation errors
-            logger.error(f"Command validation error: {str(ve)}")
-            return {"status": "error", "error": str(ve)}
+        except CircuitOpenError as ce:
+            logger.warning(str(ce))
+            return {"status": "unavailable", "error": str(ce)}
         except Exception as e:
             logger.exception(f"Error executing commands on device {self.device_ip}: {str(e)}")
-            return {"status": "error", "error": str(e)}
+            return {"status": "error", "error": str(e), "transient": is_transient_error(e)}
+    
+    @staticmethod
+    def _notify_command(on_command: CommandCallback, index: int, total: int, command: str):
+        try:
+            on_command(index, total, command)
+        except Exception as e:
+            # Progress reporting must never fail the device run
+            logger.warning(f"Error reporting command progress: {str(e)}")
+    
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        """Exponential backoff with jitter for the given failed attempt number."""
+        delay = min(
+            settings.SSH_RETRY_MAX_DELAY,
+            settings.SSH_RETRY_BASE_DELAY * (2 ** (attempt - 1))
+        )
+        # Equal jitter: keep half the delay and randomise the rest
+        return delay / 2 + random.uniform(0, delay / 2)
     
-    async def execute_commands_async(self, commands: List[str]) -> Dict[str, Any]:
-        """Execute commands asynchronously using a ThreadPoolExecutor.
+    async def execute_commands_async(
+        self,
+        commands: List[str],
+        on_command: Optional[CommandCallback] = None
+    ) -> Dict[str, Any]:
+        """Execute commands asynchronously on the handler's shared executor.
+        
+        Transient SSH failures are retried up to settings.SSH_RETRY_ATTEMPTS
+        times with exponential backoff and jitter. Each attempt leases a
+        connection from the pool again, and the backoff sleeps on the event
+        loop so no executor slot is held while waiting.
         
         Args:
             commands: List of commands to execute
+            on_command: Called from the executor thread with
+                (index, total, command) before each command is sent
             
         Returns:
-            Dict containing status and results or error information
+            Dict containing status, results or error information and the
+            number of attempts made
         """
         logger.info(
             f"Executing commands asynchronously on device: {self.device_ip}, "
             f"commands: {commands}"
         )
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
+        loop = asyncio.get_running_loop()
+        max_attempts = max(1, settings.SSH_RETRY_ATTEMPTS)
+        attempt = 0
+        
+        while True:
+            # Fail fast without taking an executor slot while the circuit is open
+            if self.breaker.is_open():
+                error = str(CircuitOpenError(self.cache_key, self.breaker.retry_after()))
+                logger.warning(error)
+                result = {"status": "unavailable", "error": error}
+                break
+            
+            attempt += 1
             result = await loop.run_in_executor(
-                pool, self._execute_commands, commands
+                self.executor, self._execute_commands, commands, on_command
+            )
+            if result["status"] != "error" or not result.get("transient"):
+                break
+            if attempt >= max_attempts:
+                break
+            
+            delay = self._retry_delay(attempt)
+            logger.warning(
+                f"Transient error on device {self.device_ip} "
+                f"(attempt {attempt}/{max_attempts}), retrying in {delay:.1f}s: "
+                f"{result.get('error')}"
             )
+            await asyncio.sleep(delay)
+        
+        result["attempts"] = attempt
         
         if result["status"] == "success":
             logger.info(f"Commands executed successfully on device: {self.device_ip}")
         else:
             logger.error(
-                f"Failed to execute commands on device: {self.device_ip}, "
+                f"Failed to execute commands on device: {self.device_ip} "
+                f"after {attempt} attempt(s), "
                 f"error: {result.get('error', 'Unknown error')}"
             )
         
         return result
     
     def close(self):
-        """Explicitly close the connection when done."""
-        if (self.cache_key in self._connection_cache and 
-                self._connection_cache[self.cache_key] is not None):
-            logger.info(f"Closing connection to device: {self.device_ip}")
+        """Explicitly close the pooled connections for this device."""
+        with self._pools_lock:
+            pool = self._pools.pop(self.cache_key, None)
+        if pool is not None:
+            logger.info(f"Closing connections to device: {self.device_ip}")
+            pool.close()
+    
+    @classmethod
+    def close_all_connections(cls):
+        """Close all pooled connections."""
+        with cls._pools_lock:
+            pools = list(cls._pools.items())
+            cls._pools.clear()
+        for key, pool in pools:
+            logger.info(f"Closing connection pool: {key}")
+            pool.close()
+    
+    @classmethod
+    def maintain_connections(cls) -> Dict[str, int]:
+        """Send keepalives on idle pooled connections and reap expired ones.
+        
+        Blocking; run it on an executor thread.
+        
+        Returns:
+            Dict with the number of connections reaped and refreshed
+        """
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+        totals = {"reaped": 0, "refreshed": 0}
+        for pool in pools:
             try:
-                self._connection_cache[self.cache_key].disconnect()
+                reaped, refreshed = pool.maintain(
+                    keepalive_interval=settings.SSH_KEEPALIVE_INTERVAL,
+                    session_ttl=settings.SSH_SESSION_TTL
+                )
             except Exception as e:
-                logger.warning(f"Error disconnecting from {self.device_ip}: {str(e)}")
-            self._connection_cache[self.cache_key] = None
+                logger.warning(f"Error maintaining connection pool {pool.key}: {str(e)}")
+                continue
+            totals["reaped"] += reaped
+            totals["refreshed"] += refreshed
+        return totals
     
     @classmethod
-    def close_all_connections(cls):
-        """Close all cached connections."""
-        for key, connection in cls._connection_cache.items():
-            if connection is not None:
-                try:
-                    logger.info(f"Closing cached connection: {key}")
-                    connection.disconnect()
-                except Exception as e:
-                    logger.warning(f"Error disconnecting for {key}: {str(e)}")
-        cls._connection_cache.clear() 
\ No newline at end of file
+    def breaker_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Get the circuit state of every device that has one.
+        
+        Returns:
+            Mapping of device cache key to circuit breaker statistics
+        """
+        with cls._pools_lock:
+            breakers = list(cls._breakers.items())
+        return {key: breaker.stats() for key, breaker in breakers}
+    
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Dict[str, int]]:
+        """Get connection counts for every device pool.
+        
+        Returns:
+            Mapping of device cache key to pool statistics
+        """
+        with cls._pools_lock:
+            pools = list(cls._pools.items())
+        return {key: pool.stats() for key, pool in pools}
\ No newline at end of file
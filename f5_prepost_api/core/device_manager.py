@@ -1,9 +1,15 @@
+import asyncio
 import logging
-from typing import Dict, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 from .device_handler import F5DeviceHandler
+from .executor import InstrumentedThreadPoolExecutor
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class DeviceManager:
     """Manages device handlers for reuse across API endpoints."""
     
@@ -13,12 +19,51 @@ class DeviceManager:
     # Handler cache
     _handlers: Dict[str, F5DeviceHandler] = {}
     
+    # Process-wide executor for blocking Netmiko work
+    _executor: Optional[InstrumentedThreadPoolExecutor] = None
+    
+    # Global cap on devices processed concurrently, bound to the running loop
+    _device_semaphore: Optional[asyncio.Semaphore] = None
+    _device_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+    
     def __new__(cls):
         """Ensure singleton pattern."""
         if cls._instance is None:
             cls._instance = super(DeviceManager, cls).__new__(cls)
         return cls._instance
     
+    def get_executor(self) -> InstrumentedThreadPoolExecutor:
+        """Get the shared executor for blocking device work, creating it if needed.
+        
+        Returns:
+            The process-wide InstrumentedThreadPoolExecutor
+        """
+        cls = type(self)
+        if cls._executor is None:
+            max_workers = max(1, settings.SSH_EXECUTOR_WORKERS)
+            logger.info(f"Creating shared device executor with {max_workers} workers")
+            cls._executor = InstrumentedThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="f5-ssh"
+            )
+        return cls._executor
+    
+    def executor_stats(self) -> Dict[str, int]:
+        """Get queue depth and worker counts of the shared executor.
+        
+        Returns:
+            Executor statistics, all zero if the executor has not been created
+        """
+        if self._executor is None:
+            return {
+                "max_workers": settings.SSH_EXECUTOR_WORKERS,
+                "threads": 0,
+                "active": 0,
+                "queued": 0,
+                "completed": 0,
+                "failed": 0,
+            }
+        return self._executor.stats()
+    
     def get_handler(self, device_ip: str, username: str, password: str) -> F5DeviceHandler:
         """Get or create a device handler for the specified device.
         
@@ -34,7 +79,9 @@ class DeviceManager:
         
         if cache_key not in self._handlers:
             logger.info(f"Creating new device handler for {device_ip}")
-            self._handlers[cache_key] = F5DeviceHandler(device_ip, username, password)
+            self._handlers[cache_key] = F5DeviceHandler(
+                device_ip, username, password, executor=self.get_executor()
+            )
         else:
             logger.info(f"Reusing existing device handler for {device_ip}")
         
@@ -59,4 +106,115 @@ class DeviceManager:
         logger.info(f"Closing all device handlers ({len(self._handlers)} handlers)")
         for handler in self._handlers.values():
             handler.close()
-        self._handlers.clear() 
\ No newline at end of file
+        self._handlers.clear()
+    
+    def shutdown(self):
+        """Close all device handlers and shut down the shared executor."""
+        self.close_all()
+        F5DeviceHandler.close_all_connections()
+        cls = type(self)
+        if cls._executor is not None:
+            logger.info("Shutting down shared device executor")
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None 
+    
+    def _get_device_semaphore(self) -> asyncio.Semaphore:
+        """Return the global device semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        cls = type(self)
+        if cls._device_semaphore is None or cls._device_semaphore_loop is not loop:
+            cls._device_semaphore = asyncio.Semaphore(max(1, settings.MAX_CONCURRENT_DEVICES))
+            cls._device_semaphore_loop = loop
+        return cls._device_semaphore
+    
+    async def run_for_devices(
+        self,
+        devices: List[Any],
+        worker: Callable[[Any], Awaitable[T]],
+        batch_limit: Optional[int] = None
+    ) -> List[T]:
+        """Run a coroutine for every device concurrently with bounded parallelism.
+        
+        Each device must hold a slot from both the per-batch semaphore and the
+        process-wide device semaphore, so one large batch cannot starve others.
+        
+        Args:
+            devices: Devices to process
+            worker: Coroutine function called once per device
+            batch_limit: Per-batch cap, defaults to settings.MAX_DEVICES_PER_BATCH
+            
+        Returns:
+            Worker results in device order; exceptions are returned, not raised
+        """
+        limit = batch_limit or settings.MAX_DEVICES_PER_BATCH
+        batch_semaphore = asyncio.Semaphore(max(1, limit))
+        device_semaphore = self._get_device_semaphore()
+        
+        async def _run(device):
+            async with batch_semaphore:
+                async with device_semaphore:
+                    return await worker(device)
+        
+        logger.info(
+            f"Processing {len(devices)} devices with per-batch limit {limit} "
+            f"and global limit {settings.MAX_CONCURRENT_DEVICES}"
+        )
+        results = await asyncio.gather(
+            *(_run(device) for device in devices), return_exceptions=True
+        )
+        for device, result in zip(devices, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Unhandled error processing device "
+                    f"{getattr(device, 'device_ip', device)}: {str(result)}"
+                )
+        return results
+    
+    async def warm_up(
+        self,
+        devices: List[Any],
+        connections_per_device: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Open pooled connections to many devices in parallel, rate limited.
+        
+        At most settings.WARMUP_CONCURRENCY logins run at once and new logins
+        start no faster than settings.WARMUP_RATE_PER_SECOND, so warming a
+        change window does not flood AAA servers or the appliances.
+        
+        Args:
+            devices: Devices with device_ip, username and password
+            connections_per_device: Connections to open per device, defaults
+                to the pool minimum (at least one)
+            
+        Returns:
+            Per-device results with status, connections opened and latency
+        """
+        count = connections_per_device or max(1, settings.SSH_POOL_MIN_SIZE)
+        semaphore = asyncio.Semaphore(max(1, settings.WARMUP_CONCURRENCY))
+        interval = 1.0 / settings.WARMUP_RATE_PER_SECOND if settings.WARMUP_RATE_PER_SECOND > 0 else 0.0
+        rate_lock = asyncio.Lock()
+        next_start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        
+        async def _warm(device) -> Dict[str, Any]:
+            nonlocal next_start
+            async with semaphore:
+                # Space out connection starts to honour the rate limit
+                async with rate_lock:
+                    delay = next_start - time.monotonic()
+                    next_start = max(next_start, time.monotonic()) + interval
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                
+                handler = self.get_handler(
+                    device_ip=device.device_ip,
+                    username=device.username,
+                    password=device.password
+                )
+                result = await loop.run_in_executor(
+                    self.get_executor(), handler.warm, count
+                )
+                return {"device_ip": device.device_ip, **result}
+        
+        logger.info(f"Warming connections to {len(devices)} devices")
+        return await asyncio.gather(*(_warm(device) for device in devices))
\ No newline at end of file
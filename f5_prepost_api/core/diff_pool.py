@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from ..config import settings
+from ..utils.diff_engines import diff_texts
+from ..utils.tmsh_diff import command_diff
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Process-wide pool for large diffs, created on first use
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def diff_pool_size() -> int:
+    """Number of diff workers this process starts.
+
+    Every API and job worker process has a pool of its own, so with
+    DIFF_PROCESS_WORKERS=0 the host's CPUs are split between the API
+    process and the WORKER_PROCESSES job workers instead of each one
+    taking them all.
+    """
+    if settings.DIFF_PROCESS_WORKERS > 0:
+        return settings.DIFF_PROCESS_WORKERS
+    processes = max(1, settings.WORKER_PROCESSES) + 1
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+def get_diff_pool() -> ProcessPoolExecutor:
+    """Get the shared diff process pool, creating it if needed.
+
+    Workers are spawned rather than forked, so they never inherit the event
+    loop, SSH sessions or database connections of the parent.
+
+    Returns:
+        The process-wide ProcessPoolExecutor
+    """
+    global _pool
+    if _pool is None:
+        max_workers = diff_pool_size()
+        logger.info(f"Creating diff process pool with {max_workers} workers")
+        _pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_diff_pool():
+    """Shut down the diff process pool, cancelling diffs not yet started."""
+    global _pool
+    if _pool is not None:
+        logger.info("Shutting down diff process pool")
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def should_offload(pre_output: str, post_output: str) -> bool:
+    """Whether a diff is large enough to run in the process pool."""
+    return (
+        settings.DIFF_PROCESS_ENABLED
+        and len(pre_output) + len(post_output) >= settings.DIFF_PROCESS_THRESHOLD
+    )
+
+
+async def run_in_diff_pool(
+    fn: Callable[..., T],
+    pre_output: str,
+    post_output: str,
+    fromfile: str,
+    tofile: str
+) -> T:
+    """Run a diff function without blocking the event loop on large inputs.
+
+    Outputs whose combined size reaches DIFF_PROCESS_THRESHOLD characters are
+    diffed in the process pool; smaller ones are cheaper to diff inline than
+    to pickle across processes.
+
+    Args:
+        fn: Module-level function taking (pre_output, post_output, fromfile,
+            tofile, engine_name)
+    """
+    args = (pre_output, post_output, fromfile, tofile, settings.DIFF_ENGINE)
+    if not should_offload(pre_output, post_output):
+        return fn(*args)
+
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = get_diff_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); replace the pool and diff this
+        # one in a thread, keeping the large diff off the event loop
+        logger.error(f"Diff process pool is broken, diffing {fromfile} in a thread")
+        if _pool is pool:
+            _pool = None
+        return await asyncio.to_thread(fn, *args)
+
+
+async def diff_texts_async(
+    pre_output: str,
+    post_output: str,
+    fromfile: str,
+    tofile: str
+) -> List[str]:
+    """Unified diff lines of two outputs, as diff_texts returns them."""
+    return await run_in_diff_pool(diff_texts, pre_output, post_output, fromfile, tofile)
+
+
+async def command_diff_async(
+    pre_output: str,
+    post_output: str,
+    fromfile: str,
+    tofile: str
+) -> Dict[str, Any]:
+    """Structured diff of one command, as command_diff returns it."""
+    return await run_in_diff_pool(command_diff, pre_output, post_output, fromfile, tofile)
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+
+
+class BatchEventBus:
+    """In-process publish/subscribe of device progress events per batch.
+
+    Device workers publish transitions (connecting, command N of M,
+    completed, failed) as they happen and every open event stream of the
+    batch receives them. Publishing is thread-safe, so commands running on
+    the SSH executor can report progress directly. A subscriber that falls
+    behind loses its oldest events rather than slowing down the workers;
+    streams re-read the database periodically to cover the gap and to pick
+    up progress from workers in other processes.
+    """
+
+    # Singleton instance
+    _instance = None
+
+    def __new__(cls):
+        """Ensure singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super(BatchEventBus, cls).__new__(cls)
+            cls._instance._subscribers = {}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def subscribe(self, batch_id: str) -> asyncio.Queue:
+        """Register a queue receiving the batch's events on the running loop."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(batch_id, []).append(subscriber)
+        return queue
+
+    def unsubscribe(self, batch_id: str, queue: asyncio.Queue):
+        """Remove a queue registered with subscribe()."""
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(batch_id, []) if s[1] is not queue]
+            if subscribers:
+                self._subscribers[batch_id] = subscribers
+            else:
+                self._subscribers.pop(batch_id, None)
+
+    def subscriber_count(self, batch_id: Optional[str] = None) -> int:
+        """Number of open subscriptions, for one batch or all of them."""
+        with self._lock:
+            if batch_id is not None:
+                return len(self._subscribers.get(batch_id, []))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, batch_id: str, event: Dict[str, Any]):
+        """Send an event to every subscriber of the batch.
+
+        Safe to call from any thread; a no-op when nobody is listening.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(batch_id, []))
+        if not subscribers:
+            return
+
+        event = {"batch_id": batch_id, "timestamp": time.time(), **event}
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Subscriber's loop is closed; it is removed when its stream ends
+                pass
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict[str, Any]):
+        if queue.full():
+            # Drop the oldest event, the stream's next database read catches up
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def device_event(
+        self,
+        batch_id: str,
+        phase: str,
+        device_ip: str,
+        state: str,
+        **details: Any
+    ):
+        """Publish a device transition.
+
+        Args:
+            batch_id: Batch the device belongs to
+            phase: "precheck" or "postcheck"
+            device_ip: Device the event is about
+            state: "connecting", "running", "completed", "failed" or "unreachable"
+            details: Extra fields, such as command progress or an error
+        """
+        self.publish(batch_id, {
+            "type": "device",
+            "phase": phase,
+            "device_ip": device_ip,
+            "state": state,
+            **details
+        })
+
+    def command_progress(
+        self,
+        batch_id: str,
+        phase: str,
+        device_ip: str
+    ) -> Callable[[int, int, str], None]:
+        """Build a callback publishing "command N of M" events for a device.
+
+        The callback is called from the SSH executor thread before each
+        command is sent.
+        """
+        def on_command(index: int, total: int, command: str):
+            self.device_event(
+                batch_id, phase, device_ip, "running",
+                command=command, command_index=index, command_total=total
+            )
+        return on_command
@@ -0,0 +1,82 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that tracks queued, active and completed work items.
+
+    Used as the single process-wide pool for blocking Netmiko calls, so the
+    counters show when SSH work is backing up behind busy workers.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = ""):
+        """Initialize the executor.
+
+        Args:
+            max_workers: Maximum number of worker threads
+            thread_name_prefix: Prefix for worker thread names
+        """
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Submit a callable, recording it as queued until a worker picks it up."""
+        started = threading.Event()
+
+        def _run():
+            with self._stats_lock:
+                self._queued -= 1
+                self._active += 1
+            started.set()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                with self._stats_lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._stats_lock:
+                    self._active -= 1
+                    self._completed += 1
+            return result
+
+        def _on_done(future: Future):
+            # Work cancelled while still queued never reaches _run
+            if future.cancelled() and not started.is_set():
+                with self._stats_lock:
+                    self._queued -= 1
+
+        with self._stats_lock:
+            self._queued += 1
+        try:
+            future = super().submit(_run)
+        except Exception:
+            with self._stats_lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(_on_done)
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the executor counters.
+
+        Returns:
+            Dict with max_workers, threads, active, queued, completed and failed
+        """
+        with self._stats_lock:
+            return {
+                "max_workers": self._max_workers,
+                "threads": len(self._threads),
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
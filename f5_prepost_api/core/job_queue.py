@@ -0,0 +1,436 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from cryptography.fernet import Fernet
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal, Job
+
+logger = logging.getLogger(__name__)
+
+# Events of in-process workers, set when a job is enqueued to skip the poll wait
+_wakeup_events: Set[asyncio.Event] = set()
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+def new_worker_id() -> str:
+    """Build a worker identifier unique across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _payload_cipher() -> Fernet:
+    key = settings.JOB_PAYLOAD_KEY
+    if not key:
+        # Every API and worker process shares SECRET_KEY, so they derive the same key
+        key = base64.urlsafe_b64encode(hashlib.sha256(settings.SECRET_KEY.encode()).digest())
+    return Fernet(key)
+
+
+def _map_devices(
+    payload: Optional[Dict[str, Any]],
+    transform: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    if not payload:
+        return payload
+    request = dict(payload.get("request") or {})
+    if "devices" in request:
+        request["devices"] = [transform(dict(device)) for device in request["devices"]]
+    return {**payload, "request": request}
+
+
+def seal_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return a copy of a job payload with device passwords encrypted.
+
+    Passwords move to ``password_sealed``, a Fernet token, so the jobs
+    table never holds them in plain text.
+    """
+    cipher = _payload_cipher()
+
+    def seal(device: Dict[str, Any]) -> Dict[str, Any]:
+        if "password" in device:
+            password = device.pop("password")
+            device["password_sealed"] = cipher.encrypt(password.encode()).decode()
+        return device
+
+    return _map_devices(payload, seal)
+
+
+def unseal_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return a copy of a sealed job payload with device passwords decrypted.
+
+    Raises:
+        cryptography.fernet.InvalidToken: If JOB_PAYLOAD_KEY (or SECRET_KEY)
+            changed since the job was queued
+    """
+    cipher = _payload_cipher()
+
+    def unseal(device: Dict[str, Any]) -> Dict[str, Any]:
+        if "password_sealed" in device:
+            device["password"] = cipher.decrypt(device.pop("password_sealed").encode()).decode()
+        return device
+
+    return _map_devices(payload, unseal)
+
+
+def redact_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return a copy of a job payload with device passwords removed."""
+    return _map_devices(
+        payload,
+        lambda device: {
+            key: value for key, value in device.items()
+            if key not in ("password", "password_sealed")
+        }
+    )
+
+
+async def enqueue_job(
+    db: AsyncSession,
+    kind: str,
+    batch_id: str,
+    payload: Dict[str, Any]
+) -> Job:
+    """Add a job to the queue within the caller's transaction.
+
+    Device passwords in the payload are stored encrypted; handlers get
+    them back with unseal_payload.
+
+    Args:
+        db: Session whose transaction the job is committed with
+        kind: Job type, selects the handler that runs it
+        batch_id: Batch the job belongs to
+        payload: JSON-serializable data the handler needs
+
+    Returns:
+        The pending Job record
+    """
+    job = Job(
+        kind=kind,
+        batch_id=batch_id,
+        payload=seal_payload(payload),
+        status="queued",
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS
+    )
+    db.add(job)
+    logger.info(f"Enqueued {kind} job for batch_id: {batch_id}")
+    return job
+
+
+def notify_workers():
+    """Wake in-process workers so a new job is claimed without waiting to poll."""
+    for event in list(_wakeup_events):
+        event.set()
+
+
+async def _fail_exhausted_jobs(now: datetime):
+    """Fail running jobs whose lease expired on their last attempt.
+
+    A job that keeps killing its worker never reaches finish_job, so it is
+    failed here instead of being reclaimed forever.
+    """
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            stmt = select(Job).where(
+                Job.status == "running",
+                Job.lease_expires_at < now,
+                Job.attempts >= Job.max_attempts
+            )
+            for job in (await db.execute(stmt)).scalars().all():
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.status == "running", Job.lease_expires_at < now)
+                    .values(
+                        status="failed",
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        last_error=f"Lease expired on attempt {job.attempts} of {job.max_attempts}",
+                        finished_at=now,
+                        payload=redact_payload(job.payload)
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    logger.error(
+                        f"Job {job.id} failed after {job.attempts} attempts: "
+                        f"lease expired on its last attempt"
+                    )
+
+
+async def claim_job(worker_id: str, lease_seconds: float) -> Optional[Job]:
+    """Claim the oldest runnable job with a lease.
+
+    Queued jobs and running jobs whose lease has expired (their worker died)
+    are runnable while they have attempts left; expired jobs without any are
+    failed. The claim is a conditional UPDATE, so concurrent workers in any
+    process can never claim the same job.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+        lease_seconds: Seconds the lease is valid before it must be renewed
+
+    Returns:
+        The claimed Job, or None if nothing is runnable
+    """
+    await _fail_exhausted_jobs(datetime.utcnow())
+    for _ in range(5):
+        now = datetime.utcnow()
+        runnable = or_(
+            Job.status == "queued",
+            and_(
+                Job.status == "running",
+                Job.lease_expires_at < now,
+                Job.attempts < Job.max_attempts
+            )
+        )
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                stmt = select(Job.id).where(runnable).order_by(Job.created_at).limit(1)
+                job_id = (await db.execute(stmt)).scalar_one_or_none()
+                if job_id is None:
+                    return None
+
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, runnable)
+                    .values(
+                        status="running",
+                        lease_owner=worker_id,
+                        lease_expires_at=now + timedelta(seconds=lease_seconds),
+                        attempts=Job.attempts + 1,
+                        started_at=now
+                    )
+                )
+                if result.rowcount != 1:
+                    # Another worker won the race, try the next job
+                    continue
+
+            job = await db.get(Job, job_id, populate_existing=True)
+            logger.info(f"Worker {worker_id} claimed {job.kind} job {job.id} (attempt {job.attempts})")
+            return job
+    return None
+
+
+async def renew_lease(job_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Extend the lease on a running job.
+
+    Returns:
+        False if the worker no longer holds the job
+    """
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == "running")
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            )
+            return result.rowcount == 1
+
+
+async def finish_job(job_id: str, worker_id: str, error: Optional[str] = None):
+    """Mark a job completed, or failed / requeued after an error.
+
+    A failed job is requeued until it reaches its max_attempts. Device
+    passwords are removed from the payload once the job is final.
+
+    Args:
+        job_id: Job to finish
+        worker_id: Worker holding the lease
+        error: Error message if the job failed
+    """
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            job = await db.get(Job, job_id)
+            if job is None or job.lease_owner != worker_id:
+                logger.warning(f"Worker {worker_id} no longer holds job {job_id}")
+                return
+
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if error is None:
+                job.status = "completed"
+            elif job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.last_error = error
+                logger.warning(f"Job {job_id} failed, requeued: {error}")
+                return
+            else:
+                job.status = "failed"
+                job.last_error = error
+                logger.error(f"Job {job_id} failed after {job.attempts} attempts: {error}")
+            job.finished_at = datetime.utcnow()
+            job.payload = redact_payload(job.payload)
+
+
+async def get_queue_stats() -> Dict[str, Any]:
+    """Get job counts by status and the age of the oldest waiting job.
+
+    Returns:
+        Dict with per-status counts and oldest queued / running ages in seconds
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+        counts = {status: count for status, count in result.all()}
+
+        result = await db.execute(
+            select(func.min(Job.created_at)).where(Job.status == "queued")
+        )
+        oldest_queued = result.scalar()
+        result = await db.execute(
+            select(func.min(Job.started_at)).where(Job.status == "running")
+        )
+        oldest_running = result.scalar()
+
+    now = datetime.utcnow()
+    return {
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_queued_age_seconds": (now - oldest_queued).total_seconds() if oldest_queued else None,
+        "oldest_running_age_seconds": (now - oldest_running).total_seconds() if oldest_running else None,
+    }
+
+
+class JobWorker:
+    """Claims queued jobs and runs them with bounded concurrency.
+
+    Each running job holds a lease that is renewed in the background; if the
+    process dies the lease expires and another worker picks the job up.
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+        worker_id: Optional[str] = None
+    ):
+        """Initialize the worker.
+
+        Args:
+            handlers: Coroutine per job kind, called with the claimed Job
+            concurrency: Jobs run at once, defaults to settings.JOB_WORKER_CONCURRENCY
+            poll_interval: Seconds between polls when idle
+            lease_seconds: Lease length, renewed every third of it
+            worker_id: Identifier recorded on claimed jobs
+        """
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.worker_id = worker_id or new_worker_id()
+        self._task: Optional[asyncio.Task] = None
+        self._active: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def active_jobs(self) -> int:
+        """Number of jobs currently running in this worker."""
+        return len(self._active)
+
+    def start(self):
+        """Start claiming jobs on the running event loop."""
+        if self._task is not None:
+            return
+        logger.info(
+            f"Starting job worker {self.worker_id} with concurrency {self.concurrency}"
+        )
+        _wakeup_events.add(self._wakeup)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Stop claiming jobs and wait for running ones to finish.
+
+        Jobs still running after ``timeout`` are cancelled; their leases
+        expire and another worker resumes them.
+        """
+        _wakeup_events.discard(self._wakeup)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._active:
+            done, pending = await asyncio.wait(self._active, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                while len(self._active) < self.concurrency:
+                    job = await claim_job(self.worker_id, self.lease_seconds)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._active.add(task)
+                    task.add_done_callback(self._on_done)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error claiming jobs: {str(e)}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_done(self, task: asyncio.Task):
+        self._active.discard(task)
+        # A slot freed up, look for more work right away
+        self._wakeup.set()
+
+    async def _keep_lease(self, job: Job, runner: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await renew_lease(job.id, self.worker_id, self.lease_seconds):
+                    logger.error(f"Lost lease on job {job.id}, cancelling it")
+                    runner.cancel()
+                    return
+            except Exception as e:
+                logger.warning(f"Error renewing lease on job {job.id}: {str(e)}")
+
+    async def _execute(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            await finish_job(job.id, self.worker_id, error=f"Unknown job kind: {job.kind}")
+            return
+
+        runner = asyncio.create_task(handler(job))
+        keeper = asyncio.create_task(self._keep_lease(job, runner))
+        error = None
+        try:
+            await runner
+        except asyncio.CancelledError:
+            # Lease lost or worker stopping: leave the job for its next owner
+            runner.cancel()
+            keeper.cancel()
+            if asyncio.current_task().cancelling():
+                raise
+            return
+        except Exception as e:
+            logger.exception(f"Error running {job.kind} job {job.id}: {str(e)}")
+            error = str(e)
+        finally:
+            keeper.cancel()
+
+        try:
+            await finish_job(job.id, self.worker_id, error=error)
+        except Exception as e:
+            logger.exception(f"Error finishing job {job.id}: {str(e)}")
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from .device_handler import F5DeviceHandler
+from .device_manager import DeviceManager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionMaintainer:
+    """Background task that keeps pooled device sessions warm.
+
+    Periodically sends keepalives on idle connections and closes connections
+    that are dead or idle past their TTL, so neither cost shows up on the
+    critical path of the next batch.
+    """
+
+    # Singleton instance
+    _instance = None
+
+    def __new__(cls):
+        """Ensure singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super(ConnectionMaintainer, cls).__new__(cls)
+            cls._instance._task = None
+            cls._instance._stats = {
+                "runs": 0,
+                "last_run_at": None,
+                "last_reaped": 0,
+                "last_refreshed": 0,
+                "total_reaped": 0,
+                "total_refreshed": 0,
+            }
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        """Whether the maintenance task is currently running."""
+        return self._task is not None and not self._task.done()
+
+    def start(self, interval: Optional[float] = None):
+        """Start the maintenance loop on the running event loop.
+
+        Args:
+            interval: Seconds between runs, defaults to settings.SSH_KEEPALIVE_INTERVAL
+        """
+        if self.running:
+            return
+        interval = interval or settings.SSH_KEEPALIVE_INTERVAL
+        logger.info(f"Starting connection maintenance every {interval}s")
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        """Stop the maintenance loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Connection maintenance stopped")
+
+    async def run_once(self) -> Dict[str, int]:
+        """Run one keepalive and reaping pass on the shared device executor.
+
+        Returns:
+            Dict with the number of connections reaped and refreshed
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            DeviceManager().get_executor(), F5DeviceHandler.maintain_connections
+        )
+        self._stats["runs"] += 1
+        self._stats["last_run_at"] = time.time()
+        self._stats["last_reaped"] = result["reaped"]
+        self._stats["last_refreshed"] = result["refreshed"]
+        self._stats["total_reaped"] += result["reaped"]
+        self._stats["total_refreshed"] += result["refreshed"]
+        if result["reaped"] or result["refreshed"]:
+            logger.info(
+                f"Connection maintenance: reaped {result['reaped']}, "
+                f"refreshed {result['refreshed']}"
+            )
+        return result
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error during connection maintenance: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters from the maintenance runs so far."""
+        return dict(self._stats, running=self.running)
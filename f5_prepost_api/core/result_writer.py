@@ -0,0 +1,258 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, update
+
+from ..config import settings
+from ..database import (
+    AsyncSessionLocal,
+    CheckBatch,
+    DeviceProgress,
+    Diff,
+    PostCheck,
+    PostCheckOutput,
+    PreCheck,
+    PreCheckOutput
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingWrite:
+    """One device result waiting to be flushed."""
+
+    __slots__ = (
+        "check_model", "output_model", "check", "outputs", "diffs", "completed_batch_id", "future"
+    )
+
+    def __init__(self, check_model, output_model, check, outputs, diffs, completed_batch_id, future):
+        self.check_model = check_model
+        self.output_model = output_model
+        self.check = check
+        self.outputs = outputs
+        self.diffs = diffs
+        self.completed_batch_id = completed_batch_id
+        self.future = future
+
+
+class ResultWriter:
+    """Single task that writes device results in grouped transactions.
+
+    Device workers hand their check record and command outputs to the writer
+    instead of opening sessions of their own. The writer collects results
+    for up to ``flush_interval`` seconds or ``max_batch`` results, then
+    inserts them with bulk INSERTs and bumps batch counters with one
+    ``UPDATE ... SET completed_devices = completed_devices + n`` per batch,
+    all in one transaction. Each device's ``DeviceProgress`` row is created
+    with its precheck and updated with its postcheck in the same
+    transaction, so batch status never lags the stored checks. On SQLite
+    this replaces many small competing write transactions with a few
+    larger ones.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, max_batch: Optional[int] = None):
+        """Initialize the writer.
+
+        Args:
+            flush_interval: Seconds to collect results before flushing
+            max_batch: Results that trigger an immediate flush
+        """
+        self.flush_interval = (
+            settings.RESULT_WRITER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.max_batch = max(1, max_batch or settings.RESULT_WRITER_MAX_BATCH)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the writer task is running."""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the writer task on the running event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Result writer started")
+
+    async def stop(self):
+        """Flush pending results and stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Result writer stopped")
+
+    async def write_precheck(
+        self,
+        precheck: Dict[str, Any],
+        outputs: List[Dict[str, Any]],
+        completed: bool
+    ):
+        """Queue a precheck record and its outputs, waiting until committed.
+
+        Args:
+            precheck: Column values of the PreCheck row
+            outputs: Column values of its PreCheckOutput rows
+            completed: Whether the device counts towards completed_devices
+        """
+        await self._submit(
+            PreCheck, PreCheckOutput, precheck, outputs, None,
+            precheck["batch_id"] if completed else None
+        )
+
+    async def write_postcheck(
+        self,
+        postcheck: Dict[str, Any],
+        outputs: List[Dict[str, Any]],
+        diffs: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Queue a postcheck record, its outputs and diffs, waiting until committed.
+
+        Args:
+            postcheck: Column values of the PostCheck row
+            outputs: Column values of its PostCheckOutput rows
+            diffs: Column values of its Diff rows against the precheck
+        """
+        await self._submit(PostCheck, PostCheckOutput, postcheck, outputs, diffs, None)
+
+    async def _submit(self, check_model, output_model, check, outputs, diffs, completed_batch_id):
+        if not self.running:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(
+            _PendingWrite(
+                check_model, output_model, check, outputs, diffs, completed_batch_id, future
+            )
+        )
+        await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            pending = [item]
+
+            # Collect more results until the interval passes or the group is full
+            deadline = self._loop.time() + self.flush_interval
+            while len(pending) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                try:
+                    item = (
+                        self._queue.get_nowait() if timeout <= 0
+                        else await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+
+            await self._flush(pending)
+
+    async def _flush(self, pending: List[_PendingWrite]):
+        try:
+            await self._write(pending)
+        except Exception as e:
+            if len(pending) == 1:
+                logger.exception(f"Error writing device result: {str(e)}")
+                self._resolve(pending, e)
+                return
+            # Retry one by one so a single bad result cannot fail the group
+            logger.warning(f"Grouped write of {len(pending)} results failed, retrying individually: {str(e)}")
+            for item in pending:
+                await self._flush([item])
+            return
+        self._resolve(pending)
+
+    @staticmethod
+    def _resolve(pending: List[_PendingWrite], error: Optional[Exception] = None):
+        for item in pending:
+            if item.future.done():
+                continue
+            if error is None:
+                item.future.set_result(None)
+            else:
+                item.future.set_exception(error)
+
+    async def _write(self, pending: List[_PendingWrite]):
+        checks: Dict[Any, List[Dict[str, Any]]] = {}
+        outputs: Dict[Any, List[Dict[str, Any]]] = {}
+        diffs: List[Dict[str, Any]] = []
+        for item in pending:
+            checks.setdefault(item.check_model, []).append(item.check)
+            if item.outputs:
+                outputs.setdefault(item.output_model, []).extend(item.outputs)
+            if item.diffs:
+                diffs.extend(item.diffs)
+        new_progress = [
+            {
+                "precheck_id": check["id"],
+                "batch_id": check["batch_id"],
+                "device_ip": check["device_ip"],
+                "precheck_status": check["status"]
+            }
+            for check in checks.get(PreCheck, [])
+        ]
+        progress_updates = [
+            {
+                "precheck_id": check["precheck_id"],
+                "postcheck_id": check["id"],
+                "postcheck_status": check["status"]
+            }
+            for check in checks.get(PostCheck, [])
+        ]
+        completed = Counter(
+            item.completed_batch_id for item in pending if item.completed_batch_id
+        )
+
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                for model, rows in checks.items():
+                    await db.execute(insert(model), rows)
+                for model, rows in outputs.items():
+                    await db.execute(insert(model), rows)
+                if diffs:
+                    await db.execute(insert(Diff), diffs)
+                if new_progress:
+                    await db.execute(insert(DeviceProgress), new_progress)
+                if progress_updates:
+                    # Bulk UPDATE by primary key
+                    await db.execute(update(DeviceProgress), progress_updates)
+                for batch_id, count in completed.items():
+                    await db.execute(
+                        update(CheckBatch)
+                        .where(CheckBatch.batch_id == batch_id)
+                        .values(completed_devices=CheckBatch.completed_devices + count)
+                    )
+        logger.debug(f"Flushed {len(pending)} device results in one transaction")
+
+
+# Process-wide writer, bound to the event loop that first uses it
+_writer: Optional[ResultWriter] = None
+
+
+def get_result_writer() -> ResultWriter:
+    """Get the process-wide result writer, creating it for the running loop."""
+    global _writer
+    loop = asyncio.get_running_loop()
+    if _writer is None or (_writer._loop is not None and _writer._loop is not loop):
+        _writer = ResultWriter()
+    return _writer
+
+
+async def stop_result_writer():
+    """Flush and stop the process-wide result writer if it is running."""
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
@@ -1,25 +1,129 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Boolean, JSON, Index, LargeBinary, event, inspect
 from sqlalchemy.dialects.sqlite import BLOB
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
+from sqlalchemy.types import TypeDecorator
 import uuid
+import zlib
 from datetime import datetime
 import logging
+import os
 from contextlib import asynccontextmanager
 
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+
+from .config import settings
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pool classes selectable through settings.DB_POOL_CLASS
+POOL_CLASSES = {
+    "queue": AsyncAdaptedQueuePool,
+    "null": NullPool,
+    "static": StaticPool,
+}
+
+def _engine_options(url: str) -> dict:
+    """Build create_async_engine keyword arguments from settings."""
+    pool_class = POOL_CLASSES.get(settings.DB_POOL_CLASS.lower())
+    if pool_class is None:
+        raise ValueError(f"Unknown DB_POOL_CLASS: {settings.DB_POOL_CLASS}")
+    
+    options = {"echo": settings.DB_ECHO, "poolclass": pool_class}
+    if pool_class is AsyncAdaptedQueuePool:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=True
+        )
+    if make_url(url).get_backend_name() == "sqlite":
+        # Python-level lock timeout, matching the busy_timeout pragma
+        options["connect_args"] = {"timeout": settings.SQLITE_BUSY_TIMEOUT / 1000}
+    return options
+
+def _sqlite_pragmas() -> list:
+    """PRAGMA statements applied to every new SQLite connection."""
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}",
+    ]
+
 # Database engine and session setup
-DATABASE_URL = "sqlite+aiosqlite:///f5_prepost.db"
-engine = create_async_engine(DATABASE_URL)
+DATABASE_URL = settings.DATABASE_URL
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in _sqlite_pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
 AsyncSessionLocal = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
 Base = declarative_base()
 
+# First byte of a stored output: how the UTF-8 text that follows is encoded
+OUTPUT_RAW = b"\x00"
+OUTPUT_ZLIB = b"\x01"
+
+def compress_output(text: str) -> bytes:
+    """Encode an output for storage, zlib-compressing it above the threshold."""
+    data = text.encode("utf-8")
+    if len(data) >= settings.OUTPUT_COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(data, settings.OUTPUT_COMPRESSION_LEVEL)
+        # Incompressible outputs are kept raw, saving the decompression on read
+        if len(compressed) < len(data):
+            return OUTPUT_ZLIB + compressed
+    return OUTPUT_RAW + data
+
+def decompress_output(value) -> str:
+    """Decode a stored output written by compress_output."""
+    if isinstance(value, str):
+        # Text stored before outputs were compressed
+        return value
+    value = bytes(value)
+    marker, data = value[:1], value[1:]
+    if marker == OUTPUT_ZLIB:
+        data = zlib.decompress(data)
+    elif marker != OUTPUT_RAW:
+        raise ValueError(f"Unknown stored output encoding: {marker!r}")
+    return data.decode("utf-8")
+
+class CompressedText(TypeDecorator):
+    """Text stored as a BLOB, compressed with zlib above a size threshold.
+    
+    Reads and writes see plain strings, so queries, bulk inserts and ORM
+    attributes need no changes. The column cannot be filtered on its text.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_output(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_output(value)
+
 # Dependency to get DB session for FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -34,16 +138,42 @@ async def get_async_session():
     finally:
         await session.close()
 
+# Alembic migrations shipped with the package
+MIGRATIONS_PATH = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Revision matching a database created by create_all before migrations
+# existed, chosen by whether the job queue table is present
+LEGACY_REVISIONS = {False: "0001", True: "0002"}
+
+def _alembic_config(connection) -> Config:
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_PATH)
+    config.set_main_option("sqlalchemy.url", DATABASE_URL)
+    config.attributes["connection"] = connection
+    return config
+
+def _upgrade_schema(connection):
+    """Bring the schema to the latest revision on a sync connection."""
+    config = _alembic_config(connection)
+    current = MigrationContext.configure(connection).get_current_revision()
+    tables = inspect(connection).get_table_names()
+    if current is None and "check_batches" in tables:
+        # Created by create_all before migrations existed: record its revision
+        legacy = LEGACY_REVISIONS["jobs" in tables]
+        logger.info(f"Stamping unversioned database at revision {legacy}")
+        command.stamp(config, legacy)
+    command.upgrade(config, "head")
+
 # Initialize database
 async def init_db():
-    """Create all tables."""
+    """Apply pending schema migrations."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_schema)
     logger.info("Database initialized")
 
 # Ensure that AsyncSessionLocal is properly exported
 __all__ = ["get_db", "init_db", "get_async_session", "AsyncSessionLocal", "ensure_str_uuid",
-           "CheckBatch", "PreCheck", "PreCheckOutput", "PostCheck", "PostCheckOutput", "Diff"]
+           "CheckBatch", "PreCheck", "PreCheckOutput", "PostCheck", "PostCheckOutput", "Diff", "Job", "DeviceProgress"]
 
 def ensure_str_uuid(uuid_val):
     """Ensures a UUID is converted to string format."""
@@ -55,6 +185,9 @@ def ensure_str_uuid(uuid_val):
 class CheckBatch(Base):
     """Represents a batch of pre/post checks with status tracking."""
     __tablename__ = "check_batches"
+    __table_args__ = (
+        Index("ix_check_batches_created_by_created_at", "created_by", "created_at"),
+    )
     
     batch_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -69,12 +202,17 @@ class CheckBatch(Base):
 class PreCheck(Base):
     """Stores pre-change verification data for F5 devices."""
     __tablename__ = "prechecks"
+    __table_args__ = (
+        Index("ix_prechecks_batch_id_device_ip", "batch_id", "device_ip"),
+        Index("ix_prechecks_device_ip_timestamp", "device_ip", "timestamp"),
+        Index("ix_prechecks_timestamp", "timestamp"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     batch_id = Column(String(36), ForeignKey("check_batches.batch_id"))
     device_ip = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    status = Column(String)  # "in_progress", "completed", "failed"
+    status = Column(String)  # "in_progress", "completed", "failed", "unreachable"
     created_by = Column(String)
     meta_data = Column(JSON)  # Store commands and other metadata
     
@@ -86,11 +224,16 @@ class PreCheck(Base):
 class PreCheckOutput(Base):
     """Stores command outputs from pre-change verification."""
     __tablename__ = "precheck_outputs"
+    __table_args__ = (
+        Index("ix_precheck_outputs_precheck_id_execution_order", "precheck_id", "execution_order"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     precheck_id = Column(String(36), ForeignKey("prechecks.id"))
     command = Column(String)
-    output = Column(String)
+    output = Column(CompressedText)
+    output_digest = Column(String(64))  # SHA-256 of output
+    normalized_digest = Column(String(64))  # SHA-256 of normalized output, equal digests mean no changes
     execution_order = Column(Integer)
     
     # Relationships
@@ -99,12 +242,17 @@ class PreCheckOutput(Base):
 class PostCheck(Base):
     """Stores post-change verification data for F5 devices."""
     __tablename__ = "postchecks"
+    __table_args__ = (
+        Index("ix_postchecks_precheck_id_timestamp", "precheck_id", "timestamp"),
+        Index("ix_postchecks_timestamp", "timestamp"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     precheck_id = Column(String(36), ForeignKey("prechecks.id"))
     timestamp = Column(DateTime, default=datetime.utcnow)
-    status = Column(String)  # "in_progress", "completed", "failed"
+    status = Column(String)  # "in_progress", "completed", "failed", "unreachable"
     created_by = Column(String)
+    meta_data = Column(JSON)  # Store execution attempts and other metadata
     
     # Relationships
     precheck = relationship("PreCheck", back_populates="postchecks")
@@ -113,11 +261,16 @@ class PostCheck(Base):
 class PostCheckOutput(Base):
     """Stores command outputs from post-change verification."""
     __tablename__ = "postcheck_outputs"
+    __table_args__ = (
+        Index("ix_postcheck_outputs_postcheck_id_execution_order", "postcheck_id", "execution_order"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     postcheck_id = Column(String(36), ForeignKey("postchecks.id"))
     command = Column(String)
-    output = Column(String)
+    output = Column(CompressedText)
+    output_digest = Column(String(64))  # SHA-256 of output
+    normalized_digest = Column(String(64))  # SHA-256 of normalized output, equal digests mean no changes
     execution_order = Column(Integer)
     
     # Relationships
@@ -126,6 +279,10 @@ class PostCheckOutput(Base):
 class Diff(Base):
     """Stores generated diffs between pre and post outputs."""
     __tablename__ = "diffs"
+    __table_args__ = (
+        Index("ix_diffs_precheck_id", "precheck_id"),
+        Index("ix_diffs_postcheck_id", "postcheck_id"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     precheck_id = Column(String(36), ForeignKey("prechecks.id"))
@@ -133,4 +290,45 @@ class Diff(Base):
     command = Column(String)
     diff_output = Column(String)
     changes_detected = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow) 
+
+class Job(Base):
+    """Durable queue entry for background precheck/postcheck processing."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_batch_id", "batch_id"),
+    )
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String)  # "precheck", "postcheck", "diff"
+    batch_id = Column(String(36), ForeignKey("check_batches.batch_id"))
+    payload = Column(JSON)  # Request data needed to run the job
+    status = Column(String, default="queued")  # "queued", "running", "completed", "failed"
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    lease_owner = Column(String)  # Worker currently holding the job
+    lease_expires_at = Column(DateTime)
+    last_error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class DeviceProgress(Base):
+    """Current pre/post check state of one device in a batch.
+    
+    Maintained by the result writer as checks are recorded, so batch status
+    is read from one row per device instead of joining every check.
+    """
+    __tablename__ = "device_progress"
+    __table_args__ = (
+        Index("ix_device_progress_batch_id_device_ip", "batch_id", "device_ip"),
+    )
+    
+    precheck_id = Column(String(36), ForeignKey("prechecks.id"), primary_key=True)
+    batch_id = Column(String(36), ForeignKey("check_batches.batch_id"))
+    device_ip = Column(String)
+    precheck_status = Column(String)  # "completed", "failed", "unreachable"
+    postcheck_id = Column(String(36), ForeignKey("postchecks.id"))  # Latest postcheck
+    postcheck_status = Column(String)  # "completed", "failed", "unreachable"
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -14,10 +14,19 @@ from .api.v1.endpoints.status import router as status_router
 from .api.v1.endpoints.checks import router as checks_router
 from .api.v1.endpoints.search import router as search_router
 from .api.v1.endpoints.outputs import router as outputs_router
+from .api.v1.endpoints.devices import router as devices_router
+from .api.v1.endpoints.jobs import router as jobs_router
 from .database import init_db
 from .core.logging_config import setup_logging
 from .core.device_handler import F5DeviceHandler
 from .core.device_manager import DeviceManager
+from .core.diff_pool import shutdown_diff_pool
+from .core.keepalive import ConnectionMaintainer
+from .core.result_writer import stop_result_writer
+from .worker import create_job_worker
+
+# In-process job worker, started when JOB_WORKER_ENABLED is set
+job_worker = None
 
 # Set up centralized logging
 logger = setup_logging(getattr(logging, settings.LOG_LEVEL, logging.INFO))
@@ -98,10 +107,14 @@ app.include_router(status_router, prefix=settings.API_V1_STR)
 app.include_router(checks_router, prefix=settings.API_V1_STR)
 app.include_router(search_router, prefix=settings.API_V1_STR)
 app.include_router(outputs_router, prefix=settings.API_V1_STR)
+app.include_router(devices_router, prefix=settings.API_V1_STR)
+app.include_router(jobs_router, prefix=settings.API_V1_STR)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application dependencies."""
+    global job_worker
+    
     logger.info("============= Starting application =============")
     logger.info(f"API Version: {settings.VERSION}")
     
@@ -113,6 +126,11 @@ async def startup_event():
     DeviceManager()
     logger.info("Device Manager initialized")
     
+    # Start keepalive and idle reaping for pooled device sessions
+    if settings.SSH_MAINTENANCE_ENABLED:
+        ConnectionMaintainer().start()
+        logger.info("Connection maintenance started")
+    
     # Initialize database
     try:
         await init_db()
@@ -122,6 +140,12 @@ async def startup_event():
         logger.exception("Database initialization error details:")
         raise
     
+    # Start consuming queued precheck/postcheck jobs
+    if settings.JOB_WORKER_ENABLED:
+        job_worker = create_job_worker()
+        job_worker.start()
+        logger.info("Job worker started")
+    
     logger.info("Application startup complete")
 
 @app.on_event("shutdown")
@@ -129,9 +153,22 @@ async def shutdown_event():
     """Clean up resources."""
     logger.info("Shutting down application")
     
-    # Close all device connections
+    # Stop claiming jobs; unfinished ones are resumed once their lease expires
+    if job_worker is not None:
+        await job_worker.stop(timeout=settings.JOB_SHUTDOWN_TIMEOUT)
+    
+    # Commit any device results still waiting in the writer
+    await stop_result_writer()
+    
+    # Stop connection maintenance before closing the pools it works on
+    await ConnectionMaintainer().stop()
+    
+    # Close all device connections and stop the shared executor
     logger.info("Closing all device handlers")
-    DeviceManager().close_all()
+    DeviceManager().shutdown()
+    
+    # Stop diff worker processes
+    shutdown_diff_pool()
     
     logger.info("Application shutdown complete")
 
@@ -0,0 +1,92 @@
+"""Baseline schema: batches, pre/post checks, outputs and diffs
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'check_batches',
+        sa.Column('batch_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('total_devices', sa.Integer(), nullable=True),
+        sa.Column('completed_devices', sa.Integer(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('batch_id')
+    )
+    op.create_table(
+        'prechecks',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('batch_id', sa.String(length=36), nullable=True),
+        sa.Column('device_ip', sa.String(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('meta_data', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['batch_id'], ['check_batches.batch_id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'precheck_outputs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('precheck_id', sa.String(length=36), nullable=True),
+        sa.Column('command', sa.String(), nullable=True),
+        sa.Column('output', sa.String(), nullable=True),
+        sa.Column('execution_order', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['precheck_id'], ['prechecks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'postchecks',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('precheck_id', sa.String(length=36), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['precheck_id'], ['prechecks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'postcheck_outputs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('postcheck_id', sa.String(length=36), nullable=True),
+        sa.Column('command', sa.String(), nullable=True),
+        sa.Column('output', sa.String(), nullable=True),
+        sa.Column('execution_order', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['postcheck_id'], ['postchecks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'diffs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('precheck_id', sa.String(length=36), nullable=True),
+        sa.Column('postcheck_id', sa.String(length=36), nullable=True),
+        sa.Column('command', sa.String(), nullable=True),
+        sa.Column('diff_output', sa.String(), nullable=True),
+        sa.Column('changes_detected', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['postcheck_id'], ['postchecks.id']),
+        sa.ForeignKeyConstraint(['precheck_id'], ['prechecks.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('diffs')
+    op.drop_table('postcheck_outputs')
+    op.drop_table('postchecks')
+    op.drop_table('precheck_outputs')
+    op.drop_table('prechecks')
+    op.drop_table('check_batches')
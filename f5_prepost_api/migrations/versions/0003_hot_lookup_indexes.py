@@ -0,0 +1,43 @@
+"""Index hot lookup columns
+
+Covers the foreign keys every status, diff and output query filters on,
+the (device_ip, timestamp) and timestamp orderings of /checks, the
+per-user batch search and the job queue claim query.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_check_batches_created_by_created_at', 'check_batches', ['created_by', 'created_at']),
+    ('ix_prechecks_batch_id_device_ip', 'prechecks', ['batch_id', 'device_ip']),
+    ('ix_prechecks_device_ip_timestamp', 'prechecks', ['device_ip', 'timestamp']),
+    ('ix_prechecks_timestamp', 'prechecks', ['timestamp']),
+    ('ix_precheck_outputs_precheck_id_execution_order', 'precheck_outputs', ['precheck_id', 'execution_order']),
+    ('ix_postchecks_precheck_id_timestamp', 'postchecks', ['precheck_id', 'timestamp']),
+    ('ix_postchecks_timestamp', 'postchecks', ['timestamp']),
+    ('ix_postcheck_outputs_postcheck_id_execution_order', 'postcheck_outputs', ['postcheck_id', 'execution_order']),
+    ('ix_diffs_precheck_id', 'diffs', ['precheck_id']),
+    ('ix_diffs_postcheck_id', 'diffs', ['postcheck_id']),
+    ('ix_jobs_status_created_at', 'jobs', ['status', 'created_at']),
+    ('ix_jobs_batch_id', 'jobs', ['batch_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,59 @@
+"""Add the device_progress table and backfill it from existing checks
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'device_progress',
+        sa.Column('precheck_id', sa.String(length=36), nullable=False),
+        sa.Column('batch_id', sa.String(length=36), nullable=True),
+        sa.Column('device_ip', sa.String(), nullable=True),
+        sa.Column('precheck_status', sa.String(), nullable=True),
+        sa.Column('postcheck_id', sa.String(length=36), nullable=True),
+        sa.Column('postcheck_status', sa.String(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['batch_id'], ['check_batches.batch_id']),
+        sa.ForeignKeyConstraint(['postcheck_id'], ['postchecks.id']),
+        sa.ForeignKeyConstraint(['precheck_id'], ['prechecks.id']),
+        sa.PrimaryKeyConstraint('precheck_id')
+    )
+    op.create_index(
+        'ix_device_progress_batch_id_device_ip', 'device_progress', ['batch_id', 'device_ip']
+    )
+
+    # One row per precheck, pointing at its most recent postcheck
+    op.execute(
+        """
+        INSERT INTO device_progress (
+            precheck_id, batch_id, device_ip, precheck_status,
+            postcheck_id, postcheck_status, updated_at
+        )
+        SELECT p.id, p.batch_id, p.device_ip, p.status,
+               pc.id, pc.status, COALESCE(pc.timestamp, p.timestamp)
+        FROM prechecks p
+        LEFT JOIN postchecks pc ON pc.id = (
+            SELECT id FROM postchecks
+            WHERE precheck_id = p.id
+            ORDER BY timestamp DESC
+            LIMIT 1
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_device_progress_batch_id_device_ip', table_name='device_progress')
+    op.drop_table('device_progress')
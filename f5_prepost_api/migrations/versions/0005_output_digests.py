@@ -0,0 +1,59 @@
+"""Add output digests to command outputs and backfill them
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+TABLES = ['precheck_outputs', 'postcheck_outputs']
+BACKFILL_BATCH = 500
+
+
+def _backfill(table_name: str) -> None:
+    bind = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.String),
+        sa.column('output', sa.String),
+        sa.column('output_digest', sa.String),
+    )
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.output)
+            .where(table.c.output_digest.is_(None), table.c.output.isnot(None))
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam('b_id'))
+            .values(output_digest=sa.bindparam('b_digest')),
+            [
+                {'b_id': row.id, 'b_digest': hashlib.sha256(row.output.encode('utf-8')).hexdigest()}
+                for row in rows
+            ]
+        )
+
+
+def upgrade() -> None:
+    for table_name in TABLES:
+        op.add_column(table_name, sa.Column('output_digest', sa.String(length=64), nullable=True))
+        _backfill(table_name)
+
+
+def downgrade() -> None:
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('output_digest')
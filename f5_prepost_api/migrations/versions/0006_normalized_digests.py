@@ -0,0 +1,32 @@
+"""Add normalized output digests to command outputs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+Existing rows are not backfilled: normalization rules are application
+configuration, and outputs without a normalized digest are compared by
+their raw digest and normalized at diff time.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ['precheck_outputs', 'postcheck_outputs']
+
+
+def upgrade() -> None:
+    for table_name in TABLES:
+        op.add_column(table_name, sa.Column('normalized_digest', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('normalized_digest')
@@ -0,0 +1,97 @@
+"""Store command outputs as compressed BLOBs
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+Outputs are copied into a new BLOB column, which then replaces the text
+column. The encoding is frozen here as it was at this revision (a marker
+byte, 0x00 raw or 0x01 zlib, then the UTF-8 text), so later changes to
+database.compress_output never change what this migration writes. Run
+VACUUM afterwards to return the freed pages to the file system.
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+TABLES = ['precheck_outputs', 'postcheck_outputs']
+BACKFILL_BATCH = 200
+
+# Stored output encoding at this revision
+OUTPUT_RAW = b'\x00'
+OUTPUT_ZLIB = b'\x01'
+COMPRESSION_THRESHOLD = 1024
+COMPRESSION_LEVEL = 6
+
+
+def compress_output(text: str) -> bytes:
+    data = text.encode('utf-8')
+    if len(data) >= COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        if len(compressed) < len(data):
+            return OUTPUT_ZLIB + compressed
+    return OUTPUT_RAW + data
+
+
+def decompress_output(value) -> str:
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, data = value[:1], value[1:]
+    if marker == OUTPUT_ZLIB:
+        data = zlib.decompress(data)
+    elif marker != OUTPUT_RAW:
+        raise ValueError(f'Unknown stored output encoding: {marker!r}')
+    return data.decode('utf-8')
+
+
+def _copy(table_name: str, source: str, target: str, target_type, convert) -> None:
+    """Copy every non-null source value into target, converted, in batches."""
+    bind = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.String),
+        sa.column(source),
+        sa.column(target, target_type),
+    )
+    source_column, target_column = table.c[source], table.c[target]
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, source_column)
+            .where(target_column.is_(None), source_column.isnot(None))
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam('b_id'))
+            .values({target: sa.bindparam('b_value', type_=target_type)}),
+            [{'b_id': row[0], 'b_value': convert(row[1])} for row in rows]
+        )
+
+
+def _replace_output(table_name: str, new_type, convert) -> None:
+    op.add_column(table_name, sa.Column('output_new', new_type, nullable=True))
+    _copy(table_name, 'output', 'output_new', new_type, convert)
+    with op.batch_alter_table(table_name) as batch_op:
+        batch_op.drop_column('output')
+        batch_op.alter_column('output_new', new_column_name='output')
+
+
+def upgrade() -> None:
+    for table_name in TABLES:
+        _replace_output(table_name, sa.LargeBinary(), compress_output)
+
+
+def downgrade() -> None:
+    for table_name in TABLES:
+        _replace_output(table_name, sa.String(), decompress_output)
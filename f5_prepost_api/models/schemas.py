@@ -1,8 +1,10 @@
-from pydantic import BaseModel, IPvAnyAddress
+from pydantic import BaseModel, Field, IPvAnyAddress
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from uuid import UUID
 
+from ..config import settings
+
 class DeviceCredentials(BaseModel):
     device_ip: str
     username: str
@@ -119,4 +121,66 @@ class BatchOutputResponse(BaseModel):
     status: str
     total_devices: int
     completed_devices: int
-    devices: List[DeviceOutput] 
\ No newline at end of file
+    devices: List[DeviceOutput] 
+
+class ExecutorStats(BaseModel):
+    max_workers: int
+    threads: int
+    active: int
+    queued: int
+    completed: int
+    failed: int
+
+class ConnectionPoolStats(BaseModel):
+    size: int
+    idle: int
+    leased: int
+    min_size: int
+    max_size: int
+
+class ConnectionMaintenanceStats(BaseModel):
+    running: bool
+    runs: int
+    last_run_at: Optional[float] = None
+    last_reaped: int
+    last_refreshed: int
+    total_reaped: int
+    total_refreshed: int
+
+class CircuitBreakerStats(BaseModel):
+    state: str  # "closed", "open", "half_open"
+    consecutive_failures: int
+    retry_after: float
+
+class DeviceStatsResponse(BaseModel):
+    executor: ExecutorStats
+    pools: Dict[str, ConnectionPoolStats]
+    maintenance: ConnectionMaintenanceStats
+    circuits: Dict[str, CircuitBreakerStats]
+
+class WarmupRequest(BaseModel):
+    devices: List[DeviceCredentials]
+    # Bounded by the pool size, which caps sessions to one device anyway
+    connections_per_device: Optional[int] = Field(None, ge=1, le=settings.SSH_POOL_MAX_SIZE)
+
+class WarmupDeviceResult(BaseModel):
+    device_ip: str
+    status: str  # "connected", "already_warm", "failed", "unavailable"
+    opened: int
+    latency_ms: float
+    error: Optional[str] = None
+
+class WarmupResponse(BaseModel):
+    total_devices: int
+    warmed_devices: int
+    failed_devices: int
+    elapsed_ms: float
+    devices: List[WarmupDeviceResult]
+
+class JobQueueStats(BaseModel):
+    queued: int
+    running: int
+    completed: int
+    failed: int
+    oldest_queued_age_seconds: Optional[float] = None
+    oldest_running_age_seconds: Optional[float] = None
\ No newline at end of file
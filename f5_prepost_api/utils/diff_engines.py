@@ -0,0 +1,421 @@
+"""Line diff engines producing ``difflib.unified_diff`` compatible output.
+
+``difflib`` is kept as the reference engine. The ``myers`` and ``patience``
+engines hash every line to an integer once, strip the common prefix and
+suffix and then find matching lines with faster algorithms:
+
+- ``myers``: Myers' O(ND) shortest edit script, so the cost grows with the
+  size of the change rather than the size of the output.
+- ``patience``: anchors on lines that occur exactly once on both sides
+  (object names in tmsh output) and diffs the gaps between anchors with
+  Myers, which keeps large, mostly unchanged configurations close to
+  linear and aligns hunks on the objects a human would.
+
+A region whose edit distance or comparison count exceeds the engine's
+budgets is split on unique lines instead, and handed to ``difflib`` only if
+it has none, bounding time and memory on unrelated inputs.
+All engines render hunks exactly like ``difflib.unified_diff``.
+"""
+import bisect
+import difflib
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (a index, b index, length) blocks of equal lines, ending with (len(a), len(b), 0)
+MatchingBlocks = List[Tuple[int, int, int]]
+
+# difflib-style (tag, i1, i2, j1, j2) opcodes
+Opcodes = List[Tuple[str, int, int, int, int]]
+
+
+def _format_range_unified(start: int, stop: int) -> str:
+    """Convert a range to the "ed" format used by unified diff hunks."""
+    beginning = start + 1  # lines start numbering with one
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1  # empty ranges begin at line just before the range
+    return f"{beginning},{length}"
+
+
+def opcodes_from_blocks(blocks: MatchingBlocks) -> Opcodes:
+    """Turn matching blocks into opcodes, as SequenceMatcher.get_opcodes does."""
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in blocks:
+        tag = ""
+        if i < ai and j < bj:
+            tag = "replace"
+        elif i < ai:
+            tag = "delete"
+        elif j < bj:
+            tag = "insert"
+        if tag:
+            opcodes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(("equal", ai, i, bj, j))
+    return opcodes
+
+
+def group_opcodes(opcodes: Opcodes, n: int = 3) -> Iterator[Opcodes]:
+    """Group opcodes into hunks with up to n lines of context.
+
+    Same behaviour as SequenceMatcher.get_grouped_opcodes.
+    """
+    codes = list(opcodes)
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    # Fixup leading and trailing groups if they show no changes.
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # End the current group and start a new one whenever
+        # there is a large range with no changes.
+        if tag == "equal" and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def format_unified(
+    a: Sequence[str],
+    b: Sequence[str],
+    opcodes: Opcodes,
+    fromfile: str = "",
+    tofile: str = "",
+    n: int = 3,
+    lineterm: str = "\n"
+) -> List[str]:
+    """Render opcodes exactly like difflib.unified_diff."""
+    lines = []
+    for group in group_opcodes(opcodes, n):
+        if not lines:
+            lines.append(f"--- {fromfile}{lineterm}")
+            lines.append(f"+++ {tofile}{lineterm}")
+
+        first, last = group[0], group[-1]
+        file1_range = _format_range_unified(first[1], last[2])
+        file2_range = _format_range_unified(first[3], last[4])
+        lines.append(f"@@ -{file1_range} +{file2_range} @@{lineterm}")
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(" " + line for line in a[i1:i2])
+                continue
+            if tag in ("replace", "delete"):
+                lines.extend("-" + line for line in a[i1:i2])
+            if tag in ("replace", "insert"):
+                lines.extend("+" + line for line in b[j1:j2])
+    return lines
+
+
+class DiffEngine:
+    """Base class of line diff engines."""
+
+    name = "base"
+
+    def matching_blocks(self, a: Sequence[str], b: Sequence[str]) -> MatchingBlocks:
+        """Find blocks of equal lines, in SequenceMatcher.get_matching_blocks form."""
+        raise NotImplementedError
+
+    def unified_diff(
+        self,
+        a: Sequence[str],
+        b: Sequence[str],
+        fromfile: str = "",
+        tofile: str = "",
+        n: int = 3,
+        lineterm: str = "\n"
+    ) -> List[str]:
+        """Compare two lists of lines, returning difflib.unified_diff lines."""
+        blocks = self.matching_blocks(a, b)
+        return format_unified(a, b, opcodes_from_blocks(blocks), fromfile, tofile, n, lineterm)
+
+
+class DifflibEngine(DiffEngine):
+    """Reference engine backed by difflib.SequenceMatcher."""
+
+    name = "difflib"
+
+    def matching_blocks(self, a: Sequence[str], b: Sequence[str]) -> MatchingBlocks:
+        return [tuple(block) for block in difflib.SequenceMatcher(None, a, b).get_matching_blocks()]
+
+    def unified_diff(self, a, b, fromfile="", tofile="", n=3, lineterm="\n"):
+        return list(difflib.unified_diff(a, b, fromfile=fromfile, tofile=tofile, n=n, lineterm=lineterm))
+
+
+class MyersEngine(DiffEngine):
+    """Myers O(ND) diff on integer-hashed lines."""
+
+    name = "myers"
+
+    def __init__(self, max_edit_distance: int = 2000, max_cost: int = 2000000):
+        """Initialize the engine.
+
+        Args:
+            max_edit_distance: Edit distance above which a region is split
+                differently, bounding the O(D^2) trace memory
+            max_cost: Line comparisons above which a region is split
+                differently, bounding the O(ND) running time
+        """
+        self.max_edit_distance = max_edit_distance
+        self.max_cost = max_cost
+
+    @staticmethod
+    def _encode(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+        ids: Dict[str, int] = {}
+        a_ids = [ids.setdefault(line, len(ids)) for line in a]
+        b_ids = [ids.setdefault(line, len(ids)) for line in b]
+        return a_ids, b_ids
+
+    def matching_blocks(self, a: Sequence[str], b: Sequence[str]) -> MatchingBlocks:
+        a_ids, b_ids = self._encode(a, b)
+        pairs: List[Tuple[int, int]] = []
+        self._match_region(a, b, a_ids, b_ids, 0, len(a), 0, len(b), pairs)
+        return _blocks_from_pairs(pairs, len(a), len(b))
+
+    def _match_region(self, a, b, a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+        """Append matched (i, j) line pairs of a[alo:ahi] and b[blo:bhi]."""
+        alo, ahi, blo, bhi = _strip_common(a_ids, b_ids, alo, ahi, blo, bhi, pairs)
+        if alo < ahi and blo < bhi and not self._myers(a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+            self._fallback(a, b, a_ids, b_ids, alo, ahi, blo, bhi, pairs)
+
+    def _fallback(self, a, b, a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+        """Match a region too costly for Myers.
+
+        Splits the region on lines unique to both sides, like patience diff,
+        and diffs the gaps again; without such lines difflib takes over.
+        """
+        anchors = _unique_anchors(a_ids, b_ids, alo, ahi, blo, bhi)
+        if anchors:
+            prev_i, prev_j = alo, blo
+            for i, j in anchors + [(ahi, bhi)]:
+                self._match_region(a, b, a_ids, b_ids, prev_i, i, prev_j, j, pairs)
+                if i < ahi:
+                    pairs.append((i, j))
+                prev_i, prev_j = i + 1, j + 1
+            return
+
+        logger.debug(f"Costly {ahi - alo}x{bhi - blo} region without anchors, using difflib")
+        matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+        for i, j, size in matcher.get_matching_blocks():
+            pairs.extend((alo + i + t, blo + j + t) for t in range(size))
+
+    def _myers(self, a_ids, b_ids, alo, ahi, blo, bhi, pairs) -> bool:
+        """Find a shortest edit script of the region.
+
+        Returns:
+            False without matching anything if the region exceeds the budgets
+        """
+        x, y = a_ids[alo:ahi], b_ids[blo:bhi]
+        n, m = len(x), len(y)
+        max_d = min(n + m, self.max_edit_distance)
+        cost = 0
+        v = {1: 0}
+        trace = []
+        for d in range(max_d + 1):
+            trace.append(v.copy())
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                    xi = v[k + 1]
+                else:
+                    xi = v[k - 1] + 1
+                yi = xi - k
+                start = xi
+                while xi < n and yi < m and x[xi] == y[yi]:
+                    xi += 1
+                    yi += 1
+                cost += xi - start + 1
+                v[k] = xi
+                if xi >= n and yi >= m:
+                    self._backtrack(trace, d, k, n, alo, blo, pairs)
+                    return True
+            if cost > self.max_cost:
+                break
+        return False
+
+    @staticmethod
+    def _backtrack(trace, d, k, xi, alo, blo, pairs):
+        snakes = []
+        for depth in range(d, 0, -1):
+            prev = trace[depth]
+            if k == -depth or (k != depth and prev[k - 1] < prev[k + 1]):
+                prev_k = k + 1
+                start = prev[prev_k]
+                mid = start
+            else:
+                prev_k = k - 1
+                start = prev[prev_k]
+                mid = start + 1
+            # Diagonal moves from mid to xi are matching lines
+            snakes.append((mid, xi, k))
+            k, xi = prev_k, start
+        # Leading diagonal of depth 0
+        snakes.append((0, xi, k))
+        for begin, end, diag in snakes:
+            pairs.extend((alo + i, blo + i - diag) for i in range(begin, end))
+
+
+class PatienceEngine(MyersEngine):
+    """Patience diff: anchor on unique lines, Myers between anchors."""
+
+    name = "patience"
+
+    def _match_region(self, a, b, a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+        stack = [(alo, ahi, blo, bhi)]
+        while stack:
+            alo, ahi, blo, bhi = stack.pop()
+            alo, ahi, blo, bhi = _strip_common(a_ids, b_ids, alo, ahi, blo, bhi, pairs)
+            if alo >= ahi or blo >= bhi:
+                continue
+
+            anchors = _unique_anchors(a_ids, b_ids, alo, ahi, blo, bhi)
+            if not anchors:
+                if not self._myers(a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+                    self._fallback(a, b, a_ids, b_ids, alo, ahi, blo, bhi, pairs)
+                continue
+
+            # Diff the gaps between consecutive anchors
+            prev_i, prev_j = alo, blo
+            for i, j in anchors:
+                pairs.append((i, j))
+                stack.append((prev_i, i, prev_j, j))
+                prev_i, prev_j = i + 1, j + 1
+            stack.append((prev_i, ahi, prev_j, bhi))
+
+
+def _strip_common(a_ids, b_ids, alo, ahi, blo, bhi, pairs):
+    """Match the common prefix and suffix, returning the remaining region."""
+    while alo < ahi and blo < bhi and a_ids[alo] == b_ids[blo]:
+        pairs.append((alo, blo))
+        alo += 1
+        blo += 1
+    while alo < ahi and blo < bhi and a_ids[ahi - 1] == b_ids[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        pairs.append((ahi, bhi))
+    return alo, ahi, blo, bhi
+
+
+def _unique_anchors(a_ids, b_ids, alo, ahi, blo, bhi) -> List[Tuple[int, int]]:
+    """Longest increasing run of lines unique on both sides of the region."""
+    counts: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a_ids[i])
+        if entry is None:
+            counts[a_ids[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b_ids[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+
+    candidates = sorted(
+        (i, j) for count_a, i, count_b, j in counts.values() if count_a == 1 and count_b == 1
+    )
+    if not candidates:
+        return []
+
+    # Patience sorting: longest increasing subsequence on b positions
+    tails: List[int] = []
+    tail_index: List[int] = []
+    back: List[int] = []
+    for index, (_, j) in enumerate(candidates):
+        pos = bisect.bisect_left(tails, j)
+        back.append(tail_index[pos - 1] if pos else -1)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pos] = j
+            tail_index[pos] = index
+
+    anchors = []
+    index = tail_index[-1]
+    while index != -1:
+        anchors.append(candidates[index])
+        index = back[index]
+    anchors.reverse()
+    return anchors
+
+
+def _blocks_from_pairs(pairs: List[Tuple[int, int]], n: int, m: int) -> MatchingBlocks:
+    """Merge matched line pairs into maximal matching blocks."""
+    pairs.sort()
+    blocks = []
+    i1 = j1 = size = 0
+    for i, j in pairs:
+        if size and i == i1 + size and j == j1 + size:
+            size += 1
+            continue
+        if size:
+            blocks.append((i1, j1, size))
+        i1, j1, size = i, j, 1
+    if size:
+        blocks.append((i1, j1, size))
+    blocks.append((n, m, 0))
+    return blocks
+
+
+ENGINES = {
+    DifflibEngine.name: DifflibEngine,
+    MyersEngine.name: MyersEngine,
+    PatienceEngine.name: PatienceEngine,
+}
+
+_engines: Dict[str, DiffEngine] = {}
+
+
+def get_diff_engine(name: Optional[str] = None) -> DiffEngine:
+    """Get a diff engine by name, defaulting to settings.DIFF_ENGINE.
+
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    if name is None:
+        from ..config import settings
+        name = settings.DIFF_ENGINE
+    name = name.lower()
+    if name not in _engines:
+        engine_class = ENGINES.get(name)
+        if engine_class is None:
+            raise ValueError(f"Unknown diff engine: {name}")
+        _engines[name] = engine_class()
+    return _engines[name]
+
+
+def diff_texts(
+    pre_output: str,
+    post_output: str,
+    fromfile: str,
+    tofile: str,
+    engine_name: Optional[str] = None
+) -> List[str]:
+    """Split two outputs into lines and diff them with lineterm=''.
+
+    Module-level so the diff process pool can pickle it.
+    """
+    return get_diff_engine(engine_name).unified_diff(
+        pre_output.splitlines(),
+        post_output.splitlines(),
+        fromfile=fromfile,
+        tofile=tofile,
+        lineterm=""
+    )
@@ -1,15 +1,229 @@
-from typing import Dict, Any
-import difflib
+from typing import Dict, Any, List, Optional, Sequence, Set, Tuple
+import asyncio
+import hashlib
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import case, delete, func, insert, select, update
 import logging
 
-from ..database import PreCheckOutput, PostCheckOutput
+from ..database import PreCheckOutput, PostCheckOutput, Diff
+from .diff_engines import diff_texts
+from .normalization import normalize_output, normalized_digest
+from .tmsh_diff import command_has_changes
+from ..core.diff_pool import command_diff_async, diff_texts_async
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# (command, output, digest) in execution order, where digest is the
+# normalized digest if stored; output may be None when the digests
+# already show the command is unchanged
+CommandOutputs = Sequence[Tuple[str, Optional[str], Optional[str]]]
+
+# (command, unified diff lines) per precheck command; None if it could not be compared
+ComparedCommands = List[Tuple[str, Optional[List[str]]]]
+
+def output_digest(output: Optional[str]) -> Optional[str]:
+    """SHA-256 hex digest of a command output, stored alongside it."""
+    if output is None:
+        return None
+    return hashlib.sha256(output.encode("utf-8")).hexdigest()
+
+def _digests_match(pre_digest: Optional[str], post_digest: Optional[str]) -> bool:
+    return pre_digest is not None and pre_digest == post_digest
+
+def _comparison_digest(row) -> Optional[str]:
+    """Digest that decides changed vs unchanged for an output row.
+    
+    Outputs stored before normalization only have the raw digest.
+    """
+    return row.normalized_digest or row.output_digest
+
+def _pending_diffs(
+    pre_outputs: CommandOutputs,
+    post_outputs: CommandOutputs,
+    device_ip: str
+) -> List[Tuple[str, Optional[List[str]], Optional[Tuple[str, str]]]]:
+    """Classify precheck commands before diffing.
+    
+    Returns:
+        (command, diff, texts) per precheck command, where texts holds the
+        pre and post output still to be diffed and diff is None or [] otherwise
+    """
+    pending = []
+    for index, (command, pre_output, pre_digest) in enumerate(pre_outputs):
+        if index >= len(post_outputs):
+            pending.append((command, None, None))
+            continue
+        post_command, post_output, post_digest = post_outputs[index]
+        if command != post_command:
+            logger.warning(f"Command mismatch: {command} vs {post_command} for device: {device_ip}")
+            pending.append((command, None, None))
+            continue
+        
+        if _digests_match(pre_digest, post_digest):
+            logger.info(f"Identical output digests for device: {device_ip}, command: {command}")
+            pending.append((command, [], None))
+            continue
+        
+        logger.info(f"Comparing command output for device: {device_ip}, command: {command}")
+        # Volatile fields are masked so they never show up as changes
+        pending.append((
+            command, None, (normalize_output(command, pre_output), normalize_output(command, post_output))
+        ))
+    return pending
+
+def _log_diff(device_ip: str, command: str, diff: List[str]):
+    if diff:
+        logger.info(f"Changes detected for device: {device_ip}, command: {command}, diff lines: {len(diff)}")
+    else:
+        logger.info(f"No changes detected for device: {device_ip}, command: {command}")
+
+def compare_outputs(
+    pre_outputs: CommandOutputs,
+    post_outputs: CommandOutputs,
+    device_ip: str
+) -> ComparedCommands:
+    """Diff pre and post-check outputs command by command.
+    
+    Commands whose digests match are unchanged and are not diffed.
+    Blocking; use compare_outputs_async from the event loop.
+    """
+    compared = []
+    for command, diff, texts in _pending_diffs(pre_outputs, post_outputs, device_ip):
+        if texts is not None:
+            diff = diff_texts(*texts, fromfile=f'pre_{command}', tofile=f'post_{command}')
+            _log_diff(device_ip, command, diff)
+        compared.append((command, diff))
+    return compared
+
+async def compare_outputs_async(
+    pre_outputs: CommandOutputs,
+    post_outputs: CommandOutputs,
+    device_ip: str
+) -> ComparedCommands:
+    """Diff pre and post-check outputs without stalling the event loop.
+    
+    Same result as compare_outputs. Large outputs are diffed concurrently
+    in the diff process pool, small ones inline.
+    """
+    pending = _pending_diffs(pre_outputs, post_outputs, device_ip)
+    texts_to_diff = [(command, texts) for command, _, texts in pending if texts is not None]
+    diffs = await asyncio.gather(*(
+        diff_texts_async(*texts, fromfile=f'pre_{command}', tofile=f'post_{command}')
+        for command, texts in texts_to_diff
+    ))
+    diff_iter = iter(diffs)
+    
+    compared = []
+    for command, diff, texts in pending:
+        if texts is not None:
+            diff = next(diff_iter)
+            _log_diff(device_ip, command, diff)
+        compared.append((command, diff))
+    return compared
+
+def summarize_diff(compared: ComparedCommands) -> Dict[str, Any]:
+    """Build the diff result returned by generate_diff from compared commands."""
+    diff_results = {command: diff for command, diff in compared if diff}
+    return {
+        "status": "completed",
+        "total_commands": len(compared),
+        "changes": len(diff_results),
+        "diffs": diff_results
+    }
+
+def diff_rows(precheck_id: str, postcheck_id: str, compared: ComparedCommands) -> List[Dict[str, Any]]:
+    """Build Diff table rows, one per precheck command."""
+    return [
+        {
+            "precheck_id": str(precheck_id),
+            "postcheck_id": str(postcheck_id),
+            "command": command,
+            # Lines never contain newlines, so joining on "\n" round-trips
+            "diff_output": None if diff is None else "\n".join(diff),
+            "changes_detected": bool(diff)
+        }
+        for command, diff in compared
+    ]
+
+def _diff_lines(diff_output: Optional[str]) -> Optional[List[str]]:
+    """Inverse of the diff_output encoding used by diff_rows."""
+    if diff_output is None:
+        return None
+    return diff_output.split("\n") if diff_output else []
+
+def _compared_from_rows(rows: Sequence[Diff]) -> ComparedCommands:
+    return [(row.command, _diff_lines(row.diff_output)) for row in rows]
+
+def _needs_text(pre_digests: Sequence, post_digests: Sequence) -> Tuple[Set[str], Set[str]]:
+    """Output ids whose text must be loaded because the digests differ."""
+    pre_ids, post_ids = set(), set()
+    for pre, post in zip(pre_digests, post_digests):
+        if pre.command == post.command and not _digests_match(
+            _comparison_digest(pre), _comparison_digest(post)
+        ):
+            pre_ids.add(pre.id)
+            post_ids.add(post.id)
+    return pre_ids, post_ids
+
+async def _load_texts(db: AsyncSession, model, ids: Set[str]) -> Dict[str, str]:
+    if not ids:
+        return {}
+    stmt = select(model.id, model.output).filter(model.id.in_(ids))
+    return {row.id: row.output for row in (await db.execute(stmt)).all()}
+
+async def load_precheck_outputs(
+    precheck_id: str,
+    db: AsyncSession,
+    post_outputs: Optional[CommandOutputs] = None
+) -> CommandOutputs:
+    """Load a precheck's outputs for compare_outputs.
+    
+    When the postcheck outputs are given, only the text of commands whose
+    digests differ from them is loaded.
+    """
+    stmt = select(
+        PreCheckOutput.id, PreCheckOutput.command, PreCheckOutput.output_digest, PreCheckOutput.normalized_digest
+    ).filter(
+        PreCheckOutput.precheck_id == precheck_id
+    ).order_by(PreCheckOutput.execution_order)
+    digests = (await db.execute(stmt)).all()
+    
+    if post_outputs is None:
+        needed = {row.id for row in digests}
+    else:
+        needed = {
+            row.id for row, (command, _, post_digest) in zip(digests, post_outputs)
+            if row.command == command and not _digests_match(_comparison_digest(row), post_digest)
+        }
+    texts = await _load_texts(db, PreCheckOutput, needed)
+    return [(row.command, texts.get(row.id), _comparison_digest(row)) for row in digests]
+
+async def _load_outputs(precheck_id: str, postcheck_id: str, db: AsyncSession):
+    """Load both sides' digests, then the text only of commands that differ."""
+    pre_stmt = select(
+        PreCheckOutput.id, PreCheckOutput.command, PreCheckOutput.output_digest, PreCheckOutput.normalized_digest
+    ).filter(
+        PreCheckOutput.precheck_id == precheck_id
+    ).order_by(PreCheckOutput.execution_order)
+    post_stmt = select(
+        PostCheckOutput.id, PostCheckOutput.command, PostCheckOutput.output_digest, PostCheckOutput.normalized_digest
+    ).filter(
+        PostCheckOutput.postcheck_id == postcheck_id
+    ).order_by(PostCheckOutput.execution_order)
+    
+    pre_digests = (await db.execute(pre_stmt)).all()
+    post_digests = (await db.execute(post_stmt)).all()
+    
+    pre_ids, post_ids = _needs_text(pre_digests, post_digests)
+    pre_texts = await _load_texts(db, PreCheckOutput, pre_ids)
+    post_texts = await _load_texts(db, PostCheckOutput, post_ids)
+    
+    pre_outputs = [(row.command, pre_texts.get(row.id), _comparison_digest(row)) for row in pre_digests]
+    post_outputs = [(row.command, post_texts.get(row.id), _comparison_digest(row)) for row in post_digests]
+    return pre_outputs, post_outputs
+
 async def generate_diff(
     precheck_id: UUID,
     postcheck_id: UUID,
@@ -20,56 +234,203 @@ async def generate_diff(
     logger.info(f"Generating diff for device: {device_ip}, precheck: {precheck_id}, postcheck: {postcheck_id}")
     
     # Always convert UUID to string for SQLite compatibility
+    pre_outputs, post_outputs = await _load_outputs(str(precheck_id), str(postcheck_id), db)
+    
+    logger.info(f"Found {len(pre_outputs)} pre-outputs and {len(post_outputs)} post-outputs for device: {device_ip}")
+    
+    result = summarize_diff(await compare_outputs_async(pre_outputs, post_outputs, device_ip))
+    
+    logger.info(f"Diff generation completed for device: {device_ip}, total commands: {result['total_commands']}, commands with changes: {result['changes']}")
+    
+    return result
+
+async def get_stored_diff(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    device_ip: str,
+    db: AsyncSession
+) -> Dict[str, Any]:
+    """Get the diff persisted for a postcheck.
+    
+    Diffs are normally stored when the postcheck completes. Postchecks
+    recorded before that are diffed from their stored outputs on the fly;
+    nothing is written, store_diff does that.
+    
+    Returns:
+        Same structure as generate_diff
+    """
+    stmt = select(Diff).filter(Diff.postcheck_id == str(postcheck_id))
+    rows = (await db.execute(stmt)).scalars().all()
+    if rows:
+        return summarize_diff(_compared_from_rows(rows))
+    return await generate_diff(precheck_id, postcheck_id, device_ip, db)
+
+async def _renormalize_outputs(db: AsyncSession, model, check_column, check_id: str) -> CommandOutputs:
+    """Load a check's outputs, refreshing normalized digests made with older rules."""
+    stmt = select(
+        model.id, model.command, model.output, model.normalized_digest
+    ).filter(check_column == check_id).order_by(model.execution_order)
+    outputs = []
+    for row in (await db.execute(stmt)).all():
+        digest = normalized_digest(row.command, row.output)
+        if digest != row.normalized_digest:
+            await db.execute(update(model).where(model.id == row.id).values(normalized_digest=digest))
+        outputs.append((row.command, row.output, digest))
+    return outputs
+
+async def store_diff(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    device_ip: str,
+    db: AsyncSession
+) -> Dict[str, Any]:
+    """Diff a postcheck's stored outputs and replace its Diff rows.
+    
+    Normalized digests of both checks are recomputed with the current
+    rules first, so changed rules never leave a stale digest hiding a
+    change. Writes in the caller's session; the caller commits.
+    
+    Returns:
+        Same structure as generate_diff
+    """
     pre_id_str = str(precheck_id)
     post_id_str = str(postcheck_id)
     
-    pre_stmt = select(PreCheckOutput).filter(
-        PreCheckOutput.precheck_id == pre_id_str
+    logger.info(f"Computing diff for device: {device_ip}, postcheck: {post_id_str}")
+    pre_outputs = await _renormalize_outputs(
+        db, PreCheckOutput, PreCheckOutput.precheck_id, pre_id_str
     )
-    post_stmt = select(PostCheckOutput).filter(
-        PostCheckOutput.postcheck_id == post_id_str
+    post_outputs = await _renormalize_outputs(
+        db, PostCheckOutput, PostCheckOutput.postcheck_id, post_id_str
     )
+    compared = await compare_outputs_async(pre_outputs, post_outputs, device_ip)
     
-    pre_result = await db.execute(pre_stmt)
-    post_result = await db.execute(post_stmt)
-    
-    pre_outputs = pre_result.scalars().all()
-    post_outputs = post_result.scalars().all()
+    await db.execute(delete(Diff).where(Diff.postcheck_id == post_id_str))
+    rows = diff_rows(pre_id_str, post_id_str, compared)
+    if rows:
+        await db.execute(insert(Diff), rows)
+    return summarize_diff(compared)
+
+async def has_stored_diff(postcheck_id: UUID, db: AsyncSession) -> bool:
+    """Whether Diff rows are stored for a postcheck."""
+    stmt = select(Diff.id).filter(Diff.postcheck_id == str(postcheck_id)).limit(1)
+    return (await db.execute(stmt)).first() is not None
+
+async def get_stored_diff_counts(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    device_ip: str,
+    db: AsyncSession
+) -> Dict[str, Any]:
+    """Count a postcheck's stored diffs without reading their text.
     
-    logger.info(f"Found {len(pre_outputs)} pre-outputs and {len(post_outputs)} post-outputs for device: {device_ip}")
+    Falls back to get_stored_diff when nothing is stored.
     
-    total_commands = len(pre_outputs)
-    changes_detected = 0
+    Returns:
+        Same structure as generate_diff, without "diffs"
+    """
+    stmt = select(
+        func.count(Diff.id),
+        func.coalesce(func.sum(case((Diff.changes_detected, 1), else_=0)), 0)
+    ).filter(Diff.postcheck_id == str(postcheck_id))
+    total, changes = (await db.execute(stmt)).one()
+    if total:
+        return {"status": "completed", "total_commands": total, "changes": changes}
     
-    diff_results = {}
+    result = await get_stored_diff(precheck_id, postcheck_id, device_ip, db)
+    result.pop("diffs")
+    return result
+
+async def get_structured_diff(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    device_ip: str,
+    db: AsyncSession
+) -> Dict[str, Any]:
+    """Diff a postcheck's tmsh outputs object by object.
     
-    for pre, post in zip(pre_outputs, post_outputs):
-        if pre.command != post.command:
-            logger.warning(f"Command mismatch: {pre.command} vs {post.command} for device: {device_ip}")
-            continue
-        
-        logger.info(f"Comparing command output for device: {device_ip}, command: {pre.command}")
-        
-        diff = list(difflib.unified_diff(
-            pre.output.splitlines(),
-            post.output.splitlines(),
-            fromfile=f'pre_{pre.command}',
-            tofile=f'post_{pre.command}',
-            lineterm=''
-        ))
-        
-        if diff:
-            changes_detected += 1
-            diff_results[pre.command] = diff
-            logger.info(f"Changes detected for device: {device_ip}, command: {pre.command}, diff lines: {len(diff)}")
-        else:
-            logger.info(f"No changes detected for device: {device_ip}, command: {pre.command}")
+    Only commands whose digests differ are loaded and parsed. Outputs that
+    are not tmsh configuration get a unified line diff instead.
     
-    logger.info(f"Diff generation completed for device: {device_ip}, total commands: {total_commands}, commands with changes: {changes_detected}")
+    Returns:
+        Same structure as generate_diff, with command_diff results in "diffs"
+    """
+    pre_outputs, post_outputs = await _load_outputs(str(precheck_id), str(postcheck_id), db)
+    pending = _pending_diffs(pre_outputs, post_outputs, device_ip)
+    texts_to_diff = [(command, texts) for command, _, texts in pending if texts is not None]
+    diffs = await asyncio.gather(*(
+        command_diff_async(*texts, fromfile=f'pre_{command}', tofile=f'post_{command}')
+        for command, texts in texts_to_diff
+    ))
     
+    diff_results = {
+        command: diff
+        for (command, _), diff in zip(texts_to_diff, diffs)
+        if command_has_changes(diff)
+    }
     return {
         "status": "completed",
-        "total_commands": total_commands,
-        "changes": changes_detected,
+        "total_commands": len(pending),
+        "changes": len(diff_results),
         "diffs": diff_results
-    } 
\ No newline at end of file
+    }
+
+async def get_stored_command_diff(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    command: str,
+    device_ip: str,
+    db: AsyncSession
+) -> Optional[List[str]]:
+    """Get the stored unified diff of one command.
+    
+    Diffs the postcheck's outputs on the fly if none are stored.
+    
+    Returns:
+        Diff lines, [] if unchanged, None if the command could not be compared
+        (including a command run on only one side)
+    """
+    stmt = select(Diff.diff_output).filter(
+        Diff.postcheck_id == str(postcheck_id), Diff.command == command
+    ).limit(1)
+    row = (await db.execute(stmt)).first()
+    if row is not None:
+        return _diff_lines(row.diff_output)
+    if await has_stored_diff(postcheck_id, db):
+        # Stored diffs hold a row for every precheck command
+        return None
+    pre_outputs, post_outputs = await _load_outputs(str(precheck_id), str(postcheck_id), db)
+    compared = dict(await compare_outputs_async(pre_outputs, post_outputs, device_ip))
+    return compared.get(command)
+
+async def _load_output_at(db: AsyncSession, model, check_column, check_id: str, index: int):
+    stmt = select(
+        model.command, model.output, model.output_digest, model.normalized_digest
+    ).filter(check_column == check_id, model.execution_order == index).limit(1)
+    return (await db.execute(stmt)).first()
+
+async def get_structured_command_diff(
+    precheck_id: UUID,
+    postcheck_id: UUID,
+    index: int,
+    device_ip: str,
+    db: AsyncSession
+) -> Optional[Dict[str, Any]]:
+    """Structured diff of the command at one execution index.
+    
+    Returns:
+        command_diff result, or None if the command is unchanged or could
+        not be compared
+    """
+    pre = await _load_output_at(db, PreCheckOutput, PreCheckOutput.precheck_id, str(precheck_id), index)
+    post = await _load_output_at(db, PostCheckOutput, PostCheckOutput.postcheck_id, str(postcheck_id), index)
+    if pre is None or post is None:
+        return None
+    
+    pre_outputs = [(pre.command, pre.output, _comparison_digest(pre))]
+    post_outputs = [(post.command, post.output, _comparison_digest(post))]
+    (command, _, texts), = _pending_diffs(pre_outputs, post_outputs, device_ip)
+    if texts is None:
+        return None
+    diff = await command_diff_async(*texts, fromfile=f'pre_{command}', tofile=f'post_{command}')
+    return diff if command_has_changes(diff) else None
@@ -0,0 +1,16 @@
+import json
+from typing import Any, Dict
+
+from fastapi.encoders import jsonable_encoder
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(record_type: str, record: Dict[str, Any]) -> bytes:
+    """Encode one record as a line of newline-delimited JSON.
+
+    Each line carries a ``type`` so clients can tell the header, the
+    per-device records and the trailer apart.
+    """
+    payload = jsonable_encoder({"type": record_type, **record})
+    return (json.dumps(payload, separators=(",", ":")) + "\n").encode("utf-8")
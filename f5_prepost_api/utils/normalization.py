@@ -0,0 +1,163 @@
+"""Masking of volatile fields in command output before comparison.
+
+``show`` commands print counters, uptimes, timestamps and session IDs that
+change between any two runs. Normalization rules replace them with fixed
+placeholders so that only meaningful changes reach the diff. Each rule
+applies its masks to commands matching its command pattern; all patterns
+are compiled once.
+
+Rules come from ``DEFAULT_RULES`` and, optionally, a JSON file named by
+``NORMALIZATION_RULES_FILE``::
+
+    [
+        {
+            "command": "^show sys performance",
+            "masks": [{"pattern": "\\\\d+ ms", "replace": "<ms>"}]
+        }
+    ]
+
+Masks use ``re.MULTILINE`` and ``re.sub`` replacement syntax.
+"""
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_SHOW = r"^\s*(?:tmsh\s+)?show\b"
+
+# Words that make a show output row a traffic or event counter
+_COUNTER = (
+    r"(?:bits|bytes|octets|packets|pkts|frames|conns?|connections|requests|responses"
+    r"|drops|dropped|errors|errs|collisions|hits|misses|evicted|syncookies)"
+)
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "command": _SHOW,
+        "masks": [
+            # Mon Oct 16 21:11:42 UTC 2026, as in show sys clock
+            {
+                "pattern": r"\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)\s+"
+                           r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}\s+"
+                           r"\d{2}:\d{2}:\d{2}(?:\s+[A-Z]{2,5})?(?:\s+\d{4})?",
+                "replace": "<timestamp>"
+            },
+            {
+                "pattern": r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?",
+                "replace": "<timestamp>"
+            },
+            # Uptime lines and durations such as 12d 03:45:12
+            {"pattern": r"(?i)^([^\S\n]*(?:system\s+)?uptime\b[^\S\n]*:?[^\S\n]*)\S.*$", "replace": r"\g<1><duration>"},
+            {"pattern": r"\b\d+\s*(?:d|days?)[^\S\n]+\d{1,2}:\d{2}:\d{2}\b", "replace": "<duration>"},
+            # Session and connection IDs
+            {"pattern": r"(?i)\b((?:session|connection|conn)[ _-]?id\s*[:=]?\s*)(?:0x)?[0-9a-f]{6,}\b", "replace": r"\g<1><id>"},
+            # Counter rows such as "Bits In   1.2M  0  -": a label naming a
+            # counter, then only numeric columns. The padding goes too, as
+            # right-aligned columns shift when counters grow. Config values
+            # (Tag 100, MTU 1500) and interface names (1.1) are left alone.
+            {
+                "pattern": r"(?i)^([^\S\n]*(?:\|[^\S\n]*)?(?:[\w()/.-]+[^\S\n])*?" + _COUNTER
+                           + r"\b[\w()/.-]*(?:[^\S\n][\w()/.-]+)*)[^\S\n]*:?[^\S\n]+"
+                           r"(?:[\d.]+[KMGTP]?|-)(?:[^\S\n]+(?:[\d.]+[KMGTP]?|-))*[^\S\n]*$",
+                "replace": r"\g<1> <n>"
+            },
+        ]
+    },
+]
+
+# (compiled command pattern, [(compiled mask, replacement)])
+CompiledRule = Tuple[Pattern, List[Tuple[Pattern, str]]]
+
+
+def compile_rules(rules: Sequence[Dict[str, Any]]) -> List[CompiledRule]:
+    """Compile rule definitions.
+
+    Raises:
+        ValueError: If a rule is malformed or a pattern does not compile
+    """
+    compiled = []
+    for rule in rules:
+        try:
+            command = re.compile(rule["command"], re.IGNORECASE)
+            masks = [
+                (re.compile(mask["pattern"], re.MULTILINE), mask.get("replace", "<masked>"))
+                for mask in rule["masks"]
+            ]
+        except (KeyError, TypeError, re.error) as e:
+            raise ValueError(f"Invalid normalization rule {rule!r}: {e}") from e
+        compiled.append((command, masks))
+    return compiled
+
+
+class Normalizer:
+    """Applies compiled normalization rules to command outputs."""
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]):
+        """Initialize the normalizer.
+
+        Args:
+            rules: Rule definitions, see the module docstring
+        """
+        self.rules = compile_rules(rules)
+        # Command -> masks of every matching rule, resolved once per command
+        self._masks_by_command: Dict[str, List[Tuple[Pattern, str]]] = {}
+
+    def masks_for(self, command: str) -> List[Tuple[Pattern, str]]:
+        """Masks that apply to a command, in rule order."""
+        masks = self._masks_by_command.get(command)
+        if masks is None:
+            masks = [
+                mask
+                for command_pattern, rule_masks in self.rules
+                if command_pattern.search(command)
+                for mask in rule_masks
+            ]
+            self._masks_by_command[command] = masks
+        return masks
+
+    def normalize(self, command: str, output: Optional[str]) -> Optional[str]:
+        """Mask the volatile fields of one command's output."""
+        if output is None:
+            return None
+        for pattern, replace in self.masks_for(command):
+            output = pattern.sub(replace, output)
+        return output
+
+
+_normalizer: Optional[Normalizer] = None
+
+
+def _load_rules() -> List[Dict[str, Any]]:
+    rules = list(DEFAULT_RULES) if settings.NORMALIZATION_DEFAULT_RULES else []
+    if settings.NORMALIZATION_RULES_FILE:
+        with open(settings.NORMALIZATION_RULES_FILE, encoding="utf-8") as rules_file:
+            rules.extend(json.load(rules_file))
+    return rules
+
+
+def get_normalizer() -> Normalizer:
+    """Get the normalizer built from settings, compiling its rules on first use."""
+    global _normalizer
+    if _normalizer is None:
+        rules = _load_rules() if settings.NORMALIZATION_ENABLED else []
+        _normalizer = Normalizer(rules)
+        logger.info(f"Compiled {len(_normalizer.rules)} output normalization rules")
+    return _normalizer
+
+
+def normalize_output(command: str, output: Optional[str]) -> Optional[str]:
+    """Mask the volatile fields of a command output with the configured rules."""
+    return get_normalizer().normalize(command, output)
+
+
+def normalized_digest(command: str, output: Optional[str]) -> Optional[str]:
+    """SHA-256 hex digest of the normalized output, deciding changed vs unchanged."""
+    normalized = normalize_output(command, output)
+    if normalized is None:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -0,0 +1,259 @@
+"""Object-keyed diff of tmsh ``list`` output.
+
+tmsh prints configuration as a tree of named objects::
+
+    ltm virtual /Common/vs_x {
+        destination /Common/10.0.0.1:443
+        profiles {
+            /Common/http { }
+        }
+    }
+
+``parse_tmsh`` indexes such output by object path ("ltm virtual
+/Common/vs_x") and flattens every object to a dict of property paths
+("profiles /Common/http") and values. ``structured_diff`` then compares two
+indexes with dict lookups, so reordered objects never show up as changes
+and the cost stays linear in the size of the output.
+
+Properties are read one per line. In ``one-line`` output, where a whole
+object shares a line, properties are read as ``key value`` pairs, except
+for the value-less keywords in ``FLAGS`` (``disabled``, ``vlans-enabled``,
+...), and a nested block whose content is only words
+(``rules { /Common/a /Common/b }``) becomes a single value.
+"""
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .diff_engines import diff_texts
+
+# Properties of one object: property path -> value
+ObjectProperties = Dict[str, str]
+
+# Object path -> properties, in output order
+TmshIndex = Dict[str, ObjectProperties]
+
+# Pseudo object collecting non-blank lines found outside any object
+TOP_LEVEL = "(top-level)"
+
+_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|[{}]|\n|[^\s{}"]+')
+
+_NEWLINE = "\n"
+
+# Keywords tmsh prints without a value, such as the state or type of a
+# virtual server. In one-line output they would otherwise take the next
+# word as their value and shift every key/value pair after them.
+FLAGS = frozenset({
+    "enabled",
+    "disabled",
+    "vlans-enabled",
+    "vlans-disabled",
+    "ip-forward",
+    "l2-forward",
+    "reject",
+    "stateless",
+    "dhcp-relay",
+    "internal",
+})
+
+
+def _tokens(output: str) -> List[str]:
+    return _TOKEN_RE.findall(output)
+
+
+def _add(properties: ObjectProperties, key: str, value: str):
+    # Repeated statements (e.g. in iRule bodies) are kept, one per line
+    if key in properties:
+        properties[key] = f"{properties[key]}\n{value}"
+    else:
+        properties[key] = value
+
+
+class _Parser:
+    """Single pass over the tokens of one output."""
+
+    def __init__(self, output: str):
+        self.tokens = _tokens(output)
+        self.pos = 0
+
+    def _next_is_newline(self) -> bool:
+        return self.pos < len(self.tokens) and self.tokens[self.pos] == _NEWLINE
+
+    def parse(self) -> TmshIndex:
+        index: TmshIndex = {}
+        words: List[str] = []
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if token == "{":
+                properties: ObjectProperties = {}
+                self._block(properties, "", inline=not self._next_is_newline())
+                index[" ".join(words)] = properties
+                words = []
+            elif token == _NEWLINE or token == "}":
+                # Stray closing braces at the top level are ignored
+                if words:
+                    _add(index.setdefault(TOP_LEVEL, {}), " ".join(words), "")
+                    words = []
+            else:
+                words.append(token)
+        if words:
+            _add(index.setdefault(TOP_LEVEL, {}), " ".join(words), "")
+        return index
+
+    def _block(self, properties: ObjectProperties, prefix: str, inline: bool) -> bool:
+        """Read a block body up to its closing brace into properties.
+
+        Returns:
+            Whether the block had any content
+        """
+        words: List[str] = []
+        has_content = False
+
+        def flush():
+            nonlocal words
+            if words:
+                for key, value in self._statements(words, inline):
+                    _add(properties, prefix + key, value)
+                words = []
+
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if token == "}":
+                break
+            if token == _NEWLINE:
+                flush()
+                continue
+            if token != "{":
+                words.append(token)
+                has_content = True
+                continue
+
+            # Nested block: the last word names it in one-line output,
+            # all words on the line name it otherwise
+            if inline and words:
+                name = words.pop()
+                flush()
+            else:
+                name = " ".join(words)
+                words = []
+            nested_inline = not self._next_is_newline()
+            start = self.pos
+            nested: ObjectProperties = {}
+            has_content = True
+            if not self._block(nested, "", nested_inline):
+                _add(properties, prefix + name, "")
+                continue
+            body = self.tokens[start:self.pos - 1]
+            if nested_inline and all(t not in ("{", "}", _NEWLINE) for t in body):
+                # Word lists such as rules { /Common/a /Common/b }
+                _add(properties, prefix + name, " ".join(body))
+            else:
+                for key, value in nested.items():
+                    _add(properties, f"{prefix}{name} {key}", value)
+        flush()
+        return has_content
+
+    @staticmethod
+    def _statements(words: List[str], inline: bool) -> Iterator[Tuple[str, str]]:
+        if not inline:
+            yield words[0], " ".join(words[1:])
+            return
+        index = 0
+        while index < len(words):
+            key = words[index]
+            if key in FLAGS or index + 1 == len(words):
+                yield key, ""
+                index += 1
+            else:
+                yield key, words[index + 1]
+                index += 2
+
+
+def parse_tmsh(output: str) -> TmshIndex:
+    """Index tmsh output by object path.
+
+    Returns:
+        Object path -> flattened properties. Non-blank lines outside any
+        object are collected under TOP_LEVEL.
+    """
+    return _Parser(output).parse()
+
+
+def is_tmsh_config(index: TmshIndex) -> bool:
+    """Whether a parsed output contains tmsh objects at all."""
+    return any(path != TOP_LEVEL for path in index)
+
+
+def _diff_properties(pre: ObjectProperties, post: ObjectProperties) -> Optional[Dict[str, Any]]:
+    added = {key: value for key, value in post.items() if key not in pre}
+    removed = {key: value for key, value in pre.items() if key not in post}
+    changed = {
+        key: {"pre": value, "post": post[key]}
+        for key, value in pre.items()
+        if key in post and post[key] != value
+    }
+    if not (added or removed or changed):
+        return None
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def structured_diff(pre_output: str, post_output: str) -> Optional[Dict[str, Any]]:
+    """Compare two tmsh outputs object by object.
+
+    Returns:
+        Dict with the added and removed object paths and, for modified
+        objects, their added, removed and changed properties; None if
+        either output contains no tmsh objects
+    """
+    pre, post = parse_tmsh(pre_output), parse_tmsh(post_output)
+    if not (is_tmsh_config(pre) and is_tmsh_config(post)):
+        return None
+
+    modified = {}
+    for path, properties in pre.items():
+        if path in post:
+            changes = _diff_properties(properties, post[path])
+            if changes:
+                modified[path] = changes
+    return {
+        "added": [path for path in post if path not in pre],
+        "removed": [path for path in pre if path not in post],
+        "modified": modified,
+    }
+
+
+def has_changes(diff: Dict[str, Any]) -> bool:
+    """Whether a structured_diff result reports any change."""
+    return bool(diff["added"] or diff["removed"] or diff["modified"])
+
+
+def command_diff(
+    pre_output: str,
+    post_output: str,
+    fromfile: str,
+    tofile: str,
+    engine_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """Structured diff of one command, or a line diff if it is not tmsh config.
+
+    Module-level so the diff process pool can pickle it.
+
+    Returns:
+        {"format": "structured", "added", "removed", "modified"} or
+        {"format": "unified", "diff": [...]}
+    """
+    diff = structured_diff(pre_output, post_output)
+    if diff is None:
+        return {
+            "format": "unified",
+            "diff": diff_texts(pre_output, post_output, fromfile, tofile, engine_name)
+        }
+    return {"format": "structured", **diff}
+
+
+def command_has_changes(diff: Dict[str, Any]) -> bool:
+    """Whether a command_diff result reports any change."""
+    if diff["format"] == "unified":
+        return bool(diff["diff"])
+    return has_changes(diff)
@@ -0,0 +1,175 @@
+"""Background job processing for precheck and postcheck batches.
+
+Run standalone worker processes, separate from the API tier, with::
+
+    python -m f5_prepost_api.worker --processes 4 --concurrency 4
+
+Set ``JOB_WORKER_ENABLED=false`` on the API processes so device execution
+only happens in the workers.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import List, Optional
+
+from .config import settings
+from .core.device_manager import DeviceManager
+from .core.diff_pool import shutdown_diff_pool
+from .core.job_queue import JobWorker
+from .core.keepalive import ConnectionMaintainer
+from .core.logging_config import setup_logging
+from .core.result_writer import stop_result_writer
+from .api.v1.endpoints.precheck import run_precheck_job
+from .api.v1.endpoints.postcheck import run_postcheck_job
+from .api.v1.endpoints.diff import run_diff_job
+
+logger = logging.getLogger(__name__)
+
+# Coroutine that runs each kind of queued job
+JOB_HANDLERS = {
+    "precheck": run_precheck_job,
+    "postcheck": run_postcheck_job,
+    "diff": run_diff_job,
+}
+
+
+def create_job_worker(**kwargs) -> JobWorker:
+    """Create a JobWorker wired to the precheck, postcheck and diff handlers.
+
+    Args:
+        **kwargs: Overrides passed to JobWorker (concurrency, poll_interval, ...)
+
+    Returns:
+        A JobWorker that has not been started yet
+    """
+    return JobWorker(handlers=JOB_HANDLERS, **kwargs)
+
+
+async def run_worker(concurrency: Optional[int] = None):
+    """Consume jobs in this process until SIGTERM or SIGINT.
+
+    The process gets its own DeviceManager, executor and connection pools.
+
+    Args:
+        concurrency: Jobs run at once, defaults to settings.JOB_WORKER_CONCURRENCY
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    DeviceManager()
+    if settings.SSH_MAINTENANCE_ENABLED:
+        ConnectionMaintainer().start()
+    worker = create_job_worker(concurrency=concurrency)
+    worker.start()
+    logger.info(f"Worker process {worker.worker_id} ready")
+
+    await stop_event.wait()
+
+    logger.info(f"Worker process {worker.worker_id} shutting down")
+    await worker.stop(timeout=settings.JOB_SHUTDOWN_TIMEOUT)
+    await stop_result_writer()
+    await ConnectionMaintainer().stop()
+    DeviceManager().shutdown()
+    shutdown_diff_pool()
+
+
+def _process_main(concurrency: Optional[int]):
+    """Entry point of a spawned worker process."""
+    setup_logging(getattr(logging, settings.LOG_LEVEL, logging.INFO))
+    asyncio.run(run_worker(concurrency))
+
+
+def _start_process(ctx, index: int, concurrency: Optional[int]) -> multiprocessing.Process:
+    process = ctx.Process(
+        target=_process_main,
+        args=(concurrency,),
+        name=f"f5-prepost-worker-{index}"
+    )
+    process.start()
+    logger.info(f"Started worker process {process.name} (pid {process.pid})")
+    return process
+
+
+def supervise(processes: int, concurrency: Optional[int] = None):
+    """Run worker processes, restarting any that exit, until signalled.
+
+    Args:
+        processes: Number of worker processes
+        concurrency: Jobs run at once per process
+    """
+    # Spawn so every worker starts with fresh executors, pools and engines
+    ctx = multiprocessing.get_context("spawn")
+    children: List[multiprocessing.Process] = [
+        _start_process(ctx, index, concurrency) for index in range(processes)
+    ]
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping:
+        time.sleep(1)
+        for index, child in enumerate(children):
+            if not stopping and not child.is_alive():
+                logger.warning(
+                    f"Worker process {child.name} exited with code {child.exitcode}, restarting"
+                )
+                children[index] = _start_process(ctx, index, concurrency)
+
+    logger.info("Stopping worker processes")
+    for child in children:
+        if child.is_alive():
+            child.terminate()
+    for child in children:
+        child.join(settings.JOB_SHUTDOWN_TIMEOUT + 5)
+        if child.is_alive():
+            logger.warning(f"Worker process {child.name} did not stop, killing it")
+            child.kill()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point for standalone workers."""
+    parser = argparse.ArgumentParser(
+        description="Run F5 Pre/Post Check job workers"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=settings.WORKER_PROCESSES,
+        help="number of worker processes (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY,
+        help="jobs run at once per process (default: %(default)s)"
+    )
+    args = parser.parse_args(argv)
+
+    # Spawned workers read settings from the environment; they size their
+    # diff pools by the number of processes sharing the host
+    settings.WORKER_PROCESSES = args.processes
+    os.environ["WORKER_PROCESSES"] = str(args.processes)
+
+    setup_logging(getattr(logging, settings.LOG_LEVEL, logging.INFO))
+
+    # Prepare the schema once, before the workers start claiming jobs
+    from .database import init_db
+    asyncio.run(init_db())
+
+    if args.processes <= 1:
+        asyncio.run(run_worker(args.concurrency))
+    else:
+        supervise(args.processes, args.concurrency)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
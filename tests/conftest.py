@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+import httpx
+import pytest
+import pytest_asyncio
+
+# Point the app at a throwaway database before any module builds the engine.
+# NullPool keeps aiosqlite connections from outliving each test's event loop.
+_db_dir = tempfile.mkdtemp(prefix="f5_prepost_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ["DB_POOL_CLASS"] = "null"
+
+
+@pytest_asyncio.fixture
+async def database():
+    """Migrated test database, emptied after each test."""
+    from f5_prepost_api.database import Base, engine, init_db
+
+    await init_db()
+    yield
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+
+
+@pytest.fixture
+def client():
+    """HTTP client calling the app in-process, without its startup tasks."""
+    from f5_prepost_api.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test/api/v1")
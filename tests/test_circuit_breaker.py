@@ -0,0 +1,167 @@
+import types
+
+import pytest
+
+from f5_prepost_api.config import settings
+from f5_prepost_api.core import circuit_breaker
+from f5_prepost_api.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from f5_prepost_api.core.device_handler import F5DeviceHandler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("10.0.0.1:admin", failure_threshold=3, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 60
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("10.0.0.1:admin", failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["consecutive_failures"] == 1
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("10.0.0.1:admin", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert not breaker.allow_request()
+    clock.now += 30
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    assert breaker.is_open()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("10.0.0.1:admin", failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == 60
+
+
+def test_lost_probe_is_given_up_after_reset_timeout(clock):
+    breaker = CircuitBreaker("10.0.0.1:admin", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow_request()
+
+    clock.now += 59
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+class _FakeConnection:
+    def is_alive(self) -> bool:
+        return True
+
+    def disconnect(self):
+        pass
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(F5DeviceHandler, "_pools", {})
+    monkeypatch.setattr(F5DeviceHandler, "_breakers", {})
+    monkeypatch.setattr(settings, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "SSH_POOL_MIN_SIZE", 0)
+    return F5DeviceHandler("10.0.0.1", "admin", "secret")
+
+
+def _refuse(monkeypatch, handler):
+    def refuse():
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(handler, "_connect", refuse)
+
+
+def test_failed_logins_open_the_circuit(monkeypatch, handler):
+    _refuse(monkeypatch, handler)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            with handler.get_connection():
+                pass
+
+    assert handler.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        with handler.get_connection():
+            pass
+
+
+def test_errors_after_the_lease_do_not_count(monkeypatch, handler):
+    monkeypatch.setattr(handler, "_connect", _FakeConnection)
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            with handler.get_connection():
+                raise RuntimeError("command failed")
+
+    assert handler.breaker.state == CircuitBreaker.CLOSED
+    assert handler.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_warm_reports_to_the_breaker(monkeypatch, clock, handler):
+    device = {"reachable": False}
+
+    def connect():
+        if not device["reachable"]:
+            raise ConnectionRefusedError("refused")
+        return _FakeConnection()
+
+    monkeypatch.setattr(handler, "_connect", connect)
+
+    assert handler.warm(1)["status"] == "failed"
+    assert handler.warm(1)["status"] == "failed"
+    assert handler.breaker.state == CircuitBreaker.OPEN
+    assert handler.warm(1)["status"] == "unavailable"
+
+    # The warm-up after the reset timeout is the half-open probe
+    device["reachable"] = True
+    clock.now += settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+    assert handler.warm(1)["status"] == "connected"
+    assert handler.warm(1)["status"] == "already_warm"
+    assert handler.breaker.state == CircuitBreaker.CLOSED
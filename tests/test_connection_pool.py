@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pytest
+
+from f5_prepost_api.core.connection_pool import DeviceConnectionPool, PoolTimeoutError
+
+
+class _FakeConnection:
+    def __init__(self, number: int):
+        self.number = number
+        self.alive = True
+        self.disconnected = False
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class _Connector:
+    """Connect callable that counts the connections it opens."""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self) -> _FakeConnection:
+        connection = _FakeConnection(len(self.opened) + 1)
+        self.opened.append(connection)
+        return connection
+
+
+def _pool(connector: _Connector, **kwargs) -> DeviceConnectionPool:
+    return DeviceConnectionPool("10.0.0.1:admin", connector, **kwargs)
+
+
+def test_released_connection_is_reused():
+    connector = _Connector()
+    pool = _pool(connector, max_size=2)
+
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        assert pool.stats()["leased"] == 1
+
+    assert second is first
+    assert len(connector.opened) == 1
+    assert pool.stats() == {"size": 1, "idle": 1, "leased": 0, "min_size": 0, "max_size": 2}
+
+
+def test_concurrent_leases_get_their_own_connections():
+    connector = _Connector()
+    pool = _pool(connector, max_size=2)
+
+    first = pool.acquire()
+    second = pool.acquire()
+
+    assert first.connection is not second.connection
+    assert pool.stats()["leased"] == 2
+    pool.release(first)
+    pool.release(second)
+    assert pool.stats()["idle"] == 2
+
+
+def test_per_device_limit_times_out():
+    pool = _pool(_Connector(), max_size=1)
+    entry = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+    pool.release(entry)
+    assert pool.acquire(timeout=0.05) is entry
+
+
+def test_waiter_gets_the_released_connection():
+    pool = _pool(_Connector(), max_size=1)
+    entry = pool.acquire()
+    leased = []
+
+    waiter = threading.Thread(target=lambda: leased.append(pool.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(entry)
+    waiter.join(5)
+
+    assert leased == [entry]
+
+
+def test_failed_block_discards_the_connection():
+    connector = _Connector()
+    pool = _pool(connector, max_size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            raise RuntimeError("channel broke")
+
+    assert connector.opened[0].disconnected
+    assert pool.stats()["size"] == 0
+    with pool.lease() as connection:
+        assert connection is connector.opened[1]
+
+
+def test_dead_idle_connection_is_replaced_on_checkout():
+    connector = _Connector()
+    pool = _pool(connector, max_size=1)
+    with pool.lease() as connection:
+        pass
+    connection.alive = False
+
+    with pool.lease() as replacement:
+        assert replacement is not connection
+
+    assert connection.disconnected
+    assert pool.stats()["size"] == 1
+
+
+def test_failed_connect_frees_the_slot():
+    def refuse():
+        raise ConnectionRefusedError("refused")
+
+    pool = DeviceConnectionPool("10.0.0.1:admin", refuse, max_size=1)
+
+    with pytest.raises(ConnectionRefusedError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["size"] == 0
+
+
+def test_evict_idle_keeps_min_size():
+    connector = _Connector()
+    pool = _pool(connector, min_size=1, max_size=3, idle_timeout=10)
+    entries = [pool.acquire() for _ in range(3)]
+    for entry in entries:
+        pool.release(entry)
+
+    assert pool.evict_idle(now=time.monotonic() + 5) == 0
+    assert pool.evict_idle(now=time.monotonic() + 60) == 2
+    assert pool.stats()["size"] == 1
+    assert sum(c.disconnected for c in connector.opened) == 2
+    assert pool.evict_idle(now=time.monotonic() + 60, keep_min=False) == 1
+    assert pool.stats()["size"] == 0
+
+
+def test_evict_idle_leaves_leased_connections_alone():
+    pool = _pool(_Connector(), max_size=2, idle_timeout=10)
+    leased = pool.acquire()
+
+    assert pool.evict_idle(now=time.monotonic() + 60) == 0
+    assert pool.stats()["leased"] == 1
+    pool.release(leased)
+
+
+def test_prefill_stops_at_max_size():
+    connector = _Connector()
+    pool = _pool(connector, max_size=2)
+
+    assert pool.prefill(5) == 2
+    assert pool.prefill(5) == 0
+    assert pool.stats()["idle"] == 2
+
+
+def test_closed_pool_disconnects_returned_connections():
+    connector = _Connector()
+    pool = _pool(connector, max_size=2)
+    idle = pool.acquire()
+    leased = pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+
+    assert idle.connection.disconnected
+    pool.release(leased)
+    assert leased.connection.disconnected
+    assert pool.stats()["size"] == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,28 @@
+import pytest
+from pydantic import ValidationError
+
+from f5_prepost_api.config import settings
+from f5_prepost_api.models.schemas import WarmupRequest
+
+DEVICES = [{"device_ip": "10.0.0.1", "username": "admin", "password": "secret"}]
+
+
+@pytest.mark.parametrize("connections", [0, -1, settings.SSH_POOL_MAX_SIZE + 1, 1000])
+def test_warmup_connections_outside_the_pool_size_are_rejected(connections):
+    with pytest.raises(ValidationError):
+        WarmupRequest(devices=DEVICES, connections_per_device=connections)
+
+
+def test_warmup_connections_within_the_pool_size_are_accepted():
+    assert WarmupRequest(devices=DEVICES).connections_per_device is None
+    request = WarmupRequest(devices=DEVICES, connections_per_device=settings.SSH_POOL_MAX_SIZE)
+    assert request.connections_per_device == settings.SSH_POOL_MAX_SIZE
+
+
+@pytest.mark.asyncio
+async def test_warmup_endpoint_rejects_unbounded_requests(client):
+    async with client:
+        response = await client.post(
+            "/devices/warmup", json={"devices": DEVICES, "connections_per_device": 0}
+        )
+    assert response.status_code == 422
@@ -0,0 +1,229 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from f5_prepost_api.api.v1.endpoints import postcheck
+from f5_prepost_api.api.v1.endpoints.diff import run_diff_job
+from f5_prepost_api.core.job_queue import claim_job
+from f5_prepost_api.core.result_writer import get_result_writer, stop_result_writer
+from f5_prepost_api.database import (
+    AsyncSessionLocal,
+    CheckBatch,
+    DeviceProgress,
+    Diff,
+    PostCheck,
+    PostCheckOutput,
+    PreCheck,
+    PreCheckOutput
+)
+from f5_prepost_api.models.schemas import PostCheckRequest
+from f5_prepost_api.utils.diff_utils import get_stored_command_diff, output_digest, store_diff
+
+pytestmark = pytest.mark.asyncio
+
+COMMANDS = ["list ltm pool", "list sys ntp"]
+
+
+async def _create_checked_batch() -> str:
+    """Batch with one device whose pool changed, stored without Diff rows."""
+    batch_id = str(uuid.uuid4())
+    precheck_id = str(uuid.uuid4())
+    postcheck_id = str(uuid.uuid4())
+    pre = ["ltm pool /Common/p {\n    members none\n}\n", "sys ntp {\n}\n"]
+    post = ["ltm pool /Common/p {\n    members all\n}\n", "sys ntp {\n}\n"]
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            db.add(CheckBatch(batch_id=batch_id, status="completed", total_devices=1))
+            db.add(PreCheck(
+                id=precheck_id, batch_id=batch_id, device_ip="10.0.0.1",
+                status="completed", meta_data={"commands": COMMANDS}
+            ))
+            db.add(PostCheck(id=postcheck_id, precheck_id=precheck_id, status="completed"))
+            for index, command in enumerate(COMMANDS):
+                db.add(PreCheckOutput(
+                    precheck_id=precheck_id, command=command, output=pre[index],
+                    output_digest=output_digest(pre[index]), execution_order=index
+                ))
+                db.add(PostCheckOutput(
+                    postcheck_id=postcheck_id, command=command, output=post[index],
+                    output_digest=output_digest(post[index]), execution_order=index
+                ))
+    return batch_id
+
+
+async def _diff_rows() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count(Diff.id)))).scalar_one()
+
+
+async def test_get_diff_does_not_store_missing_diffs(database, client):
+    batch_id = await _create_checked_batch()
+
+    async with client:
+        response = await client.get(f"/batch/{batch_id}/diff", params={"view": "diffs"})
+        command_response = await client.get(
+            f"/batch/{batch_id}/devices/10.0.0.1/commands/0/diff"
+        )
+
+    assert response.status_code == 200
+    device = response.json()["devices"][0]
+    assert device["summary"]["commands_with_changes"] == 1
+    assert [c["has_changes"] for c in device["all_commands"]] == [True, False]
+    assert command_response.json()["has_changes"] is True
+    assert await _diff_rows() == 0
+
+
+async def test_views_follow_the_rerun_postcheck(database, client):
+    batch_id = await _create_checked_batch()
+    rerun_id = str(uuid.uuid4())
+    pre = "ltm pool /Common/p {\n    members none\n}\n"
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            precheck = (await db.execute(select(PreCheck))).scalar_one()
+            # The re-run found the pool back at its precheck state
+            db.add(PostCheck(
+                id=rerun_id, precheck_id=precheck.id, status="completed",
+                timestamp=datetime.utcnow() + timedelta(minutes=5)
+            ))
+            db.add(PostCheckOutput(
+                postcheck_id=rerun_id, command=COMMANDS[0], output=pre,
+                output_digest=output_digest(pre), execution_order=0
+            ))
+            db.add(DeviceProgress(
+                precheck_id=precheck.id, batch_id=batch_id, device_ip="10.0.0.1",
+                precheck_status="completed", postcheck_id=rerun_id,
+                postcheck_status="completed"
+            ))
+
+    device_url = f"/batch/{batch_id}/devices/10.0.0.1"
+    async with client:
+        device = await client.get(f"{device_url}/diff")
+        command = await client.get(f"{device_url}/commands/0/diff")
+        raw = await client.get(f"{device_url}/commands/0/output/post")
+        outputs = await client.get(f"/batch/{batch_id}/outputs")
+
+    assert device.json()["postcheck_id"] == rerun_id
+    assert command.json()["postcheck_id"] == rerun_id
+    assert command.json()["has_changes"] is False
+    assert raw.text == pre
+    assert outputs.json()["devices"][0]["postcheck_id"] == rerun_id
+
+
+async def test_command_run_on_one_side_is_uncomparable(database):
+    await _create_checked_batch()
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            # The postcheck never ran the second command
+            output = (await db.execute(
+                select(PostCheckOutput).filter(PostCheckOutput.command == COMMANDS[1])
+            )).scalar_one()
+            await db.delete(output)
+            precheck = (await db.execute(select(PreCheck))).scalar_one()
+            postcheck = (await db.execute(select(PostCheck))).scalar_one()
+
+    async def command_diffs():
+        async with AsyncSessionLocal() as db:
+            return [
+                await get_stored_command_diff(precheck.id, postcheck.id, command, "10.0.0.1", db)
+                for command in [*COMMANDS, "show sys version"]
+            ]
+
+    on_the_fly = await command_diffs()
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            await store_diff(precheck.id, postcheck.id, "10.0.0.1", db)
+    stored = await command_diffs()
+
+    assert on_the_fly == stored
+    assert on_the_fly[0]
+    assert on_the_fly[1:] == [None, None]
+
+
+async def test_recompute_queues_a_job_that_stores_diffs(database, client):
+    batch_id = await _create_checked_batch()
+
+    async with client:
+        response = await client.post(
+            f"/batch/{batch_id}/diff/recompute", params={"missing_only": True}
+        )
+    assert response.status_code == 202
+
+    job = await claim_job("test-worker", 30)
+    assert job.id == response.json()["job_id"]
+    assert job.kind == "diff"
+    await run_diff_job(job)
+
+    assert await _diff_rows() == len(COMMANDS)
+    async with AsyncSessionLocal() as db:
+        changed = (await db.execute(
+            select(Diff.command).filter(Diff.changes_detected)
+        )).scalars().all()
+    assert changed == ["list ltm pool"]
+
+
+async def test_recompute_unknown_batch_is_not_found(database, client):
+    async with client:
+        response = await client.post("/batch/missing/diff/recompute")
+    assert response.status_code == 404
+
+
+async def test_recompute_refreshes_stale_normalized_digests(database, client):
+    batch_id = await _create_checked_batch()
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            # Digests stored under older rules claim both pools are the same
+            for model in (PreCheckOutput, PostCheckOutput):
+                rows = (await db.execute(select(model))).scalars().all()
+                for row in rows:
+                    row.normalized_digest = "stale"
+
+    async with client:
+        response = await client.post(f"/batch/{batch_id}/diff/recompute")
+    job = await claim_job("test-worker", 30)
+    assert job.id == response.json()["job_id"]
+    await run_diff_job(job)
+
+    async with AsyncSessionLocal() as db:
+        changed = (await db.execute(
+            select(Diff.command).filter(Diff.changes_detected)
+        )).scalars().all()
+        digests = (await db.execute(select(PostCheckOutput.normalized_digest))).scalars().all()
+    assert changed == ["list ltm pool"]
+    assert "stale" not in digests
+
+
+class _FakeHandler:
+    async def execute_commands_async(self, commands, on_command=None):
+        return {"status": "success", "results": {c: f"{c} output\n" for c in commands}}
+
+
+async def test_failed_diff_still_stores_postcheck_outputs(database, monkeypatch):
+    async def explode(*args):
+        raise RuntimeError("diff pool broken")
+
+    monkeypatch.setattr(postcheck, "_build_diffs", explode)
+    monkeypatch.setattr(postcheck.device_manager, "get_handler", lambda **kw: _FakeHandler())
+    columns = {
+        "id": str(uuid.uuid4()), "batch_id": str(uuid.uuid4()), "device_ip": "10.0.0.1",
+        "status": "completed", "meta_data": {"commands": COMMANDS}
+    }
+    await get_result_writer().write_precheck(columns, [], completed=True)
+    precheck = PreCheck(**columns)
+    request = PostCheckRequest(
+        created_by="tester",
+        devices=[{"device_ip": "10.0.0.1", "username": "admin", "password": "secret"}]
+    )
+
+    await postcheck._process_postcheck_device(
+        request, request.devices[0], {"10.0.0.1": precheck}
+    )
+    await stop_result_writer()
+
+    async with AsyncSessionLocal() as db:
+        stored = (await db.execute(select(PostCheck))).scalars().all()
+        outputs = (await db.execute(select(PostCheckOutput.command))).scalars().all()
+    assert [(p.precheck_id, p.status) for p in stored] == [(precheck.id, "completed")]
+    assert sorted(outputs) == sorted(COMMANDS)
+    assert await _diff_rows() == 0
@@ -0,0 +1,38 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from f5_prepost_api.config import settings
+from f5_prepost_api.core import diff_pool
+
+pytestmark = pytest.mark.asyncio
+
+
+class _BrokenPool:
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("worker killed")
+
+
+def _diff_on_thread(pre, post, fromfile, tofile, engine):
+    return threading.current_thread()
+
+
+async def test_broken_pool_falls_back_to_a_thread(monkeypatch):
+    broken = _BrokenPool()
+    monkeypatch.setattr(settings, "DIFF_PROCESS_ENABLED", True)
+    monkeypatch.setattr(settings, "DIFF_PROCESS_THRESHOLD", 1)
+    monkeypatch.setattr(diff_pool, "_pool", broken)
+
+    thread = await diff_pool.run_in_diff_pool(_diff_on_thread, "pre", "post", "a", "b")
+
+    assert thread is not threading.main_thread()
+    assert diff_pool._pool is None
+
+
+async def test_small_outputs_are_diffed_inline(monkeypatch):
+    monkeypatch.setattr(settings, "DIFF_PROCESS_THRESHOLD", 1000)
+
+    thread = await diff_pool.run_in_diff_pool(_diff_on_thread, "pre", "post", "a", "b")
+
+    assert thread is threading.main_thread()
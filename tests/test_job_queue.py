@@ -0,0 +1,130 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from f5_prepost_api.api.v1.endpoints import precheck
+from f5_prepost_api.core.job_queue import (
+    JobWorker,
+    claim_job,
+    enqueue_job,
+    redact_payload,
+    unseal_payload
+)
+from f5_prepost_api.database import AsyncSessionLocal, CheckBatch, Job
+from f5_prepost_api.models.schemas import PreCheckRequest
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _create_job(kind: str, payload: dict, max_attempts: int = 2) -> str:
+    batch_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            db.add(CheckBatch(batch_id=batch_id, status="initiated", total_devices=1))
+            job = await enqueue_job(db, kind=kind, batch_id=batch_id, payload=payload)
+            job.max_attempts = max_attempts
+    return job.id
+
+
+async def _run_once(worker: JobWorker) -> Job:
+    job = await claim_job(worker.worker_id, worker.lease_seconds)
+    assert job is not None
+    await worker._execute(job)
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job.id)
+
+
+async def _failing_handler(job: Job):
+    raise RuntimeError("device manager exploded")
+
+
+async def test_failing_handler_requeues_then_fails(database):
+    job_id = await _create_job("boom", {"request": {}})
+    worker = JobWorker({"boom": _failing_handler}, lease_seconds=30)
+
+    job = await _run_once(worker)
+    assert job.id == job_id
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.last_error == "device manager exploded"
+    assert job.lease_owner is None
+
+    job = await _run_once(worker)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.finished_at is not None
+    assert await claim_job(worker.worker_id, worker.lease_seconds) is None
+
+
+async def _expire_lease(job_id: str):
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            job = await db.get(Job, job_id)
+            job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+
+
+async def test_expired_lease_is_reclaimed_until_attempts_run_out(database):
+    payload = {"request": {"devices": [{"device_ip": "10.0.0.1", "password": "secret"}]}}
+    job_id = await _create_job("crash", payload)
+
+    # Each claim is abandoned as if the worker process died mid-job
+    job = await claim_job("worker-1", 30)
+    assert job.attempts == 1
+    assert await claim_job("worker-2", 30) is None
+    await _expire_lease(job_id)
+
+    job = await claim_job("worker-2", 30)
+    assert job.id == job_id
+    assert job.attempts == 2
+    await _expire_lease(job_id)
+
+    assert await claim_job("worker-3", 30) is None
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.lease_owner is None
+    assert job.finished_at is not None
+    assert "Lease expired" in job.last_error
+    assert job.payload["request"]["devices"] == [{"device_ip": "10.0.0.1"}]
+
+
+async def test_precheck_job_failure_reaches_worker(database, monkeypatch):
+    async def explode(devices, run):
+        raise RuntimeError("executor shut down")
+
+    monkeypatch.setattr(precheck.device_manager, "run_for_devices", explode)
+    request = PreCheckRequest(
+        created_by="tester",
+        devices=[{"device_ip": "10.0.0.1", "username": "admin", "password": "secret"}],
+        commands=["show sys version"]
+    )
+    await _create_job("precheck", {"request": request.model_dump()})
+    worker = JobWorker({"precheck": precheck.run_precheck_job}, lease_seconds=30)
+
+    job = await _run_once(worker)
+    assert job.status == "queued"
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(CheckBatch, job.batch_id)
+        assert batch.status == "initiated"
+
+    job = await _run_once(worker)
+    assert job.status == "failed"
+    assert job.last_error == "executor shut down"
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(CheckBatch, job.batch_id)
+        assert batch.status == "failed"
+
+
+async def test_device_passwords_are_sealed_at_rest(database):
+    payload = {"request": {"devices": [{"device_ip": "10.0.0.1", "password": "secret"}]}}
+    job_id = await _create_job("precheck", payload)
+
+    async with AsyncSessionLocal() as db:
+        stored = (await db.get(Job, job_id)).payload
+    device = stored["request"]["devices"][0]
+    assert "password" not in device
+    assert "secret" not in device["password_sealed"]
+    assert unseal_payload(stored) == payload
+    assert redact_payload(stored)["request"]["devices"] == [{"device_ip": "10.0.0.1"}]
@@ -0,0 +1,80 @@
+from f5_prepost_api.utils.normalization import DEFAULT_RULES, Normalizer
+
+VIRTUAL_STATS = """\
+Ltm::Virtual Server: vs_web
+Status
+  Availability     : available
+  Destination      : 10.0.0.1:443
+
+Traffic                             ClientSide  Ephemeral  General
+  Bits In                                 {bits}          0        -
+  Packets In                              1.6K          0        -
+  Total Connections                       {conns}          0        -
+  Connection Mirroring                 enabled
+"""
+
+VLAN = """\
+Net::Vlan: external
+Interface Name   external
+MTU              {mtu}
+Tag              {tag}
+
+Net::Vlan-Member: {member}
+Tagged     no
+Errors     {errors}
+"""
+
+
+def _normalize(command: str, output: str) -> str:
+    return Normalizer(DEFAULT_RULES).normalize(command, output)
+
+
+def test_counter_rows_are_masked():
+    pre = VIRTUAL_STATS.format(bits="1.2M", conns="35")
+    post = VIRTUAL_STATS.format(bits="312.4M", conns="4.1K")
+
+    normalized = _normalize("show ltm virtual vs_web", pre)
+
+    assert normalized == _normalize("show ltm virtual vs_web", post)
+    assert "  Bits In <n>\n" in normalized
+    assert "  Total Connections <n>\n" in normalized
+    assert "Destination      : 10.0.0.1:443" in normalized
+    assert "Connection Mirroring                 enabled" in normalized
+
+
+def test_config_values_survive_normalization():
+    pre = VLAN.format(mtu="1500", tag="100", member="1.1", errors="0")
+
+    normalized = _normalize("show net vlan external", pre)
+
+    assert "MTU              1500" in normalized
+    assert "Tag              100" in normalized
+    assert "Net::Vlan-Member: 1.1" in normalized
+    assert "Errors <n>" in normalized
+
+
+def test_config_changes_are_not_hidden():
+    pre = VLAN.format(mtu="1500", tag="100", member="1.1", errors="0")
+    changes = [
+        VLAN.format(mtu="9000", tag="100", member="1.1", errors="0"),
+        VLAN.format(mtu="1500", tag="200", member="1.1", errors="0"),
+        VLAN.format(mtu="1500", tag="100", member="1.2", errors="0"),
+    ]
+
+    for post in changes:
+        assert _normalize("show net vlan", pre) != _normalize("show net vlan", post)
+    counters_only = VLAN.format(mtu="1500", tag="100", member="1.1", errors="7")
+    assert _normalize("show net vlan", pre) == _normalize("show net vlan", counters_only)
+
+
+def test_timestamps_and_uptime_are_masked():
+    pre = "Sys::Clock\nLocal  Mon Oct 16 21:11:42 UTC 2026\nUptime   12d 03:45:12\n"
+    post = "Sys::Clock\nLocal  Tue Oct 17 08:00:01 UTC 2026\nUptime   12d 14:33:51\n"
+
+    assert _normalize("show sys clock", pre) == _normalize("show sys clock", post)
+
+
+def test_list_commands_are_not_normalized():
+    output = "ltm pool /Common/p {\n    members none\n}\nTotal Connections  35\n"
+
+    assert _normalize("list ltm pool", output) == output
@@ -0,0 +1,110 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from f5_prepost_api.api.v1.endpoints.outputs import _etag_matches, _parse_range
+from f5_prepost_api.database import AsyncSessionLocal, CheckBatch, PreCheck, PreCheckOutput
+from f5_prepost_api.utils.diff_utils import output_digest
+
+OUTPUT = "ltm pool /Common/p {\n    members none\n}\n" * 50
+DIGEST = output_digest(OUTPUT)
+
+
+def test_parse_range_forms():
+    assert _parse_range("bytes=0-99", 1000) == (0, 99)
+    assert _parse_range("bytes=900-", 1000) == (900, 999)
+    assert _parse_range("bytes=-100", 1000) == (900, 999)
+    assert _parse_range("bytes=-5000", 1000) == (0, 999)
+    assert _parse_range(" bytes=10-5000 ", 1000) == (10, 999)
+
+
+def test_parse_range_ignores_unsupported_headers():
+    assert _parse_range("bytes=0-9,20-29", 1000) is None
+    assert _parse_range("items=0-9", 1000) is None
+    assert _parse_range("bytes=-", 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=20-10", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as exc_info:
+        _parse_range(header, 1000)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers == {"Content-Range": "bytes */1000"}
+
+
+def test_etag_matches():
+    etags = ('"abc"', '"abc-gzip"')
+    assert _etag_matches('"abc"', etags)
+    assert _etag_matches('W/"abc-gzip"', etags)
+    assert _etag_matches('"other", "abc"', etags)
+    assert _etag_matches("*", etags)
+    assert not _etag_matches('"other"', etags)
+    assert not _etag_matches(None, etags)
+    assert not _etag_matches("", etags)
+
+
+async def _create_precheck_output() -> str:
+    batch_id = str(uuid.uuid4())
+    precheck_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            db.add(CheckBatch(batch_id=batch_id, status="completed", total_devices=1))
+            db.add(PreCheck(
+                id=precheck_id, batch_id=batch_id, device_ip="10.0.0.1",
+                status="completed", meta_data={"commands": ["list ltm pool"]}
+            ))
+            db.add(PreCheckOutput(
+                precheck_id=precheck_id, command="list ltm pool", output=OUTPUT,
+                output_digest=DIGEST, execution_order=0
+            ))
+    return f"/batch/{batch_id}/devices/10.0.0.1/commands/0/output/pre"
+
+
+@pytest.mark.asyncio
+async def test_not_modified_repeats_cache_headers(database, client):
+    url = await _create_precheck_output()
+
+    async with client:
+        full = await client.get(url, headers={"Accept-Encoding": "identity"})
+        cached = await client.get(url, headers={"If-None-Match": full.headers["etag"]})
+
+    assert full.status_code == 200
+    assert full.text == OUTPUT
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == f'"{DIGEST}"'
+    assert cached.headers["cache-control"] == full.headers["cache-control"]
+    assert cached.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_not_modified_keeps_the_gzip_etag(database, client):
+    url = await _create_precheck_output()
+
+    async with client:
+        full = await client.get(url, headers={"Accept-Encoding": "gzip"})
+        cached = await client.get(
+            url, headers={"If-None-Match": full.headers["etag"], "Accept-Encoding": "gzip"}
+        )
+        wildcard = await client.get(
+            url, headers={"If-None-Match": "*", "Accept-Encoding": "identity"}
+        )
+
+    assert full.headers["content-encoding"] == "gzip"
+    assert full.headers["etag"] == f'"{DIGEST}-gzip"'
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == f'"{DIGEST}-gzip"'
+    assert wildcard.status_code == 304
+    assert wildcard.headers["etag"] == f'"{DIGEST}"'
+
+
+@pytest.mark.asyncio
+async def test_range_request(database, client):
+    url = await _create_precheck_output()
+
+    async with client:
+        response = await client.get(url, headers={"Range": "bytes=0-15"})
+
+    assert response.status_code == 206
+    assert response.text == OUTPUT[:16]
+    assert response.headers["content-range"] == f"bytes 0-15/{len(OUTPUT)}"
@@ -0,0 +1,146 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from f5_prepost_api.core.result_writer import ResultWriter
+from f5_prepost_api.database import (
+    AsyncSessionLocal,
+    CheckBatch,
+    DeviceProgress,
+    PreCheck,
+    PreCheckOutput
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _create_batch(total_devices: int) -> str:
+    batch_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            db.add(CheckBatch(batch_id=batch_id, status="initiated", total_devices=total_devices))
+    return batch_id
+
+
+def _precheck(batch_id: str, device_ip: str, status: str = "completed") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "batch_id": batch_id,
+        "device_ip": device_ip,
+        "status": status,
+        "meta_data": {"commands": ["show sys version"]}
+    }
+
+
+def _outputs(precheck: dict) -> list:
+    return [{
+        "precheck_id": precheck["id"],
+        "command": "show sys version",
+        "output": f"{precheck['device_ip']} 15.1",
+        "execution_order": 0
+    }]
+
+
+def _count_flushes(monkeypatch, writer: ResultWriter) -> list:
+    groups = []
+    write = writer._write
+
+    async def counted(pending):
+        groups.append(len(pending))
+        await write(pending)
+
+    monkeypatch.setattr(writer, "_write", counted)
+    return groups
+
+
+async def test_results_are_committed_in_one_group(database, monkeypatch):
+    batch_id = await _create_batch(3)
+    writer = ResultWriter(flush_interval=0.5, max_batch=10)
+    groups = _count_flushes(monkeypatch, writer)
+    prechecks = [
+        _precheck(batch_id, "10.0.0.1"),
+        _precheck(batch_id, "10.0.0.2"),
+        _precheck(batch_id, "10.0.0.3", status="unreachable"),
+    ]
+
+    await asyncio.gather(*(
+        writer.write_precheck(p, _outputs(p), completed=p["status"] == "completed")
+        for p in prechecks
+    ))
+    await writer.stop()
+
+    assert groups == [3]
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(CheckBatch, batch_id)
+        stored = (await db.execute(select(PreCheck.id))).scalars().all()
+        outputs = (await db.execute(select(PreCheckOutput.output))).scalars().all()
+        progress = (await db.execute(
+            select(DeviceProgress.device_ip, DeviceProgress.precheck_status)
+            .order_by(DeviceProgress.device_ip)
+        )).all()
+    assert batch.completed_devices == 2
+    assert sorted(stored) == sorted(p["id"] for p in prechecks)
+    assert len(outputs) == 3
+    assert progress == [
+        ("10.0.0.1", "completed"), ("10.0.0.2", "completed"), ("10.0.0.3", "unreachable")
+    ]
+
+
+async def test_full_group_flushes_without_waiting(database, monkeypatch):
+    batch_id = await _create_batch(2)
+    # The interval alone would hold the first group for a minute
+    writer = ResultWriter(flush_interval=60, max_batch=2)
+    groups = _count_flushes(monkeypatch, writer)
+    prechecks = [_precheck(batch_id, "10.0.0.1"), _precheck(batch_id, "10.0.0.2")]
+
+    await asyncio.wait_for(asyncio.gather(*(
+        writer.write_precheck(p, [], completed=True) for p in prechecks
+    )), timeout=5)
+    await writer.stop()
+
+    assert groups == [2]
+
+
+async def test_bad_result_fails_alone(database):
+    batch_id = await _create_batch(2)
+    writer = ResultWriter(flush_interval=0.5, max_batch=10)
+    good = _precheck(batch_id, "10.0.0.1")
+    bad = _precheck(batch_id, "10.0.0.2")
+    bad["id"] = good["id"]
+
+    results = await asyncio.gather(
+        writer.write_precheck(good, [], completed=True),
+        writer.write_precheck(bad, [], completed=True),
+        return_exceptions=True
+    )
+    await writer.stop()
+
+    assert results[0] is None
+    assert isinstance(results[1], Exception)
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(CheckBatch, batch_id)
+        progress = (await db.execute(select(DeviceProgress.device_ip))).scalars().all()
+    assert batch.completed_devices == 1
+    assert progress == ["10.0.0.1"]
+
+
+async def test_postcheck_updates_device_progress(database):
+    batch_id = await _create_batch(1)
+    writer = ResultWriter(flush_interval=0, max_batch=10)
+    precheck = _precheck(batch_id, "10.0.0.1")
+    postcheck_id = str(uuid.uuid4())
+
+    await writer.write_precheck(precheck, [], completed=True)
+    await writer.write_postcheck(
+        {"id": postcheck_id, "precheck_id": precheck["id"], "status": "completed"}, []
+    )
+    await writer.stop()
+
+    async with AsyncSessionLocal() as db:
+        progress = await db.get(DeviceProgress, precheck["id"])
+        batch = await db.get(CheckBatch, batch_id)
+    assert progress.postcheck_id == postcheck_id
+    assert progress.postcheck_status == "completed"
+    assert batch.completed_devices == 1
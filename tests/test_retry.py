@@ -0,0 +1,117 @@
+import socket
+
+import pytest
+from netmiko.exceptions import (
+    NetmikoAuthenticationException,
+    NetmikoTimeoutException,
+    ReadTimeout
+)
+from paramiko.ssh_exception import SSHException
+
+from f5_prepost_api.config import settings
+from f5_prepost_api.core.device_handler import F5DeviceHandler, is_transient_error
+
+
+@pytest.mark.parametrize("error", [
+    NetmikoTimeoutException("connect timed out"),
+    ReadTimeout("pattern not detected"),
+    SSHException("Error reading SSH protocol banner"),
+    ConnectionResetError("reset by peer"),
+    BrokenPipeError(),
+    EOFError(),
+    socket.timeout("timed out"),
+    NetmikoAuthenticationException("Authentication timeout."),
+    ValueError("Router prompt not found"),
+])
+def test_transient_errors(error):
+    assert is_transient_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    NetmikoAuthenticationException("Authentication to device failed."),
+    ValueError("Only show, tmsh, cat, list, and display commands are allowed"),
+    RuntimeError("unexpected"),
+])
+def test_permanent_errors(error):
+    assert not is_transient_error(error)
+
+
+def test_retry_delay_backs_off_within_bounds(monkeypatch):
+    monkeypatch.setattr(settings, "SSH_RETRY_BASE_DELAY", 2.0)
+    monkeypatch.setattr(settings, "SSH_RETRY_MAX_DELAY", 10.0)
+
+    for attempt, ceiling in [(1, 2.0), (2, 4.0), (3, 8.0), (4, 10.0), (8, 10.0)]:
+        delay = F5DeviceHandler._retry_delay(attempt)
+        assert ceiling / 2 <= delay <= ceiling
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(F5DeviceHandler, "_pools", {})
+    monkeypatch.setattr(F5DeviceHandler, "_breakers", {})
+    monkeypatch.setattr(settings, "SSH_RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "SSH_RETRY_BASE_DELAY", 0.0)
+    return F5DeviceHandler("10.0.0.1", "admin", "secret")
+
+
+def _script(monkeypatch, handler, results):
+    """Make each attempt return the next of ``results``."""
+    calls = []
+
+    def execute(commands, on_command=None):
+        calls.append(commands)
+        return dict(results[len(calls) - 1])
+
+    monkeypatch.setattr(handler, "_execute_commands", execute)
+    return calls
+
+
+TRANSIENT = {"status": "error", "error": "connection reset", "transient": True}
+SUCCESS = {"status": "success", "results": {"show sys version": "15.1"}}
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_until_success(monkeypatch, handler):
+    calls = _script(monkeypatch, handler, [TRANSIENT, TRANSIENT, SUCCESS])
+
+    result = await handler.execute_commands_async(["show sys version"])
+
+    assert result["status"] == "success"
+    assert result["attempts"] == 3
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_the_attempt_limit(monkeypatch, handler):
+    calls = _script(monkeypatch, handler, [TRANSIENT] * 5)
+
+    result = await handler.execute_commands_async(["show sys version"])
+
+    assert result["status"] == "error"
+    assert result["attempts"] == 3
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_retried(monkeypatch, handler):
+    permanent = {"status": "error", "error": "Authentication failed", "transient": False}
+    calls = _script(monkeypatch, handler, [permanent, SUCCESS])
+
+    result = await handler.execute_commands_async(["show sys version"])
+
+    assert result["status"] == "error"
+    assert result["attempts"] == 1
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_the_attempt(monkeypatch, handler):
+    calls = _script(monkeypatch, handler, [SUCCESS])
+    for _ in range(handler.breaker.failure_threshold):
+        handler.breaker.record_failure()
+
+    result = await handler.execute_commands_async(["show sys version"])
+
+    assert result["status"] == "unavailable"
+    assert result["attempts"] == 0
+    assert calls == []
@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+
+from f5_prepost_api.api.v1.endpoints import status
+from f5_prepost_api.database import AsyncSessionLocal, CheckBatch
+
+pytestmark = pytest.mark.asyncio
+
+
+class _Request:
+    """Stands in for a client that disconnects after ``polls`` checks."""
+
+    def __init__(self, polls: int):
+        self.polls = polls
+
+    async def is_disconnected(self) -> bool:
+        self.polls -= 1
+        return self.polls < 0
+
+
+async def _create_batch() -> str:
+    batch_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            db.add(CheckBatch(batch_id=batch_id, status="initiated", total_devices=1))
+    return batch_id
+
+
+async def test_events_for_unknown_batch_are_not_found(database, client):
+    async with client:
+        response = await client.get(f"/batch/{uuid.uuid4()}/events")
+    assert response.status_code == 404
+
+
+async def test_stream_rereads_status_after_subscribing(database):
+    batch_id = await _create_batch()
+    stale = {"batch_id": batch_id, "status": "unknown"}
+
+    chunks = [
+        chunk async for chunk in status._batch_event_stream(_Request(1), batch_id, stale)
+    ]
+
+    assert chunks[0].startswith("retry: ")
+    assert "event: snapshot" in chunks[0]
+    assert chunks[1].startswith("event: status")
+    assert '"status": "initiated"' in chunks[1]
+    assert status.event_bus.subscriber_count(batch_id) == 0
@@ -0,0 +1,136 @@
+from f5_prepost_api.utils.tmsh_diff import (
+    TOP_LEVEL,
+    command_diff,
+    command_has_changes,
+    parse_tmsh,
+    structured_diff
+)
+
+MULTI_LINE = """\
+ltm pool /Common/web_pool {
+    load-balancing-mode least-connections-member
+    members {
+        /Common/10.0.0.11:80 {
+            address 10.0.0.11
+        }
+        /Common/10.0.0.12:80 {
+            address 10.0.0.12
+        }
+    }
+    monitor /Common/http
+}
+ltm virtual /Common/vs_web {
+    destination /Common/10.0.0.1:443
+    disabled
+    ip-protocol tcp
+    profiles {
+        /Common/http { }
+        /Common/tcp { }
+    }
+    rules {
+        /Common/redirect
+    }
+}
+"""
+
+ONE_LINE = (
+    "ltm virtual /Common/vs_web { destination /Common/10.0.0.1:443 disabled "
+    "ip-protocol tcp mask 255.255.255.255 profiles { /Common/http { } /Common/tcp { } } "
+    "rules { /Common/a /Common/b } translate-address enabled vlans-disabled }\n"
+    "ltm pool /Common/web_pool { members { /Common/10.0.0.11:80 { address 10.0.0.11 } } "
+    "monitor /Common/http }\n"
+)
+
+
+def test_multi_line_objects_and_nested_blocks():
+    index = parse_tmsh(MULTI_LINE)
+
+    assert list(index) == ["ltm pool /Common/web_pool", "ltm virtual /Common/vs_web"]
+    assert index["ltm pool /Common/web_pool"] == {
+        "load-balancing-mode": "least-connections-member",
+        "members /Common/10.0.0.11:80 address": "10.0.0.11",
+        "members /Common/10.0.0.12:80 address": "10.0.0.12",
+        "monitor": "/Common/http",
+    }
+    assert index["ltm virtual /Common/vs_web"] == {
+        "destination": "/Common/10.0.0.1:443",
+        "disabled": "",
+        "ip-protocol": "tcp",
+        "profiles /Common/http": "",
+        "profiles /Common/tcp": "",
+        "rules /Common/redirect": "",
+    }
+
+
+def test_one_line_pairs_word_lists_and_flags():
+    index = parse_tmsh(ONE_LINE)
+
+    assert index["ltm virtual /Common/vs_web"] == {
+        "destination": "/Common/10.0.0.1:443",
+        "disabled": "",
+        "ip-protocol": "tcp",
+        "mask": "255.255.255.255",
+        "profiles /Common/http": "",
+        "profiles /Common/tcp": "",
+        "rules": "/Common/a /Common/b",
+        "translate-address": "enabled",
+        "vlans-disabled": "",
+    }
+    # A one-line block holding only words is a single value
+    assert index["ltm pool /Common/web_pool"] == {
+        "members /Common/10.0.0.11:80": "address 10.0.0.11",
+        "monitor": "/Common/http",
+    }
+
+
+def test_toggled_flag_leaves_other_properties_alone():
+    post = ONE_LINE.replace(" disabled ", " enabled ")
+
+    diff = structured_diff(ONE_LINE, post)
+
+    assert diff["modified"] == {
+        "ltm virtual /Common/vs_web": {
+            "added": {"enabled": ""},
+            "removed": {"disabled": ""},
+            "changed": {},
+        }
+    }
+
+
+def test_reordered_objects_are_unchanged():
+    pool, virtual = MULTI_LINE.split("ltm virtual")
+    reordered = "ltm virtual" + virtual + pool
+
+    diff = structured_diff(MULTI_LINE, reordered)
+
+    assert diff == {"added": [], "removed": [], "modified": {}}
+
+
+def test_added_removed_and_changed_objects():
+    post = MULTI_LINE.replace("monitor /Common/http", "monitor /Common/https").replace(
+        "ltm virtual /Common/vs_web", "ltm virtual /Common/vs_new"
+    )
+
+    diff = structured_diff(MULTI_LINE, post)
+
+    assert diff["added"] == ["ltm virtual /Common/vs_new"]
+    assert diff["removed"] == ["ltm virtual /Common/vs_web"]
+    assert diff["modified"]["ltm pool /Common/web_pool"]["changed"] == {
+        "monitor": {"pre": "/Common/http", "post": "/Common/https"}
+    }
+
+
+def test_lines_outside_objects_are_top_level():
+    index = parse_tmsh("Sys::Version\nMain Package\n")
+
+    assert index == {TOP_LEVEL: {"Sys::Version": "", "Main Package": ""}}
+    assert structured_diff("Sys::Version\n", "Sys::Version\n") is None
+
+
+def test_command_diff_falls_back_to_unified_diff():
+    diff = command_diff("uptime 1d\n", "uptime 2d\n", "pre", "post")
+
+    assert diff["format"] == "unified"
+    assert command_has_changes(diff)
+    assert "-uptime 1d" in diff["diff"]
+    assert "+uptime 2d" in diff["diff"]